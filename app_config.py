@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Configuração Tipada com Recarga a Quente
+Lê google_drive_config.json, pipedream_config.json, google_drive_setup.json, o
+arquivo .env e as variáveis de ambiente uma única vez, valida os tipos e guarda
+um snapshot imutável. Quando algum arquivo muda (mtime), o snapshot inteiro é
+trocado atomicamente e os ouvintes são avisados, sem reiniciar os processos.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONTENT_DIR = '/app/generated_content'
+DEFAULT_CHECK_SECONDS = 5
+
+CONFIG_FILES = {
+    'drive': 'google_drive_config.json',
+    'pipedream': 'pipedream_config.json',
+    'drive_setup': 'google_drive_setup.json'
+}
+BACKUP_FREQUENCIES = ('daily', 'weekly', 'monthly')
+PLACEHOLDER_PREFIXES = ('SUBSTITUA', 'SEU_', 'SUA_', 'sua_', 'seu_', 'id_da_sua')
+
+
+class ConfigError(ValueError):
+    """Configuração inválida (o snapshot anterior continua valendo)"""
+
+
+def parse_env_file(path):
+    """Lê um arquivo KEY=VALUE (.env), ignorando comentários e aspas"""
+    values = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except OSError:
+        return values
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):]
+
+        key, _, value = line.partition('=')
+        value = value.strip()
+        if value[:1] in ('"', "'") and value[-1:] == value[:1] and len(value) > 1:
+            value = value[1:-1]
+        else:
+            # Comentário no fim da linha (ex.: CONTENT_GENERATION_INTERVAL=4  # horas)
+            value = value.split(' #', 1)[0].strip()
+        values[key.strip()] = value
+    return values
+
+
+def load_json(path, required=True):
+    """JSON de configuração; arquivo opcional ausente vira {}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if required:
+            raise ConfigError(f"Arquivo de configuração ausente: {path}")
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        raise ConfigError(f"Erro ao ler {path}: {e}")
+
+
+def is_placeholder(value):
+    return not value or str(value).startswith(PLACEHOLDER_PREFIXES)
+
+
+class Settings:
+    """Snapshot validado e somente leitura das configurações
+
+    Precedência: .env (editável em produção) > variáveis de ambiente > JSON > padrão.
+    """
+
+    def __init__(self, env, drive, pipedream, drive_setup, base_dir=BASE_DIR):
+        self.env = env
+        drive_config = drive.get('google_drive_config', {})
+        automation = drive_config.get('automation_settings', {})
+        api_settings = drive_config.get('api_settings', {})
+        content_settings = drive.get('content_settings', {})
+        schedule = pipedream.get('pipedream_configuration', {}).get('schedule', {})
+
+        # Caminhos (antes fixos em /home/ubuntu e /app)
+        self.base_dir = base_dir
+        self.content_dir = self.text('CONTENT_DIR', DEFAULT_CONTENT_DIR)
+        self.generator_script = self.text('GENERATOR_SCRIPT', os.path.join(base_dir, 'day_trade_generator.py'))
+        self.free_generator_script = self.text(
+            'FREE_GENERATOR_SCRIPT', os.path.join(base_dir, 'day_trade_generator_free.py')
+        )
+        self.env_file = self.text('CONFIG_ENV_FILE', os.path.join(base_dir, '.env'))
+
+        # Geração: o intervalo padrão vem do cron do Pipedream ("0 */4 * * *")
+        self.pipedream_schedule = schedule.get('expression', "0 */4 * * *")
+        fields = self.pipedream_schedule.split()
+        if len(fields) != 5:
+            raise ConfigError(f"schedule.expression inválido: '{self.pipedream_schedule}'")
+        default_interval = int(fields[1][2:]) if fields[1].startswith('*/') and fields[1][2:].isdigit() else 4
+        self.interval_hours = self.integer('CONTENT_GENERATION_INTERVAL', default_interval, 1, 24)
+        # O cron "0 */N * * *" e os horários do backfill só ficam regulares se N divide o dia
+        if 24 % self.interval_hours:
+            raise ConfigError(
+                f"CONTENT_GENERATION_INTERVAL inválido: {self.interval_hours} "
+                f"(esperado divisor de 24: {', '.join(str(n) for n in range(1, 25) if 24 % n == 0)})"
+            )
+        self.image_count = self.integer('MAX_IMAGES_PER_CONTENT', 3, 1, 10)
+        image_size = content_settings.get('image_size', {}).get('width', 1024)
+        self.image_size = self.integer('IMAGE_SIZE', image_size, 256, 2048)
+        self.generation_retries = self.integer('GENERATION_RETRIES', 2, 0, 10)
+        self.retry_delay = self.integer('GENERATION_RETRY_DELAY', 60, 0, 3600)
+
+        # Retenção
+        self.retention_days = self.integer('CONTENT_RETENTION_DAYS', 7, 1, 3650)
+        self.backup_keep = self.integer('BACKUP_KEEP', 8, 1, 1000)
+
+        # Backup (automation_settings.backup)
+        backup = automation.get('backup', {})
+        self.backup_enabled = self.boolean('BACKUP_ENABLED', backup.get('enabled', False))
+        self.backup_frequency = self.text('BACKUP_FREQUENCY', backup.get('frequency', 'weekly'))
+        if self.backup_frequency not in BACKUP_FREQUENCIES:
+            raise ConfigError(
+                f"Frequência de backup inválida: '{self.backup_frequency}' (esperado {', '.join(BACKUP_FREQUENCIES)})"
+            )
+        self.backup_folder = backup.get('backup_folder', 'backup')
+
+        # Google Drive: pastas criadas pelo setup_google_drive.py e limites da API
+        folder_ids = dict(drive_setup.get('folder_ids', {}))
+        main_folder = self.text('GOOGLE_DRIVE_FOLDER_ID', drive_config.get('main_folder', {}).get('id'))
+        if not is_placeholder(main_folder):
+            folder_ids['main'] = main_folder
+        backup_folder_id = self.text('GOOGLE_DRIVE_BACKUP_FOLDER_ID', folder_ids.get(self.backup_folder))
+        if backup_folder_id:
+            folder_ids[self.backup_folder] = backup_folder_id
+        self.drive_folder_ids = folder_ids
+        self.drive_credentials_file = self.text(
+            'GOOGLE_DRIVE_CREDENTIALS',
+            os.path.join(base_dir, api_settings.get('credentials_file', 'google_drive_credentials.json'))
+        )
+        rate_limits = api_settings.get('rate_limits', {})
+        self.drive_requests_per_second = self.number(
+            'DRIVE_REQUESTS_PER_SECOND', rate_limits.get('requests_per_second', 10), 0.1, 1000
+        )
+
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError("Settings é somente leitura; altere os arquivos de configuração")
+        super().__setattr__(name, value)
+
+    def text(self, name, default=None):
+        value = self.env.get(name)
+        return value if value not in (None, '') else default
+
+    def integer(self, name, default, low, high):
+        raw = self.text(name, default)
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            raise ConfigError(f"{name} inválido: '{raw}' (esperado inteiro)")
+        if not low <= value <= high:
+            raise ConfigError(f"{name} fora do intervalo: {value} (esperado {low} a {high})")
+        return value
+
+    def number(self, name, default, low, high):
+        raw = self.text(name, default)
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            raise ConfigError(f"{name} inválido: '{raw}' (esperado número)")
+        if not low <= value <= high:
+            raise ConfigError(f"{name} fora do intervalo: {value} (esperado {low} a {high})")
+        return value
+
+    def boolean(self, name, default):
+        raw = self.text(name, default)
+        if isinstance(raw, bool):
+            return raw
+        if str(raw).lower() in ('true', '1', 'yes', 'sim'):
+            return True
+        if str(raw).lower() in ('false', '0', 'no', 'nao', 'não'):
+            return False
+        raise ConfigError(f"{name} inválido: '{raw}' (esperado true/false)")
+
+    def as_dict(self):
+        """Valores efetivos (sem o ambiente bruto, que pode conter segredos)"""
+        return {key: value for key, value in vars(self).items() if key not in ('env', 'frozen')}
+
+
+class ConfigCache:
+    """Mantém o Settings atual e o recarrega quando as fontes mudam
+
+    A verificação é por mtime/tamanho (os.stat, barato) no máximo a cada
+    check_interval segundos; inotify não está na biblioteca padrão e o volume
+    pode ser montado de fora do container, onde o mtime continua confiável.
+    Uma troca inválida é registrada e ignorada: os processos seguem com o
+    último snapshot válido.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, check_interval=None):
+        self.base_dir = base_dir
+        self.check_interval = float(check_interval if check_interval is not None
+                                    else os.getenv('CONFIG_CHECK_SECONDS', str(DEFAULT_CHECK_SECONDS)))
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.checked_at = 0.0
+        self.loaded_at = None
+        self.watcher = None
+
+        self.signature = self.current_signature()
+        self.settings = self.build()
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+
+    def paths(self):
+        paths = {name: os.path.join(self.base_dir, filename) for name, filename in CONFIG_FILES.items()}
+        paths['env'] = os.getenv('CONFIG_ENV_FILE', os.path.join(self.base_dir, '.env'))
+        return paths
+
+    def current_signature(self):
+        """(mtime, tamanho) de cada fonte; None para arquivos ausentes"""
+        signature = []
+        for path in self.paths().values():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def build(self):
+        """Lê e valida todas as fontes (levanta ConfigError)"""
+        paths = self.paths()
+        env = dict(os.environ)
+        env.update(parse_env_file(paths['env']))
+        return Settings(
+            env,
+            load_json(paths['drive']),
+            load_json(paths['pipedream']),
+            load_json(paths['drive_setup'], required=False),
+            self.base_dir
+        )
+
+    def get(self):
+        """Snapshot atual, verificando mudanças no máximo a cada check_interval"""
+        if time.monotonic() - self.checked_at >= self.check_interval:
+            self.refresh()
+        return self.settings
+
+    def refresh(self):
+        """Recarrega se alguma fonte mudou; retorna True se o snapshot foi trocado"""
+        with self.lock:
+            self.checked_at = time.monotonic()
+            signature = self.current_signature()
+            if signature == self.signature:
+                return False
+            self.signature = signature
+
+            try:
+                settings = self.build()
+            except ConfigError as e:
+                logging.error(f"❌ Configuração inválida, mantendo a anterior: {e}")
+                return False
+
+            previous, self.settings = self.settings, settings
+            self.loaded_at = time.time()
+
+        current = settings.as_dict()
+        changes = {key: (value, current[key]) for key, value in previous.as_dict().items()
+                   if current[key] != value}
+        if not changes:
+            return False
+
+        for key, (old, new) in changes.items():
+            logging.info(f"🔄 Configuração alterada: {key} {old} → {new}")
+        for listener in list(self.listeners):
+            try:
+                listener(previous, settings)
+            except Exception as e:
+                logging.error(f"Erro ao aplicar configuração recarregada: {e}")
+        return True
+
+    def on_change(self, listener):
+        """Registra listener(anterior, atual), chamado após cada troca de snapshot"""
+        self.listeners.append(listener)
+        return listener
+
+    def watch(self):
+        """Thread que verifica as fontes periodicamente (ouvintes disparam sem depender de get())"""
+        if self.watcher:
+            return self.watcher
+
+        def loop():
+            while True:
+                time.sleep(self.check_interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logging.error(f"Erro ao verificar configuração: {e}")
+
+        self.watcher = threading.Thread(target=loop, name='config-watcher', daemon=True)
+        self.watcher.start()
+        return self.watcher
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_config():
+    """Cache de configuração do processo (criado no primeiro uso)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ConfigCache()
+    return _cache
+
+
+def settings():
+    """Atalho para o snapshot atual das configurações"""
+    return get_config().get()
+
+
+if __name__ == "__main__":
+    # Valida as fontes e mostra os valores efetivos
+    try:
+        print(json.dumps(ConfigCache().settings.as_dict(), indent=2, ensure_ascii=False))
+    except ConfigError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
@@ -4,63 +4,294 @@ Agendador de Automação para Day Trade Content
 Executa o gerador de conteúdo em intervalos regulares
 """
 
-import schedule
 import time
 import subprocess
+import threading
 import os
 import logging
 from datetime import datetime
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('automation.log'),
-        logging.StreamHandler()
-    ]
-)
+from app_config import get_config, settings
+from b3_calendar import TIMEZONE
+from content_backup import backup_cron, run_backup
+from content_buffer import ContentBuffer
+from cron_scheduler import CronScheduler, MISFIRE_CATCH_UP, MISFIRE_SKIP
+from disk_budget import PRESSURE_PAUSE, open_budget
+from health_server import DEFAULT_HEALTH_PORT, HealthServer
+from job_queue import JobQueue, default_worker_id
+from log_store import configure_logging
+
+LEADER_LEASE_NAME = 'scheduler'
+LEADER_LEASE_TTL = 180  # segundos; renovado a cada minuto
+STALL_TOLERANCE = 600  # segundos de atraso de um timer para considerar o loop travado
+GENERATION_TIMEOUT = 300  # segundos por execução do script gerador
+JOB_LEASE_MARGIN = 120  # folga do lease do job além das tentativas (buffer, disco)
+
+# Configuração de logging (rotação por tamanho/idade com segmentos comprimidos)
+configure_logging(os.path.join(os.getenv('LOG_DIR', '.'), 'automation.log'))
 
 class AutomationScheduler:
     def __init__(self):
-        self.script_path = '/home/ubuntu/day_trade_generator.py'
-        self.content_dir = '/home/ubuntu/generated_content'
+        # Configuração tipada recarregada a quente: intervalo, tentativas, retenção e
+        # backup valem sem reiniciar; diretórios são lidos apenas na inicialização
+        self.config = get_config()
+        self.content_dir = self.config.get().content_dir
+        self.config.on_change(self.apply_settings)
+        
+        self.scheduler = CronScheduler()
+        self.generation_job = None
+        self.backup_job = None
+        
+        # Coordenação entre containers (opcional): fila SQLite no volume compartilhado
+        coordination_db = os.getenv('COORDINATION_DB')
+        self.queue = JobQueue(coordination_db) if coordination_db else None
+        self.worker_id = default_worker_id()
+        self.worker_count = int(os.getenv('GENERATOR_WORKERS', '1'))
+        self.is_leader = False
+        
+        # Estoque de conteúdo pré-gerado (CONTENT_BUFFER_DEPTH > 0 ativa)
+        self.buffer = ContentBuffer.from_env()
+        
+        # Cota de disco do conteúdo gerado (DISK_QUOTA_MB) com despejo LRU
+        self.disk_budget = open_budget(self.content_dir)
+        
+        # Estado lido pelo health check (atribuições simples, sem lock)
+        self.started_at = time.time()
+        self.current_stage = 'idle'
+        self.stage_started_at = None
+        self.last_generation = None
+        self.scheduled_jobs = []
+        
+        # Uma geração por vez no processo: horários regulares, burst pré-abertura e workers
+        # compartilham este lock (max_instances vale só dentro de cada job)
+        self.generation_lock = threading.Lock()
+        self.health_server = HealthServer(
+            self.health_status,
+            port=int(os.getenv('HEALTH_PORT', str(DEFAULT_HEALTH_PORT)))
+        )
         
         # Cria diretório para conteúdo gerado
         os.makedirs(self.content_dir, exist_ok=True)
     
+    def set_stage(self, stage):
+        """Registra a etapa atual da geração (exposta no health check)"""
+        self.stage_started_at = time.time() if stage != 'idle' else None
+        self.current_stage = stage
+    
     def run_content_generator(self):
-        """Executa o gerador de conteúdo"""
+        """Executa o gerador de conteúdo (disparo direto, sem fila)
+
+        Se outra geração já está em andamento, este disparo é ignorado (retorna False).
+        """
+        if not self.generation_lock.acquire(blocking=False):
+            logging.warning("⏭️ Geração já em andamento, disparo ignorado")
+            return False
+        
+        try:
+            return self.record_generation()
+        finally:
+            self.generation_lock.release()
+    
+    def record_generation(self):
+        """Executa a geração e registra duração e resultado (chamar com generation_lock)"""
+        started = time.time()
+        success = False
+        try:
+            success = self.generate_content()
+            return success
+        finally:
+            self.last_generation = {
+                'finished_at': datetime.now(TIMEZONE).isoformat(timespec='seconds'),
+                'duration_seconds': round(time.time() - started, 1),
+                'success': success
+            }
+            self.set_stage('idle')
+    
+    def generate_content(self):
+        """Entrega do buffer ou executa o script gerador"""
         try:
+            # Entrega imediata a partir do buffer, se houver item pronto
+            if self.buffer:
+                self.set_stage('buffer')
+                content = self.buffer.pop(self.content_dir)
+                if content:
+                    logging.info(f"📦 Conteúdo entregue do buffer: {content['file']}")
+                    return True
+                logging.info("📭 Buffer vazio, gerando conteúdo na hora")
+            
+            # Contrapressão: sem folga de disco mesmo após despejo, pula esta execução
+            if self.disk_budget and self.disk_budget.ensure_headroom() == PRESSURE_PAUSE:
+                logging.warning("🛑 Sem espaço em disco, geração pausada")
+                return False
+            
             logging.info("🚀 Iniciando geração de conteúdo...")
+            self.set_stage('generating')
             
             # Muda para o diretório de conteúdo
             os.chdir(self.content_dir)
             
-            # Executa o script
+            # Etapas concluídas ficam no checkpoint: a nova tentativa só refaz o que falhou
+            config = settings()
+            for attempt in range(config.generation_retries + 1):
+                if attempt:
+                    logging.info(f"🔁 Nova tentativa ({attempt + 1}) em {config.retry_delay}s, retomando do checkpoint")
+                    time.sleep(config.retry_delay)
+                if self.run_script():
+                    return True
+            return False
+                
+        except Exception as e:
+            logging.error(f"💥 Erro inesperado: {e}")
+            return False
+    
+    def run_script(self):
+        """Executa o script gerador uma vez"""
+        try:
             result = subprocess.run(
-                ['python3', self.script_path],
+                ['python3', settings().generator_script],
                 capture_output=True,
                 text=True,
-                timeout=300  # 5 minutos de timeout
+                timeout=GENERATION_TIMEOUT
             )
-            
-            if result.returncode == 0:
-                logging.info("✅ Conteúdo gerado com sucesso!")
-                logging.info(f"Output: {result.stdout}")
-            else:
-                logging.error(f"❌ Erro na geração: {result.stderr}")
-                
         except subprocess.TimeoutExpired:
             logging.error("⏰ Timeout na geração de conteúdo")
+            return False
+        
+        if result.returncode == 0:
+            logging.info("✅ Conteúdo gerado com sucesso!")
+            logging.info(f"Output: {result.stdout}")
+            return True
+        
+        logging.error(f"❌ Erro na geração: {result.stderr or result.stdout[-2000:]}")
+        return False
+    
+    def renew_leadership(self):
+        """Adquire ou renova o lease de líder do agendador"""
+        try:
+            is_leader = self.queue.acquire_lease(LEADER_LEASE_NAME, self.worker_id, LEADER_LEASE_TTL)
         except Exception as e:
-            logging.error(f"💥 Erro inesperado: {e}")
+            logging.error(f"Erro ao renovar liderança: {e}")
+            is_leader = False
+        
+        if is_leader != self.is_leader:
+            logging.info(f"👑 Liderança {'assumida' if is_leader else 'perdida'} por {self.worker_id}")
+        self.is_leader = is_leader
+        
+        if is_leader:
+            abandoned = self.queue.abandon_expired()
+            if abandoned:
+                logging.warning(f"⚠️ {abandoned} job(s) com lease expirado marcados como abandonados")
+        
+        return is_leader
+    
+    def trigger_generation(self):
+        """Dispara uma geração: direto sem coordenação, ou via fila apenas no líder"""
+        if not self.queue:
+            self.run_content_generator()
+            return
+        
+        if not self.renew_leadership():
+            logging.info("⏭️ Não sou o líder, disparo ignorado")
+            return
+        
+        # A chave por minuto impede que dois líderes (split brain) enfileirem o mesmo horário
+        slot = datetime.now(TIMEZONE).strftime('%Y%m%d%H%M')
+        job_id = self.queue.enqueue('content_generation', {'source': 'scheduler'}, f"scheduler:{slot}")
+        
+        if job_id:
+            logging.info(f"📥 Job {job_id} enfileirado")
+    
+    def job_lease_seconds(self):
+        """Lease do job coberto pelo pior caso das tentativas (senão o líder o abandona em execução)"""
+        config = settings()
+        return (config.generation_retries + 1) * (GENERATION_TIMEOUT + config.retry_delay) + JOB_LEASE_MARGIN
+    
+    def worker_loop(self, poll_interval=5):
+        """Consome a fila compartilhada; cada job é executado por no máximo um worker"""
+        while True:
+            try:
+                # Só reserva um job quando nenhuma geração está em andamento no processo:
+                # o worker espera o lock em vez de pegar um job que não poderia executar
+                with self.generation_lock:
+                    job = self.queue.claim(self.worker_id, lease_seconds=self.job_lease_seconds())
+                    
+                    if job is not None:
+                        logging.info(f"🔧 Job {job['id']} reservado por {self.worker_id}")
+                        
+                        if self.record_generation():
+                            self.queue.complete(job['id'], self.worker_id)
+                        else:
+                            self.queue.fail(job['id'], self.worker_id, 'generation failed')
+                
+                if job is None:
+                    time.sleep(poll_interval)
+                    
+            except Exception as e:
+                logging.error(f"Erro no worker: {e}")
+                time.sleep(poll_interval)
+    
+    def start_workers(self):
+        """Inicia as threads que drenam a fila compartilhada"""
+        for index in range(self.worker_count):
+            thread = threading.Thread(target=self.worker_loop, name=f"worker-{index}", daemon=True)
+            thread.start()
+        
+        logging.info(f"👷 {self.worker_count} worker(s) consumindo a fila ({self.worker_id})")
+    
+    def health_status(self):
+        """Estado de liveness e progresso para o endpoint /health"""
+        now = time.time()
+        jobs = {}
+        stalled = False
+        
+        for job in self.scheduled_jobs:
+            next_run = job.next_run
+            jobs[job.name] = {
+                'next_run': next_run.isoformat() if next_run else None,
+                'running': job.running,
+                'last_run': job.last_run
+            }
+            # Timer muito atrasado indica loop principal travado
+            if next_run and now - next_run.timestamp() > job.misfire_grace + job.jitter + STALL_TOLERANCE:
+                stalled = True
+        
+        upcoming = [job.next_run for job in self.scheduled_jobs if job.next_run]
+        status = {
+            'status': 'stalled' if stalled else 'healthy',
+            'service': 'day-trade-scheduler',
+            'worker_id': self.worker_id,
+            'is_leader': self.is_leader,
+            'uptime_seconds': round(now - self.started_at),
+            'next_fire': min(upcoming).isoformat() if upcoming else None,
+            'current_stage': self.current_stage,
+            'stage_seconds': round(now - self.stage_started_at, 1) if self.stage_started_at else None,
+            'last_generation': self.last_generation,
+            'config_loaded_at': datetime.fromtimestamp(self.config.loaded_at, TIMEZONE).isoformat(timespec='seconds'),
+            'jobs': jobs
+        }
+        
+        if self.queue:
+            try:
+                status['queue_depth'] = self.queue.depth()
+            except Exception as e:
+                status['queue_depth'] = None
+                status['queue_error'] = str(e)
+        if self.buffer:
+            status['buffer'] = self.buffer.stats()
+        if self.disk_budget:
+            try:
+                status['disk'] = self.disk_budget.stats()
+            except Exception as e:
+                status['disk'] = None
+                status['disk_error'] = str(e)
+        
+        return status
     
     def cleanup_old_files(self):
         """Remove arquivos antigos para economizar espaço"""
         try:
-            # Remove arquivos com mais de 7 dias
-            cutoff_time = time.time() - (7 * 24 * 60 * 60)
+            # Remove arquivos mais antigos que a retenção (CONTENT_RETENTION_DAYS)
+            cutoff_time = time.time() - (settings().retention_days * 24 * 60 * 60)
             
             for filename in os.listdir(self.content_dir):
                 filepath = os.path.join(self.content_dir, filename)
@@ -71,39 +302,123 @@ class AutomationScheduler:
                     if file_time < cutoff_time:
                         os.remove(filepath)
                         logging.info(f"🗑️ Arquivo removido: {filename}")
+            
+            # Corrige desvios do registro incremental e recupera a folga de disco
+            if self.disk_budget:
+                self.disk_budget.reconcile()
+                self.disk_budget.ensure_headroom()
                         
         except Exception as e:
             logging.error(f"Erro na limpeza: {e}")
     
+    def run_backup(self):
+        """Snapshot incremental do conteúdo (só o líder, quando há coordenação)"""
+        if self.queue and not self.is_leader:
+            return
+        run_backup(self.content_dir)
+    
+    def schedule_backup(self, config):
+        """Agenda, reagenda ou remove o job de backup conforme a configuração"""
+        if not config.backup_enabled:
+            if self.backup_job:
+                self.scheduler.remove_job(self.backup_job)
+                self.scheduled_jobs.remove(self.backup_job)
+                self.backup_job = None
+            return
+        
+        if self.backup_job:
+            self.scheduler.reschedule(self.backup_job, backup_cron(config.backup_frequency))
+            return
+        
+        self.backup_job = self.scheduler.add_job(
+            'backup',
+            backup_cron(config.backup_frequency),
+            self.run_backup,
+            misfire_policy=MISFIRE_CATCH_UP,
+            misfire_grace=6 * 3600,
+            max_instances=1
+        )
+        self.scheduled_jobs.append(self.backup_job)
+    
+    def apply_settings(self, previous, current):
+        """Aplica uma configuração recarregada aos jobs já agendados"""
+        if self.generation_job and current.interval_hours != previous.interval_hours:
+            self.scheduler.reschedule(self.generation_job, f"0 */{current.interval_hours} * * *")
+        if (current.backup_enabled, current.backup_frequency) != (previous.backup_enabled, previous.backup_frequency):
+            self.schedule_backup(current)
+    
     def start_scheduler(self):
         """Inicia o agendador"""
         logging.info("📅 Iniciando agendador de automação...")
+        self.health_server.start()
+        
+        if self.buffer:
+            self.buffer.start()
+            logging.info(f"📦 Buffer de conteúdo ativo (profundidade {self.buffer.depth})")
+        
+        # Com coordenação, apenas o líder enfileira e todos os containers consomem a fila
+        if self.queue:
+            self.renew_leadership()
+            self.scheduled_jobs.append(
+                self.scheduler.add_job('leader_lease', "* * * * *", self.renew_leadership)
+            )
+            self.start_workers()
+        
+        # Geração a cada N horas (fuso de São Paulo), sem sobreposição de execuções
+        config = self.config.get()
+        generation_job = self.generation_job = self.scheduler.add_job(
+            'content_generation',
+            f"0 */{config.interval_hours} * * *",
+            self.trigger_generation,
+            jitter=30,
+            misfire_policy=MISFIRE_CATCH_UP,
+            misfire_grace=300,
+            max_instances=1
+        )
+        self.scheduled_jobs.append(generation_job)
+        
+        # Rajada pré-abertura do pregão, apenas em dias úteis da B3
+        self.scheduled_jobs.append(self.scheduler.add_job(
+            'pre_open_burst',
+            "45 8 * * 1-5",
+            self.trigger_generation,
+            misfire_policy=MISFIRE_SKIP,
+            max_instances=1,
+            trading_days_only=True
+        ))
         
-        # Agenda execução a cada 4 horas
-        schedule.every(4).hours.do(self.run_content_generator)
+        # Limpeza diária às 02:00
+        self.scheduled_jobs.append(self.scheduler.add_job(
+            'cleanup',
+            "0 2 * * *",
+            self.cleanup_old_files,
+            misfire_policy=MISFIRE_CATCH_UP,
+            misfire_grace=3600
+        ))
         
-        # Agenda limpeza diária às 02:00
-        schedule.every().day.at("02:00").do(self.cleanup_old_files)
+        # Backup incremental (automation_settings.backup do google_drive_config.json)
+        self.schedule_backup(config)
+        
+        # Mudanças nos arquivos de configuração reagendam os jobs sem reiniciar
+        self.config.watch()
         
         # Executa uma vez imediatamente
-        self.run_content_generator()
+        self.scheduler.run_now(generation_job)
         
         logging.info("⏰ Agendador configurado:")
-        logging.info("  - Geração de conteúdo: a cada 4 horas")
-        logging.info("  - Limpeza de arquivos: diariamente às 02:00")
+        logging.info(f"  - Geração de conteúdo: a cada {config.interval_hours} horas")
+        logging.info("  - Rajada pré-abertura: 08:45 em dias de pregão")
+        logging.info(f"  - Limpeza de arquivos: diariamente às 02:00 (retenção de {config.retention_days} dias)")
+        if config.backup_enabled:
+            logging.info(f"  - Backup incremental: {config.backup_frequency} às 03:00")
         
-        # Loop principal
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # Verifica a cada minuto
-                
-            except KeyboardInterrupt:
-                logging.info("🛑 Agendador interrompido pelo usuário")
-                break
-            except Exception as e:
-                logging.error(f"Erro no agendador: {e}")
-                time.sleep(60)
+        # Loop principal (bloqueia até interrupção)
+        try:
+            self.scheduler.run_forever()
+        except KeyboardInterrupt:
+            logging.info("🛑 Agendador interrompido pelo usuário")
+            self.scheduler.stop()
+            self.health_server.stop()
 
 if __name__ == "__main__":
     scheduler = AutomationScheduler()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Calendário de Pregão da B3
+Feriados, dias úteis e horários de negociação do mercado brasileiro
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+TIMEZONE = ZoneInfo('America/Sao_Paulo')
+
+# Horários do pregão de derivativos (mini-índice / mini-dólar)
+PRE_OPEN = time(8, 55)
+MARKET_OPEN = time(9, 0)
+MARKET_CLOSE = time(18, 25)
+
+# Feriados fixos sem pregão (mês, dia)
+FIXED_HOLIDAYS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (11, 20),  # Dia da Consciência Negra
+    (12, 24),  # Véspera de Natal
+    (12, 25),  # Natal
+    (12, 31),  # Último dia do ano
+]
+
+
+def easter(year):
+    """Calcula o domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=32)
+def holidays(year):
+    """Retorna o conjunto de feriados da B3 no ano"""
+    result = {date(year, month, day) for month, day in FIXED_HOLIDAYS}
+
+    easter_day = easter(year)
+    result.add(easter_day - timedelta(days=48))  # Segunda de Carnaval
+    result.add(easter_day - timedelta(days=47))  # Terça de Carnaval
+    result.add(easter_day - timedelta(days=2))   # Sexta-feira Santa
+    result.add(easter_day + timedelta(days=60))  # Corpus Christi
+
+    return frozenset(result)
+
+
+def is_trading_day(day):
+    """Verifica se há pregão na data"""
+    if isinstance(day, datetime):
+        day = day.astimezone(TIMEZONE).date() if day.tzinfo else day.date()
+
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def is_market_open(moment):
+    """Verifica se o pregão está aberto no instante informado"""
+    local = moment.astimezone(TIMEZONE) if moment.tzinfo else moment
+    return is_trading_day(local.date()) and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+def next_trading_day(day):
+    """Retorna o próximo dia com pregão após a data"""
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Backfill de Conteúdo em Lote
+Gera muitos itens de uma vez (ex.: uma semana para um canal novo) com um pool
+de workers em pipeline: enquanto um item espera a imagem, outro já está no LLM.
+Cada etapa (llm, image, download) tem o próprio limite de concorrência, o
+progresso mostra ETA e uma execução interrompida é retomada com --resume.
+"""
+
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from app_config import settings
+
+STAGES = ('llm', 'image', 'download')
+DEFAULT_LIMITS = {'llm': 4, 'image': 6, 'download': 8}
+DEFAULT_WORKERS = 8
+MANIFEST_FILE = 'backfill.json'
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class StageLimiter:
+    """Semáforo de uma etapa com estatísticas (espera pela vaga e tempo ocupado)"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.calls = 0
+        self.active = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self.semaphore.acquire()
+        self.local.acquired = time.perf_counter()
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.wait_seconds += self.local.acquired - started
+        return self
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.active -= 1
+            self.busy_seconds += time.perf_counter() - self.local.acquired
+        self.semaphore.release()
+        return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'calls': self.calls,
+                'wait_seconds': round(self.wait_seconds, 1),
+                'busy_seconds': round(self.busy_seconds, 1)
+            }
+
+
+class SharedPlanner:
+    """TopicPlanner compartilhado entre os itens (picks serializados, sem repetir tópico)"""
+
+    def __init__(self, planner):
+        self.planner = planner
+        self.lock = threading.Lock()
+
+    def pick(self):
+        with self.lock:
+            return self.planner.pick()
+
+
+def backfill_root():
+    """Diretório dos backfills (BACKFILL_DIR ou <conteúdo>/backfill)"""
+    return os.getenv('BACKFILL_DIR') or os.path.join(settings().content_dir, 'backfill')
+
+
+def date_slots(start, end):
+    """Horários de publicação entre duas datas (inclusive), no intervalo configurado"""
+    first = datetime.strptime(start, '%Y-%m-%d')
+    last = datetime.strptime(end, '%Y-%m-%d')
+    if last < first:
+        raise ValueError(f"Data final anterior à inicial: {start} > {end}")
+
+    interval = settings().interval_hours
+    slots = []
+    day = first
+    while day <= last:
+        slots.extend((day + timedelta(hours=hour)).strftime('%Y-%m-%dT%H:%M') for hour in range(0, 24, interval))
+        day += timedelta(days=1)
+    return slots
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Backfill:
+    def __init__(self, directory, manifest, limits=None, workers=None, retries=None, verbose=False):
+        self.directory = directory
+        self.manifest = manifest
+        self.backfill_id = manifest['id']
+        self.workers = workers or int(os.getenv('BACKFILL_WORKERS', str(DEFAULT_WORKERS)))
+        self.retries = retries if retries is not None else int(os.getenv('BACKFILL_RETRIES', '2'))
+        self.verbose = verbose
+
+        limits = limits or {}
+        self.limiters = {
+            stage: StageLimiter(stage, limits.get(stage) or int(
+                os.getenv(f"BACKFILL_{stage.upper()}_CONCURRENCY", str(DEFAULT_LIMITS[stage]))
+            ))
+            for stage in STAGES
+        }
+
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.planner = None
+        self.console = sys.stdout
+        self.started_at = None
+        self.finished_now = 0
+
+    @classmethod
+    def create(cls, count=None, start=None, end=None, **options):
+        """Novo backfill com count itens ou um item por horário entre as datas"""
+        slots = date_slots(start, end) if start else [None] * count
+        if not slots:
+            raise ValueError("Nenhum item para gerar")
+
+        backfill_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        directory = os.path.join(backfill_root(), backfill_id)
+        os.makedirs(directory, exist_ok=True)
+
+        manifest = {
+            'id': backfill_id,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'items': [
+                {'index': index, 'slot': slot, 'run_id': f"backfill_{backfill_id}_{index:03d}",
+                 'status': STATUS_PENDING, 'attempts': 0, 'file': None, 'seconds': None}
+                for index, slot in enumerate(slots)
+            ]
+        }
+        backfill = cls(directory, manifest, **options)
+        backfill.save()
+        return backfill
+
+    @classmethod
+    def load(cls, backfill_id, **options):
+        """Retoma um backfill existente (itens concluídos não são refeitos)"""
+        directory = os.path.join(backfill_root(), backfill_id)
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            raise ValueError(f"Backfill não encontrado: {backfill_id}")
+        return cls(directory, manifest, **options)
+
+    @staticmethod
+    def list():
+        """Backfills existentes com a contagem de itens por status"""
+        root = backfill_root()
+        try:
+            names = sorted(os.listdir(root), reverse=True)
+        except OSError:
+            return []
+
+        backfills = []
+        for name in names:
+            try:
+                with open(os.path.join(root, name, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            counts = {status: 0 for status in (STATUS_PENDING, STATUS_DONE, STATUS_FAILED)}
+            for item in manifest['items']:
+                counts[item['status']] += 1
+            backfills.append({'id': manifest['id'], 'created_at': manifest['created_at'], **counts})
+        return backfills
+
+    def save(self):
+        """Grava o manifesto atomicamente (chamado a cada item concluído)"""
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with self.lock:
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            os.replace(f"{path}.tmp", path)
+
+    def shared_planner(self, generator):
+        with self.lock:
+            if self.planner is None:
+                from topic_planner import TopicPlanner
+                self.planner = SharedPlanner(TopicPlanner(generator.topics, generator.indicators))
+            return self.planner
+
+    def run_item(self, item):
+        """Gera um item (com novas tentativas retomando o checkpoint); retorna o item"""
+        from day_trade_generator_free import DayTradeContentGeneratorFree
+
+        started = time.perf_counter()
+        item_dir = os.path.join(self.directory, f"item_{item['index']:03d}")
+        os.makedirs(item_dir, exist_ok=True)
+
+        generator = DayTradeContentGeneratorFree(output_dir=item_dir, stage_limits=self.limiters)
+        generator.planner = self.shared_planner(generator)
+        generator.scheduled_for = item['slot']
+
+        filename = None
+        for attempt in range(self.retries + 1):
+            if self.stopped.is_set():
+                break
+            with self.lock:
+                item['attempts'] += 1
+            try:
+                filename = generator.run(item['run_id'], create=True)
+            except Exception as e:
+                print(f"💥 Erro no item {item['index']}: {e}")
+            if filename:
+                break
+
+        # Atualiza sob o lock: o manifesto pode estar sendo gravado por outra thread
+        with self.lock:
+            item.update(
+                status=STATUS_DONE if filename else STATUS_FAILED,
+                file=filename,
+                seconds=round(time.perf_counter() - started, 1)
+            )
+        return item
+
+    def report(self, item):
+        """Linha de progresso com ETA pelo ritmo desta execução"""
+        items = self.manifest['items']
+        done = sum(entry['status'] == STATUS_DONE for entry in items)
+        failed = sum(entry['status'] == STATUS_FAILED for entry in items)
+        remaining = len(items) - done - failed
+
+        elapsed = time.perf_counter() - self.started_at
+        rate = self.finished_now / elapsed if elapsed else 0
+        eta = format_duration(remaining / rate) if rate and remaining else '-'
+        stages = ' '.join(f"{name} {limiter.active}/{limiter.limit}" for name, limiter in self.limiters.items())
+        icon = '✅' if item['status'] == STATUS_DONE else '❌'
+
+        print(
+            f"{icon} Item {item['index']:03d} em {item['seconds']}s · "
+            f"[{done + failed}/{len(items)}] {100 * (done + failed) // len(items)}% · "
+            f"{done} ok, {failed} falha(s) · {rate * 60:.1f} itens/min · ETA {eta} · {stages}",
+            file=self.console, flush=True
+        )
+
+    def run(self):
+        """Executa os itens pendentes (e os que falharam antes); retorna True se todos concluíram"""
+        lock_file = open(os.path.join(self.directory, 'backfill.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise ValueError(f"Backfill {self.backfill_id} já está em execução em outro processo")
+
+        pending = [item for item in self.manifest['items'] if item['status'] != STATUS_DONE]
+        for item in pending:
+            item['status'] = STATUS_PENDING
+
+        limits = ', '.join(f"{name} {limiter.limit}" for name, limiter in self.limiters.items())
+        print(f"🚚 Backfill {self.backfill_id}: {len(pending)} item(ns) pendente(s) de "
+              f"{len(self.manifest['items'])}, {self.workers} workers (limites: {limits})",
+              file=self.console, flush=True)
+
+        self.started_at = time.perf_counter()
+        log_path = os.path.join(self.directory, 'backfill.log')
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill')
+        try:
+            # Saída detalhada dos geradores vai para o log do backfill (--verbose mostra no console)
+            with open(log_path, 'a', encoding='utf-8') as log, \
+                    redirect_stdout(self.console if self.verbose else log):
+                futures = [executor.submit(self.run_item, item) for item in pending]
+                for future in as_completed(futures):
+                    try:
+                        item = future.result()
+                    except Exception as e:
+                        print(f"💥 Erro inesperado no backfill: {e}", file=self.console)
+                        continue
+                    self.finished_now += 1
+                    self.save()
+                    self.report(item)
+        except KeyboardInterrupt:
+            # Itens em andamento terminam a etapa atual e guardam o checkpoint
+            self.stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            print(f"\n🛑 Interrompido; retome com: python3 content_backfill.py --resume {self.backfill_id}",
+                  file=self.console, flush=True)
+            return False
+        finally:
+            executor.shutdown(wait=False)
+            self.save()
+            lock_file.close()
+
+        self.summary()
+        return all(item['status'] == STATUS_DONE for item in self.manifest['items'])
+
+    def summary(self):
+        """Resumo final com a ocupação de cada etapa (mostra o gargalo)"""
+        elapsed = time.perf_counter() - self.started_at
+        done = sum(item['status'] == STATUS_DONE for item in self.manifest['items'])
+        print(f"🎉 Backfill {self.backfill_id}: {done}/{len(self.manifest['items'])} item(ns) em "
+              f"{format_duration(elapsed)} ({self.directory})", file=self.console)
+
+        for name, limiter in self.limiters.items():
+            stats = limiter.stats()
+            print(f"    {name:<8} {stats['calls']:4d} chamadas · ocupado {stats['busy_seconds']}s · "
+                  f"espera por vaga {stats['wait_seconds']}s (limite {stats['limit']})", file=self.console)
+
+        failed = [item['index'] for item in self.manifest['items'] if item['status'] == STATUS_FAILED]
+        if failed:
+            print(f"⚠️ Itens com falha: {failed}; tente de novo com --resume {self.backfill_id}",
+                  file=self.console)
+
+
+def option(name, default=None, cast=str):
+    """Valor de uma opção --name valor da linha de comando"""
+    if name in sys.argv[:-1]:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    if '--list' in sys.argv:
+        for entry in Backfill.list():
+            print(f"  {entry['id']}: {entry['done']} ok, {entry['failed']} falha(s), "
+                  f"{entry['pending']} pendente(s) (criado em {entry['created_at']})")
+        sys.exit(0)
+
+    options = {
+        'workers': option('--workers', cast=int),
+        'retries': option('--retries', cast=int),
+        'limits': {stage: option(f"--{stage}", cast=int) for stage in STAGES},
+        'verbose': '--verbose' in sys.argv
+    }
+
+    try:
+        if '--resume' in sys.argv:
+            backfill = Backfill.load(option('--resume'), **options)
+        elif '--from' in sys.argv:
+            backfill = Backfill.create(start=option('--from'), end=option('--to', option('--from')), **options)
+        elif '--count' in sys.argv:
+            backfill = Backfill.create(count=option('--count', cast=int), **options)
+        else:
+            print("Uso: python3 content_backfill.py --count N | --from AAAA-MM-DD [--to AAAA-MM-DD] | "
+                  "--resume ID | --list [--workers N] [--llm N] [--image N] [--download N] "
+                  "[--retries N] [--verbose]")
+            sys.exit(2)
+        success = backfill.run()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    sys.exit(0 if success else 1)
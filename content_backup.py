@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Backup Incremental e Deduplicado do Conteúdo Gerado
+Arquivos são divididos em chunks definidos pelo conteúdo (gear hash), guardados
+uma única vez por SHA-256 com índice em SQLite; cada snapshot é só um manifesto
+com a lista de chunks, restaurável isoladamente. Destino local + upload ao Drive.
+"""
+
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+from app_config import BASE_DIR, settings
+from disk_budget import open_budget
+
+DEFAULT_BACKUP_DIR = '/app/backups'
+CONFIG_FILES = ('google_drive_config.json', 'Controle_Publicacoes.csv')
+
+# Chunks entre 16 KB e 256 KB, média ~64 KB
+MIN_CHUNK = 16 * 1024
+AVG_CHUNK_BITS = 16
+MAX_CHUNK = 256 * 1024
+
+# Tabela do gear hash: fixa (semente constante) para os cortes serem estáveis entre execuções
+_gear_random = random.Random(0x5EED)
+GEAR = [_gear_random.getrandbits(64) for _ in range(256)]
+MASK_64 = (1 << 64) - 1
+CUT_MASK = ((1 << AVG_CHUNK_BITS) - 1) << (64 - AVG_CHUNK_BITS)
+
+# Estado transitório do volume que não vale guardar
+EXCLUDED_DIRS = {'buffer', 'checkpoints', 'idempotency', 'replicate_inbox'}
+EXCLUDED_SUFFIXES = ('-wal', '-shm', '-journal', '.lock', '.tmp')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    drive_id TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    chunks TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    new_chunks INTEGER NOT NULL,
+    new_bytes INTEGER NOT NULL,
+    drive_id TEXT
+) WITHOUT ROWID;
+"""
+
+
+def chunk_boundaries(data):
+    """Pontos de corte definidos pelo conteúdo (gear hash, estilo FastCDC)
+
+    O hash só depende dos últimos 64 bytes, então uma inserção no meio do
+    arquivo muda apenas os chunks vizinhos e o resto volta a casar.
+    """
+    length = len(data)
+    start = 0
+    while start < length:
+        end = min(start + MAX_CHUNK, length)
+        cut = end
+        position = start + MIN_CHUNK
+        if position < end:
+            h = 0
+            for offset, byte in enumerate(data[position:end]):
+                h = ((h << 1) + GEAR[byte]) & MASK_64
+                if not h & CUT_MASK:
+                    cut = position + offset + 1
+                    break
+        yield start, cut
+        start = cut
+
+
+def chunk_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def default_sources(content_dir=None):
+    """Conteúdo gerado mais os arquivos de configuração/controle do projeto"""
+    content_dir = content_dir or settings().content_dir
+    return [('generated_content', content_dir)] + [
+        (f"config/{name}", os.path.join(BASE_DIR, name)) for name in CONFIG_FILES
+    ]
+
+
+class DriveTarget:
+    """Upload dos chunks e manifestos para a pasta 'backup' do Google Drive"""
+
+    def __init__(self, folder_id, credentials_file):
+        # Imports pesados das APIs do Google só quando o upload é realmente usado
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
+        credentials = service_account.Credentials.from_service_account_file(
+            credentials_file, scopes=['https://www.googleapis.com/auth/drive.file']
+        )
+        self.service = build('drive', 'v3', credentials=credentials, cache_discovery=False)
+        self.folder_id = folder_id
+        self.last_request = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Destino no Drive, ou None se não configurado"""
+        # Pasta criada pelo setup_google_drive.py (ou GOOGLE_DRIVE_BACKUP_FOLDER_ID)
+        config = settings()
+        folder_id = config.drive_folder_ids.get(config.backup_folder)
+        credentials_file = config.drive_credentials_file
+        if not folder_id or not os.path.exists(credentials_file):
+            return None
+
+        try:
+            return cls(folder_id, credentials_file)
+        except Exception as e:
+            logging.error(f"Erro ao conectar ao Google Drive: {e}")
+            return None
+
+    def throttle(self):
+        """Respeita api_settings.rate_limits.requests_per_second (relido a cada chamada)"""
+        wait = self.last_request + 1 / settings().drive_requests_per_second - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self.last_request = time.monotonic()
+
+    def upload(self, name, data):
+        """Envia um objeto; retorna o id do arquivo no Drive"""
+        from googleapiclient.http import MediaInMemoryUpload
+
+        self.throttle()
+        created = self.service.files().create(
+            body={'name': name, 'parents': [self.folder_id]},
+            media_body=MediaInMemoryUpload(data, mimetype='application/octet-stream'),
+            fields='id'
+        ).execute()
+        return created['id']
+
+    def find(self, name):
+        """Id do objeto pelo nome (para restaurar sem o índice local)"""
+        self.throttle()
+        result = self.service.files().list(
+            q=f"name = '{name}' and '{self.folder_id}' in parents and trashed = false",
+            fields='files(id)', pageSize=1
+        ).execute()
+        files = result.get('files', [])
+        return files[0]['id'] if files else None
+
+    def download(self, file_id):
+        self.throttle()
+        return self.service.files().get_media(fileId=file_id).execute()
+
+    def delete(self, file_id):
+        self.throttle()
+        self.service.files().delete(fileId=file_id).execute()
+
+
+class ContentBackup:
+    def __init__(self, backup_dir=None, sources=None, drive=None):
+        self.backup_dir = backup_dir or os.getenv('BACKUP_DIR', DEFAULT_BACKUP_DIR)
+        self.chunk_dir = os.path.join(self.backup_dir, 'chunks')
+        self.snapshot_dir = os.path.join(self.backup_dir, 'snapshots')
+        self.db_path = os.path.join(self.backup_dir, 'index.db')
+        self.drive = drive
+
+        # (prefixo no manifesto, arquivo ou diretório de origem)
+        self.sources = sources if sources is not None else default_sources()
+
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def locked(self):
+        """Lock exclusivo do backup_dir: backup e prune de processos diferentes não se cruzam"""
+        with open(os.path.join(self.backup_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def connect(self):
+        """Abre uma conexão (uma por operação)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def iter_files(self):
+        """(caminho no manifesto, caminho local) de tudo que entra no backup"""
+        for prefix, source in self.sources:
+            if os.path.isfile(source):
+                yield prefix, source
+                continue
+
+            for directory, subdirs, files in os.walk(source):
+                subdirs[:] = sorted(name for name in subdirs
+                                    if name not in EXCLUDED_DIRS and not name.startswith('.'))
+                for name in sorted(files):
+                    if name.endswith(EXCLUDED_SUFFIXES) or name.startswith('.'):
+                        continue
+                    path = os.path.join(directory, name)
+                    yield f"{prefix}/{os.path.relpath(path, source)}", path
+
+    def read_file(self, path):
+        """Conteúdo do arquivo; bancos SQLite são copiados pela API de backup (consistente)"""
+        if path.endswith('.db'):
+            with tempfile.NamedTemporaryFile(suffix='.db') as copy:
+                with closing(sqlite3.connect(path, timeout=30)) as source, \
+                        closing(sqlite3.connect(copy.name)) as target:
+                    source.backup(target)
+                with open(copy.name, 'rb') as f:
+                    return f.read()
+
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def store_chunks(self, data, stats):
+        """Divide e guarda os chunks ainda desconhecidos; retorna a lista de hashes"""
+        digests = []
+        for start, end in chunk_boundaries(data):
+            piece = data[start:end]
+            digest = chunk_hash(piece)
+            digests.append(digest)
+
+            with closing(self.connect()) as conn:
+                known = conn.execute("SELECT 1 FROM chunks WHERE hash = ?", (digest,)).fetchone()
+            if known:
+                continue
+
+            compressed = zlib.compress(piece, 6)
+            path = self.chunk_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", 'wb') as f:
+                f.write(compressed)
+            os.replace(f"{path}.tmp", path)
+
+            with closing(self.connect()) as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO chunks (hash, size, stored_size) VALUES (?, ?, ?)",
+                    (digest, len(piece), len(compressed))
+                )
+            stats['new_chunks'] += 1
+            stats['new_bytes'] += len(compressed)
+        return digests
+
+    def backup(self):
+        """Cria um snapshot; só lê arquivos alterados e só grava chunks novos"""
+        with self.locked():
+            started = time.perf_counter()
+            snapshot_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+            stats = {'files': 0, 'bytes': 0, 'changed': 0, 'new_chunks': 0, 'new_bytes': 0}
+            entries = []
+            local_paths = []
+
+            for name, path in self.iter_files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                # Arquivo inalterado (tamanho e mtime): reaproveita a lista de chunks sem ler
+                with closing(self.connect()) as conn:
+                    cached = conn.execute(
+                        "SELECT chunks FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                        (name, stat.st_size, stat.st_mtime_ns)
+                    ).fetchone()
+
+                if cached and not path.endswith('.db'):
+                    digests = json.loads(cached['chunks'])
+                    size = stat.st_size
+                else:
+                    try:
+                        data = self.read_file(path)
+                    except (OSError, sqlite3.Error) as e:
+                        logging.error(f"Erro ao ler {path} para backup: {e}")
+                        continue
+                    digests = self.store_chunks(data, stats)
+                    size = len(data)
+                    stats['changed'] += 1
+                    with closing(self.connect()) as conn:
+                        conn.execute(
+                            "INSERT INTO files (path, size, mtime_ns, chunks) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT (path) DO UPDATE SET size = excluded.size, "
+                            "mtime_ns = excluded.mtime_ns, chunks = excluded.chunks",
+                            (name, stat.st_size, stat.st_mtime_ns, json.dumps(digests))
+                        )
+
+                entries.append({'path': name, 'size': size, 'mtime': int(stat.st_mtime), 'chunks': digests})
+                local_paths.append(path)
+                stats['files'] += 1
+                stats['bytes'] += size
+
+            manifest = {'id': snapshot_id, 'created_at': datetime.now().isoformat(timespec='seconds'),
+                        'files': entries}
+            manifest_data = gzip.compress(json.dumps(manifest).encode('utf-8'))
+            manifest_path = os.path.join(self.snapshot_dir, f"{snapshot_id}.json.gz")
+            with open(f"{manifest_path}.tmp", 'wb') as f:
+                f.write(manifest_data)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+
+            # Arquivos que saíram do conteúdo (retenção, despejo LRU) deixam o cache: seus chunks
+            # ficam só nos snapshots antigos e são varridos quando eles expiram
+            current = {entry['path'] for entry in entries}
+            with closing(self.connect()) as conn:
+                stale = [row['path'] for row in conn.execute("SELECT path FROM files")
+                         if row['path'] not in current]
+                conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in stale])
+
+            with closing(self.connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (id, created_at, files, bytes, new_chunks, new_bytes) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (snapshot_id, manifest['created_at'], stats['files'], stats['bytes'],
+                     stats['new_chunks'], stats['new_bytes'])
+                )
+
+            if self.drive:
+                self.upload_pending()
+                self.mark_synced(snapshot_id, local_paths)
+
+            stats['seconds'] = round(time.perf_counter() - started, 2)
+            logging.info(
+                f"💾 Snapshot {snapshot_id}: {stats['files']} arquivo(s), {stats['changed']} alterado(s), "
+                f"{stats['new_chunks']} chunk(s) novo(s) ({stats['new_bytes'] / 1024:.0f} KB) em {stats['seconds']}s"
+            )
+            stats['id'] = snapshot_id
+            return stats
+
+    def upload_pending(self):
+        """Envia ao Drive apenas chunks e manifestos que ainda não estão lá"""
+        uploaded = 0
+        with closing(self.connect()) as conn:
+            pending = [row['hash'] for row in conn.execute("SELECT hash FROM chunks WHERE drive_id IS NULL")]
+            snapshots = [row['id'] for row in conn.execute("SELECT id FROM snapshots WHERE drive_id IS NULL")]
+
+        try:
+            for digest in pending:
+                with open(self.chunk_path(digest), 'rb') as f:
+                    drive_id = self.drive.upload(f"chunk-{digest}", f.read())
+                with closing(self.connect()) as conn:
+                    conn.execute("UPDATE chunks SET drive_id = ? WHERE hash = ?", (drive_id, digest))
+                uploaded += 1
+
+            # Manifestos depois dos chunks: um snapshot no Drive é sempre restaurável
+            for snapshot_id in snapshots:
+                with open(os.path.join(self.snapshot_dir, f"{snapshot_id}.json.gz"), 'rb') as f:
+                    drive_id = self.drive.upload(f"snapshot-{snapshot_id}.json.gz", f.read())
+                with closing(self.connect()) as conn:
+                    conn.execute("UPDATE snapshots SET drive_id = ? WHERE id = ?", (drive_id, snapshot_id))
+        except Exception as e:
+            # O que faltou fica pendente para o próximo backup
+            logging.error(f"Erro no upload do backup para o Drive: {e}")
+
+        if uploaded:
+            logging.info(f"☁️ {uploaded} chunk(s) enviado(s) ao Drive")
+        return uploaded
+
+    def mark_synced(self, snapshot_id, paths):
+        """Snapshot completo no Drive: marca seus arquivos no orçamento de disco
+
+        Só artefatos sincronizados podem ser despejados quando falta espaço; o
+        manifesto sobe depois dos chunks, então drive_id preenchido garante restauração.
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT drive_id FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        if not row or not row['drive_id']:
+            return 0
+
+        budget = open_budget(settings().content_dir)
+        if budget is None:
+            return 0
+        try:
+            marked = budget.mark_synced(paths)
+        except Exception as e:
+            logging.error(f"Erro ao marcar arquivos sincronizados: {e}")
+            return 0
+        if marked:
+            logging.info(f"☁️ {marked} artefato(s) marcado(s) como sincronizado(s) com o Drive")
+        return marked
+
+    def snapshots(self):
+        """Snapshots disponíveis, do mais recente para o mais antigo"""
+        with closing(self.connect()) as conn:
+            return [dict(row) for row in conn.execute("SELECT * FROM snapshots ORDER BY id DESC")]
+
+    def load_manifest(self, snapshot_id):
+        """Manifesto local do snapshot (ou baixado do Drive)"""
+        path = os.path.join(self.snapshot_dir, f"{snapshot_id}.json.gz")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return json.loads(gzip.decompress(f.read()))
+
+        drive_id = self.drive and self.drive.find(f"snapshot-{snapshot_id}.json.gz")
+        if not drive_id:
+            raise ValueError(f"Snapshot não encontrado: {snapshot_id}")
+        return json.loads(gzip.decompress(self.drive.download(drive_id)))
+
+    def read_chunk(self, digest):
+        """Conteúdo de um chunk (local ou do Drive), verificado pelo hash"""
+        try:
+            with open(self.chunk_path(digest), 'rb') as f:
+                compressed = f.read()
+        except OSError:
+            drive_id = self.drive and self.drive.find(f"chunk-{digest}")
+            if not drive_id:
+                raise ValueError(f"Chunk ausente: {digest}")
+            compressed = self.drive.download(drive_id)
+
+        data = zlib.decompress(compressed)
+        if chunk_hash(data) != digest:
+            raise ValueError(f"Chunk corrompido: {digest}")
+        return data
+
+    def restore(self, snapshot_id, target_dir, prefix=None):
+        """Reconstrói os arquivos do snapshot em target_dir (opcionalmente só um prefixo)"""
+        manifest = self.load_manifest(snapshot_id)
+        restored = 0
+
+        for entry in manifest['files']:
+            if prefix and not entry['path'].startswith(prefix):
+                continue
+
+            path = os.path.join(target_dir, entry['path'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", 'wb') as f:
+                for digest in entry['chunks']:
+                    f.write(self.read_chunk(digest))
+            os.replace(f"{path}.tmp", path)
+            os.utime(path, (entry['mtime'], entry['mtime']))
+            restored += 1
+
+        logging.info(f"♻️ Snapshot {snapshot_id} restaurado em {target_dir}: {restored} arquivo(s)")
+        return restored
+
+    def prune(self, keep=None):
+        """Mantém os últimos keep snapshots e remove chunks que nenhum deles usa"""
+        with self.locked():
+            keep = keep if keep is not None else settings().backup_keep
+            snapshots = self.snapshots()
+            expired = snapshots[keep:]
+            if not expired:
+                return 0
+
+            for snapshot in expired:
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, f"{snapshot['id']}.json.gz"))
+                except OSError:
+                    pass
+                if self.drive and snapshot['drive_id']:
+                    try:
+                        self.drive.delete(snapshot['drive_id'])
+                    except Exception as e:
+                        logging.error(f"Erro ao remover snapshot do Drive: {e}")
+                with closing(self.connect()) as conn:
+                    conn.execute("DELETE FROM snapshots WHERE id = ?", (snapshot['id'],))
+
+            # Marca e varre: só os chunks dos snapshots mantidos contam como referenciados
+            referenced = set()
+            for snapshot in snapshots[:keep]:
+                for entry in self.load_manifest(snapshot['id'])['files']:
+                    referenced.update(entry['chunks'])
+            with closing(self.connect()) as conn:
+                unused = [dict(row) for row in conn.execute("SELECT hash, drive_id FROM chunks")
+                          if row['hash'] not in referenced]
+                # Entradas do cache que apontam para chunks varridos são relidas no próximo backup
+                orphaned = [row['path'] for row in conn.execute("SELECT path, chunks FROM files")
+                            if not referenced.issuperset(json.loads(row['chunks']))]
+                conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in orphaned])
+
+            for chunk in unused:
+                try:
+                    os.remove(self.chunk_path(chunk['hash']))
+                except OSError:
+                    pass
+                if self.drive and chunk['drive_id']:
+                    try:
+                        self.drive.delete(chunk['drive_id'])
+                    except Exception as e:
+                        logging.error(f"Erro ao remover chunk do Drive: {e}")
+                with closing(self.connect()) as conn:
+                    conn.execute("DELETE FROM chunks WHERE hash = ?", (chunk['hash'],))
+
+            logging.info(f"🗑️ {len(expired)} snapshot(s) e {len(unused)} chunk(s) sem uso removidos do backup")
+            return len(expired)
+
+
+def backup_cron(frequency):
+    """Expressão cron da frequência configurada (daily, weekly ou monthly), às 03:00"""
+    return {
+        'daily': "0 3 * * *",
+        'weekly': "0 3 * * 0",
+        'monthly': "0 3 1 * *"
+    }.get(frequency, "0 3 * * 0")
+
+
+def run_backup(content_dir=None):
+    """Backup completo do ciclo: snapshot, upload ao Drive e retenção"""
+    try:
+        backup = ContentBackup(sources=default_sources(content_dir), drive=DriveTarget.from_env())
+        stats = backup.backup()
+        backup.prune()
+        return stats
+    except Exception as e:
+        logging.error(f"Erro no backup: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'backup'
+
+    if command == 'backup':
+        run_backup()
+    elif command == 'list':
+        for snapshot in ContentBackup().snapshots():
+            print(f"  {snapshot['id']}: {snapshot['files']} arquivo(s), "
+                  f"{snapshot['bytes'] / 1024 / 1024:.1f} MB, +{snapshot['new_bytes'] / 1024:.0f} KB novos")
+    elif command == 'restore' and len(sys.argv) > 3:
+        ContentBackup(drive=DriveTarget.from_env()).restore(sys.argv[2], sys.argv[3],
+                                                            sys.argv[4] if len(sys.argv) > 4 else None)
+    elif command == 'prune':
+        ContentBackup(drive=DriveTarget.from_env()).prune()
+    else:
+        print("Uso: python3 content_backup.py [backup|list|restore <snapshot> <destino> [prefixo]|prune]")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Buffer de Conteúdo Pré-Gerado
+Mantém um estoque de itens prontos (roteiro, prompts e imagens baixadas) para
+entrega imediata nos triggers; workers em background reabastecem o estoque
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from content_catalog import ContentCatalog
+from disk_budget import PRESSURE_OK, open_budget, register_artifacts
+
+ITEM_FILE = 'content.json'
+
+
+class ContentBuffer:
+    def __init__(self, buffer_dir, depth=3, ttl_hours=12, idle_interval=60, disk_budget=None):
+        self.buffer_dir = buffer_dir
+        self.depth = depth
+        self.disk_budget = disk_budget
+        self.ttl_seconds = ttl_hours * 3600
+        self.idle_interval = idle_interval
+        self.refill_requested = threading.Event()
+        self.thread = None
+
+        os.makedirs(self.buffer_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Cria o buffer a partir das variáveis de ambiente (None se desativado)"""
+        depth = int(os.getenv('CONTENT_BUFFER_DEPTH', '0'))
+        if depth <= 0:
+            return None
+
+        return cls(
+            os.getenv('CONTENT_BUFFER_DIR', '/app/generated_content/buffer'),
+            depth=depth,
+            ttl_hours=float(os.getenv('CONTENT_BUFFER_TTL_HOURS', '12')),
+            disk_budget=open_budget()
+        )
+
+    def forget(self, item_dir):
+        """Remove o item do orçamento de disco (apagado ou entregue)"""
+        if self.disk_budget:
+            try:
+                self.disk_budget.forget(item_dir)
+            except Exception as e:
+                logging.error(f"Erro ao atualizar orçamento de disco: {e}")
+
+    def ready_items(self):
+        """Lista os itens prontos, do mais antigo para o mais novo"""
+        try:
+            names = os.listdir(self.buffer_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if name.startswith('item_'))
+
+    def item_age(self, name):
+        """Idade do item em segundos (pelo timestamp no nome)"""
+        created_at = float(name.split('_')[1])
+        return time.time() - created_at
+
+    def discard(self, item_dir):
+        """Apaga um item expirado e marca seu registro no catálogo como 'expired'"""
+        try:
+            with open(os.path.join(item_dir, ITEM_FILE), 'r', encoding='utf-8') as f:
+                catalog_id = json.load(f).get('catalog_id')
+        except (OSError, json.JSONDecodeError):
+            catalog_id = None
+
+        shutil.rmtree(item_dir, ignore_errors=True)
+        self.forget(item_dir)
+
+        if catalog_id:
+            try:
+                ContentCatalog().update(catalog_id, status='expired')
+            except Exception as e:
+                logging.error(f"Erro ao atualizar catálogo: {e}")
+
+    def purge_expired(self):
+        """Remove itens além do TTL para não entregar conteúdo velho"""
+        removed = 0
+        for name in self.ready_items():
+            if self.item_age(name) > self.ttl_seconds:
+                self.discard(os.path.join(self.buffer_dir, name))
+                removed += 1
+
+        if removed:
+            logging.info(f"🗑️ {removed} item(ns) expirado(s) removido(s) do buffer")
+        return removed
+
+    def pop(self, dest_dir):
+        """Retira o item mais antigo ainda válido e o move para dest_dir
+
+        O claim é um os.rename atômico, seguro entre processos que compartilham
+        o volume. Retorna o dicionário do conteúdo ou None se o buffer está vazio.
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+
+        for name in self.ready_items():
+            source = os.path.join(self.buffer_dir, name)
+
+            if self.item_age(name) > self.ttl_seconds:
+                self.discard(source)
+                continue
+
+            target = os.path.join(dest_dir, name)
+            try:
+                os.rename(source, target)
+            except OSError:
+                continue  # outro processo pegou este item
+
+            self.forget(source)
+            content = self.deliver(target, dest_dir)
+            register_artifacts(self.disk_budget, [content['file']] + [
+                image.get('local_file') for image in content.get('images', [])
+            ])
+            self.request_refill()
+            return content
+
+        self.request_refill()
+        return None
+
+    def deliver(self, item_dir, dest_dir):
+        """Move arquivos do item para dest_dir e grava o content_<timestamp>_<id>.json final"""
+        with open(os.path.join(item_dir, ITEM_FILE), 'r', encoding='utf-8') as f:
+            content = json.load(f)
+
+        for image in content.get('images', []):
+            if image.get('local_file'):
+                filename = os.path.basename(image['local_file'])
+                destination = os.path.join(dest_dir, filename)
+                shutil.move(os.path.join(item_dir, filename), destination)
+                image['local_file'] = destination
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        content['delivered_at'] = timestamp
+        content['source'] = 'buffer'
+        # Sufixo do item: entregas concorrentes no mesmo segundo não se sobrescrevem
+        suffix = os.path.basename(item_dir).rsplit('_', 1)[-1]
+        filename = os.path.join(dest_dir, f"content_{timestamp}_{suffix}.json")
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+
+        shutil.rmtree(item_dir, ignore_errors=True)
+
+        if content.get('catalog_id'):
+            try:
+                ContentCatalog().update(content['catalog_id'], status='delivered',
+                                        filename=filename, images=content.get('images', []))
+            except Exception as e:
+                logging.error(f"Erro ao atualizar catálogo: {e}")
+
+        content['file'] = filename
+        return content
+
+    def build_item(self):
+        """Gera um item completo em diretório temporário e o publica atomicamente"""
+        # Import tardio: o gerador (e o requests) fica fora da inicialização do processo
+        from day_trade_generator_free import DayTradeContentGeneratorFree
+        
+        created_at = time.time()
+        item_name = f"item_{created_at:.3f}_{uuid.uuid4().hex[:6]}"
+        building_dir = os.path.join(self.buffer_dir, f".building-{item_name}")
+        os.makedirs(building_dir)
+
+        try:
+            generator = DayTradeContentGeneratorFree(output_dir=building_dir, track_disk=False, checkpoints=False)
+            filename = generator.run()
+
+            if not filename:
+                shutil.rmtree(building_dir, ignore_errors=True)
+                return False
+
+            os.rename(filename, os.path.join(building_dir, ITEM_FILE))
+            os.rename(building_dir, os.path.join(self.buffer_dir, item_name))
+            register_artifacts(self.disk_budget, [os.path.join(self.buffer_dir, item_name)])
+            logging.info(f"📦 Item adicionado ao buffer: {item_name}")
+            return True
+
+        except Exception as e:
+            logging.error(f"Erro ao gerar item do buffer: {e}")
+            shutil.rmtree(building_dir, ignore_errors=True)
+            return False
+
+    def refill(self):
+        """Completa o estoque até a profundidade configurada (um processo por vez)"""
+        lock_path = os.path.join(self.buffer_dir, '.refill.lock')
+
+        with open(lock_path, 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0  # outro processo já está reabastecendo
+
+            self.purge_expired()
+            built = 0
+            while len(self.ready_items()) < self.depth:
+                # Estoque é opcional: não reabastece com o disco sob pressão
+                if self.disk_budget and self.disk_budget.pressure() != PRESSURE_OK:
+                    logging.warning("💾 Pouco espaço em disco, reabastecimento do buffer adiado")
+                    break
+                if not self.build_item():
+                    break
+                built += 1
+            return built
+
+    def request_refill(self):
+        """Acorda o worker de reabastecimento"""
+        self.refill_requested.set()
+
+    def worker_loop(self):
+        """Reabastece após cada pop ou a cada intervalo ocioso"""
+        while True:
+            self.refill_requested.wait(self.idle_interval)
+            self.refill_requested.clear()
+            try:
+                self.refill()
+            except Exception as e:
+                logging.error(f"Erro no reabastecimento do buffer: {e}")
+
+    def start(self):
+        """Inicia o worker em background e agenda o primeiro reabastecimento"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.worker_loop, name='content-buffer', daemon=True)
+            self.thread.start()
+            self.request_refill()
+        return self
+
+    def stats(self):
+        """Resumo do estado do buffer"""
+        items = self.ready_items()
+        return {
+            'depth': len(items),
+            'target_depth': self.depth,
+            'oldest_age_seconds': round(self.item_age(items[0]), 1) if items else None
+        }
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Catálogo de Conteúdo Gerado
+Registro append-only em SQLite de cada item (tópico, tempos por etapa,
+imagens e hashes) com consultas indexadas e paginação por cursor
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+DEFAULT_CATALOG_DB = 'content_catalog.db'
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    topic TEXT,
+    indicator TEXT,
+    scheduled_for TEXT,
+    status TEXT NOT NULL,
+    generator TEXT,
+    script TEXT,
+    file TEXT,
+    stage_timings TEXT NOT NULL DEFAULT '{}',
+    images TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_content_created ON content (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_content_topic ON content (topic, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_content_status ON content (status, created_at, id);
+"""
+
+
+def file_sha256(path):
+    """Hash SHA-256 de um arquivo (None se não existir)"""
+    if not path or not os.path.exists(path):
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentCatalog:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv('CONTENT_CATALOG_DB', DEFAULT_CATALOG_DB)
+
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self.migrate(conn)
+
+    @staticmethod
+    def migrate(conn):
+        """Adiciona colunas novas em catálogos criados por versões anteriores"""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(content)")}
+        for column in ('indicator', 'scheduled_for'):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE content ADD COLUMN {column} TEXT")
+                except sqlite3.OperationalError:
+                    pass  # outro processo migrou ao mesmo tempo
+
+    def connect(self):
+        """Abre uma conexão (uma por operação)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def image_entries(images):
+        """Normaliza as imagens para o catálogo, com hash do arquivo local"""
+        return [
+            {
+                'name': image.get('name'),
+                'prompt': image.get('prompt'),
+                'url': image.get('url'),
+                'local_file': image.get('local_file'),
+                'sha256': file_sha256(image.get('local_file'))
+            }
+            for image in images
+        ]
+
+    def record(self, content, filename=None):
+        """Registra um item gerado; retorna o id no catálogo"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO content (created_at, topic, indicator, scheduled_for, status, generator, script, file, "
+                "stage_timings, images) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.now().isoformat(timespec='seconds'),
+                    content.get('topic'),
+                    content.get('indicator'),
+                    content.get('scheduled_for'),
+                    content.get('status', 'generated'),
+                    content.get('generator'),
+                    content.get('script'),
+                    filename,
+                    json.dumps(content.get('stage_timings', {})),
+                    json.dumps(self.image_entries(content.get('images', [])), ensure_ascii=False)
+                )
+            )
+            return cursor.lastrowid
+
+    def update(self, content_id, status=None, filename=None, images=None):
+        """Atualiza status, arquivo e imagens de um item (ex.: entrega do buffer)"""
+        fields, params = [], []
+
+        if status is not None:
+            fields.append("status = ?")
+            params.append(status)
+        if filename is not None:
+            fields.append("file = ?")
+            params.append(filename)
+        if images is not None:
+            fields.append("images = ?")
+            params.append(json.dumps(self.image_entries(images), ensure_ascii=False))
+
+        if not fields:
+            return False
+
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(f"UPDATE content SET {', '.join(fields)} WHERE id = ?", (*params, content_id))
+            return cursor.rowcount == 1
+
+    def query(self, topic=None, status=None, date_from=None, date_to=None, cursor=None, limit=50):
+        """Consulta paginada (mais recentes primeiro); retorna (itens, próximo cursor)"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        conditions, params = [], []
+
+        if topic:
+            conditions.append("topic = ?")
+            params.append(topic)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if date_from:
+            conditions.append("created_at >= ?")
+            params.append(date_from)
+        if date_to:
+            # Datas sem horário incluem o dia inteiro
+            conditions.append("created_at <= ?")
+            params.append(f"{date_to}T23:59:59" if len(date_to) == 10 else date_to)
+        if cursor:
+            # Cursor = "created_at|id" do último item da página anterior (keyset)
+            cursor_created_at, cursor_id = cursor.rsplit('|', 1)
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend([cursor_created_at, int(cursor_id)])
+
+        sql = "SELECT * FROM content"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+
+        with closing(self.connect()) as conn:
+            rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+
+        items = [self.row_to_dict(row) for row in rows[:limit]]
+        next_cursor = f"{items[-1]['created_at']}|{items[-1]['id']}" if len(rows) > limit else None
+        return items, next_cursor
+
+    def months(self):
+        """Meses (AAAA-MM) com conteúdo registrado, em ordem crescente"""
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT substr(created_at, 1, 7) AS month FROM content ORDER BY month"
+            ).fetchall()
+        return [row['month'] for row in rows]
+
+    def month_summary(self, month):
+        """Quantidade de itens e maior id do mês (para exportação incremental)"""
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS total, MAX(id) AS last_id FROM content "
+                "WHERE created_at >= ? AND created_at < ?",
+                (month, f"{month}~")
+            ).fetchone()
+        return {'total': row['total'], 'last_id': row['last_id']}
+
+    def iter_month(self, month, batch_size=500):
+        """Itera os itens do mês em ordem cronológica, em lotes (memória limitada)"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "SELECT * FROM content WHERE created_at >= ? AND created_at < ? ORDER BY created_at, id",
+                (month, f"{month}~")
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self.row_to_dict(row)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Converte uma linha do catálogo em dicionário"""
+        item = dict(row)
+        item['stage_timings'] = json.loads(item['stage_timings'])
+        item['images'] = json.loads(item['images'])
+        return item
+
+
+def record_content(content, filename):
+    """Registra no catálogo padrão sem interromper a geração em caso de erro"""
+    try:
+        return ContentCatalog().record(content, filename)
+    except Exception as e:
+        logging.error(f"Erro ao registrar conteúdo no catálogo: {e}")
+        return None
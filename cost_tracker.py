@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Contabilidade de Tokens e Custos
+Agrega uso e custo por dia, etapa, tópico e modelo em SQLite e aplica
+orçamentos diário/mensal: modelo mais barato, cache ou fallback antes do limite
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from b3_calendar import TIMEZONE
+
+DEFAULT_COST_DB = 'usage_costs.db'
+DEFAULT_MODEL = 'gpt-4o-mini'
+DEFAULT_ECONOMY_MODEL = 'gpt-4.1-nano'
+
+# Preço em USD por 1M de tokens: (entrada, saída)
+MODEL_PRICES = {
+    'gpt-4.1-nano': (0.10, 0.40),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4o': (2.50, 10.00)
+}
+
+# Preço de referência da Replicate por segundo de GPU (Nvidia A100)
+REPLICATE_PRICE_PER_SECOND = float(os.getenv('REPLICATE_PRICE_PER_SECOND', '0.00115'))
+
+BUDGET_OK = 'ok'
+BUDGET_ECONOMY = 'economy'
+BUDGET_EXHAUSTED = 'exhausted'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, stage, topic, model)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS items (
+    day TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    items INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, topic)
+) WITHOUT ROWID;
+"""
+
+
+def token_cost(model, prompt_tokens, completion_tokens):
+    """Custo em USD de uma chamada (modelos desconhecidos usam o preço do padrão)"""
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES[DEFAULT_MODEL])
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def estimate_request_cost(data):
+    """Custo máximo estimado de uma requisição de chat (~4 caracteres por token)"""
+    prompt_tokens = len(json.dumps(data.get('messages', []), ensure_ascii=False)) // 4
+    return token_cost(data.get('model', DEFAULT_MODEL), prompt_tokens, data.get('max_tokens', 0))
+
+
+def today():
+    """Dia atual no fuso de São Paulo (AAAA-MM-DD)"""
+    return datetime.now(TIMEZONE).strftime('%Y-%m-%d')
+
+
+class CostTracker:
+    def __init__(self, db_path=None, daily_budget=None, monthly_budget=None,
+                 soft_limit=None, economy_model=None):
+        self.db_path = db_path or os.getenv('COST_DB', DEFAULT_COST_DB)
+
+        # Orçamentos em USD (0 = sem limite) e fração a partir da qual economizar
+        self.daily_budget = float(daily_budget if daily_budget is not None
+                                  else os.getenv('COST_DAILY_BUDGET_USD', '0'))
+        self.monthly_budget = float(monthly_budget if monthly_budget is not None
+                                    else os.getenv('COST_MONTHLY_BUDGET_USD', '0'))
+        self.soft_limit = float(soft_limit if soft_limit is not None
+                                else os.getenv('COST_SOFT_LIMIT', '0.8'))
+        self.economy_model = economy_model or os.getenv('OPENAI_ECONOMY_MODEL', DEFAULT_ECONOMY_MODEL)
+
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """Abre uma conexão (uma por operação)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record_cost(self, stage, topic, model, cost_usd, prompt_tokens=0, completion_tokens=0):
+        """Soma uma chamada ao agregado do dia (upsert, sem linha por chamada)"""
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "INSERT INTO usage (day, stage, topic, model, calls, prompt_tokens, completion_tokens, cost_usd) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (day, stage, topic, model) DO UPDATE SET "
+                "calls = calls + 1, prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "cost_usd = cost_usd + excluded.cost_usd",
+                (today(), stage, topic or '', model or '', prompt_tokens, completion_tokens, cost_usd)
+            )
+        return cost_usd
+
+    def record_usage(self, stage, topic, model, usage):
+        """Registra o campo usage de uma resposta de chat; retorna o custo"""
+        if not usage:
+            return 0.0
+
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        cost = token_cost(model, prompt_tokens, completion_tokens)
+        return self.record_cost(stage, topic, model, cost, prompt_tokens, completion_tokens)
+
+    def record_item(self, topic, cost_usd):
+        """Conta um item de conteúdo concluído e seu custo total"""
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "INSERT INTO items (day, topic, items, cost_usd) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (day, topic) DO UPDATE SET "
+                "items = items + 1, cost_usd = cost_usd + excluded.cost_usd",
+                (today(), topic or '', cost_usd)
+            )
+
+    def spent(self, since, until=None):
+        """Gasto total entre os dias informados (inclusive)"""
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) AS total FROM usage WHERE day >= ? AND day <= ?",
+                (since, until or '9999-12-31')
+            ).fetchone()
+        return row['total']
+
+    def budget_state(self, projected=0.0):
+        """Estado do orçamento considerando o custo projetado da próxima chamada"""
+        day = today()
+        checks = []
+        if self.daily_budget > 0:
+            checks.append((self.spent(day), self.daily_budget))
+        if self.monthly_budget > 0:
+            checks.append((self.spent(f"{day[:7]}-01"), self.monthly_budget))
+
+        state = BUDGET_OK
+        for spent, budget in checks:
+            if spent + projected >= budget:
+                return BUDGET_EXHAUSTED
+            if spent + projected >= budget * self.soft_limit:
+                state = BUDGET_ECONOMY
+        return state
+
+    def choose_model(self, data, optional=False):
+        """Modelo a usar na requisição, ou None para recorrer ao cache/fallback
+
+        Chamadas opcionais (com alternativa em cache) são cortadas já no modo
+        economia; as demais passam para o modelo econômico e só param quando
+        nem ele cabe no orçamento restante.
+        """
+        model = data.get('model', DEFAULT_MODEL)
+        state = self.budget_state(estimate_request_cost(data))
+
+        if state == BUDGET_OK:
+            return model
+        if optional:
+            return None
+
+        economy_data = {**data, 'model': self.economy_model}
+        if self.budget_state(estimate_request_cost(economy_data)) != BUDGET_EXHAUSTED:
+            if model != self.economy_model:
+                logging.info(f"💸 Orçamento próximo do limite: {model} -> {self.economy_model}")
+            return self.economy_model
+        return None
+
+    def summary(self, days=30):
+        """Resumo de custos: por dia (com custo por item), por etapa e por tópico"""
+        since = (datetime.now(TIMEZONE) - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+        with closing(self.connect()) as conn:
+            daily = conn.execute(
+                "SELECT day, SUM(calls) AS calls, SUM(prompt_tokens) AS prompt_tokens, "
+                "SUM(completion_tokens) AS completion_tokens, SUM(cost_usd) AS cost_usd "
+                "FROM usage WHERE day >= ? GROUP BY day ORDER BY day DESC",
+                (since,)
+            ).fetchall()
+            items = {
+                row['day']: row['items']
+                for row in conn.execute(
+                    "SELECT day, SUM(items) AS items FROM items WHERE day >= ? GROUP BY day", (since,)
+                )
+            }
+            by_stage = conn.execute(
+                "SELECT stage, model, SUM(calls) AS calls, SUM(cost_usd) AS cost_usd "
+                "FROM usage WHERE day >= ? GROUP BY stage, model ORDER BY cost_usd DESC",
+                (since,)
+            ).fetchall()
+            by_topic = conn.execute(
+                "SELECT topic, SUM(items) AS items, SUM(cost_usd) AS cost_usd "
+                "FROM items WHERE day >= ? GROUP BY topic ORDER BY cost_usd DESC",
+                (since,)
+            ).fetchall()
+
+        days_list = []
+        for row in daily:
+            day = dict(row)
+            day['items'] = items.get(row['day'], 0)
+            day['cost_per_item_usd'] = round(row['cost_usd'] / day['items'], 6) if day['items'] else None
+            day['cost_usd'] = round(row['cost_usd'], 6)
+            days_list.append(day)
+
+        total_cost = sum(day['cost_usd'] for day in days_list)
+        total_items = sum(items.values())
+        day = today()
+
+        return {
+            'days': days_list,
+            'by_stage': [dict(row) for row in by_stage],
+            'by_topic': [
+                {**dict(row), 'cost_per_item_usd': round(row['cost_usd'] / row['items'], 6) if row['items'] else None}
+                for row in by_topic
+            ],
+            'cost_per_item_usd': round(total_cost / total_items, 6) if total_items else None,
+            'today_usd': round(self.spent(day), 6),
+            'month_to_date_usd': round(self.spent(f"{day[:7]}-01"), 6),
+            'daily_budget_usd': self.daily_budget or None,
+            'monthly_budget_usd': self.monthly_budget or None,
+            'budget_state': self.budget_state()
+        }
+
+
+def estimate_monthly_cost(executions, db_path=None, model=DEFAULT_MODEL):
+    """Custo mensal estimado: média observada por item, ou estimativa por tokens"""
+    db_path = db_path or os.getenv('COST_DB', DEFAULT_COST_DB)
+
+    if os.path.exists(db_path):
+        try:
+            cost_per_item = CostTracker(db_path).summary()['cost_per_item_usd']
+            if cost_per_item is not None:
+                return executions * cost_per_item
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao ler custos observados: {e}")
+
+    # Roteiro (~250 tokens de entrada, 200 de saída) + prompts (~350 de entrada, 400 de saída)
+    per_item = token_cost(model, 250, 200) + token_cost(model, 350, 400)
+    return executions * per_item
+
+
+if __name__ == "__main__":
+    report = CostTracker().summary(days=int(sys.argv[1]) if len(sys.argv) > 1 else 30)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
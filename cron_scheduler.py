@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Agendador Cron Orientado a Eventos
+Heap de timers com expressões cron no fuso de São Paulo, regras de pregão da B3,
+jitter, política de misfire e limite de execuções simultâneas por job
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from b3_calendar import TIMEZONE, is_trading_day
+
+MISFIRE_SKIP = 'skip'
+MISFIRE_CATCH_UP = 'catch_up'
+
+
+class CronExpression:
+    """Expressão cron de 5 campos: minuto hora dia mês dia-da-semana"""
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expressão cron inválida: {expression}")
+
+        self.expression = expression
+        parsed = [self.parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+
+        # Semântica cron: se dia e dia-da-semana forem restritos, vale qualquer um dos dois
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+        self.sorted_minutes = sorted(self.minutes)
+        self.sorted_hours = sorted(self.hours)
+
+    @staticmethod
+    def parse_field(field, low, high):
+        """Converte um campo cron (*, */n, a-b, a-b/n, listas) em conjunto de valores"""
+        values = set()
+
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = end = int(part)
+
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Campo cron fora do intervalo: {field}")
+
+            values.update(range(start, end + 1, step))
+
+        # Domingo pode ser escrito como 7
+        if high == 6 and 7 in values:
+            values.discard(7)
+            values.add(0)
+
+        return frozenset(values)
+
+    def matches_day(self, day):
+        """Verifica se a data satisfaz os campos de dia, mês e dia-da-semana"""
+        if day.month not in self.months:
+            return False
+
+        day_ok = day.day in self.days
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment):
+        """Retorna o próximo instante (no fuso de São Paulo) estritamente após moment"""
+        local = moment.astimezone(TIMEZONE).replace(tzinfo=None)
+        candidate = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+        # Limite de busca de 5 anos cobre qualquer expressão válida (ex.: 29 de fevereiro)
+        for _ in range(366 * 5):
+            if self.matches_day(candidate):
+                for hour in self.sorted_hours:
+                    if hour < candidate.hour:
+                        continue
+                    for minute in self.sorted_minutes:
+                        if hour == candidate.hour and minute < candidate.minute:
+                            continue
+                        return candidate.replace(hour=hour, minute=minute).replace(tzinfo=TIMEZONE)
+
+            candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+
+        raise ValueError(f"Expressão cron sem próxima execução: {self.expression}")
+
+
+class ScheduledJob:
+    """Job agendado com suas políticas de execução"""
+
+    def __init__(self, name, cron, func, jitter=0, misfire_policy=MISFIRE_SKIP,
+                 misfire_grace=60, max_instances=1, trading_days_only=False):
+        if misfire_policy not in (MISFIRE_SKIP, MISFIRE_CATCH_UP):
+            raise ValueError(f"Política de misfire inválida: {misfire_policy}")
+
+        self.name = name
+        self.cron = CronExpression(cron)
+        self.func = func
+        self.jitter = jitter
+        self.misfire_policy = misfire_policy
+        self.misfire_grace = misfire_grace
+        self.max_instances = max_instances
+        self.trading_days_only = trading_days_only
+
+        self.running = 0
+        self.next_run = None
+        self.last_run = None
+        self.cancelled = False
+
+    def next_fire_after(self, moment):
+        """Próximo horário nominal, respeitando o calendário da B3 se necessário"""
+        candidate = self.cron.next_after(moment)
+        while self.trading_days_only and not is_trading_day(candidate):
+            candidate = self.cron.next_after(candidate)
+        return candidate
+
+
+class CronScheduler:
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    def add_job(self, name, cron, func, **options):
+        """Registra um job e agenda sua primeira execução"""
+        job = ScheduledJob(name, cron, func, **options)
+
+        with self.condition:
+            self.push(job, job.next_fire_after(datetime.now(TIMEZONE)))
+            self.condition.notify()
+
+        logging.info(f"⏰ Job '{name}' agendado ({cron}), próxima execução: {job.next_run.isoformat()}")
+        return job
+
+    def reschedule(self, job, cron):
+        """Troca a expressão cron de um job já agendado (sem interromper execuções em andamento)"""
+        expression = CronExpression(cron)
+
+        with self.condition:
+            job.cron = expression
+            self.heap = [entry for entry in self.heap if entry[2] is not job]
+            heapq.heapify(self.heap)
+            self.push(job, job.next_fire_after(datetime.now(TIMEZONE)))
+            self.condition.notify()
+
+        logging.info(f"⏰ Job '{job.name}' reagendado ({cron}), próxima execução: {job.next_run.isoformat()}")
+
+    def remove_job(self, job):
+        """Cancela as próximas execuções de um job"""
+        with self.condition:
+            job.cancelled = True
+            job.next_run = None
+            self.heap = [entry for entry in self.heap if entry[2] is not job]
+            heapq.heapify(self.heap)
+            self.condition.notify()
+
+        logging.info(f"⏰ Job '{job.name}' removido da agenda")
+
+    def push(self, job, nominal):
+        """Insere a próxima ocorrência no heap (chamar com o lock adquirido)"""
+        fire_at = nominal.timestamp()
+        if job.jitter:
+            fire_at += random.uniform(0, job.jitter)
+
+        job.next_run = nominal
+        heapq.heappush(self.heap, (fire_at, next(self.counter), job, nominal))
+
+    def run_now(self, job):
+        """Dispara um job imediatamente, respeitando o limite de concorrência"""
+        self.dispatch(job, datetime.now(TIMEZONE))
+
+    def dispatch(self, job, nominal):
+        """Executa o job em thread própria para não atrasar o loop de timers"""
+        with self.condition:
+            if job.running >= job.max_instances:
+                logging.warning(f"⏭️ Job '{job.name}' ainda em execução, ocorrência de {nominal.isoformat()} ignorada")
+                return False
+            job.running += 1
+
+        thread = threading.Thread(target=self.execute, args=(job, nominal), name=f"job-{job.name}", daemon=True)
+        thread.start()
+        return True
+
+    def execute(self, job, nominal):
+        """Corpo da thread de execução de um job"""
+        started = time.monotonic()
+        try:
+            job.func()
+        except Exception as e:
+            logging.error(f"💥 Erro no job '{job.name}': {e}")
+        finally:
+            with self.condition:
+                job.running -= 1
+                job.last_run = {
+                    'scheduled_for': nominal.isoformat(),
+                    'duration_seconds': round(time.monotonic() - started, 3)
+                }
+
+    def fire(self, job, fire_at, nominal):
+        """Trata uma ocorrência vencida: misfire, disparo e reagendamento"""
+        now = time.time()
+        lateness = now - fire_at
+
+        if lateness > job.misfire_grace and job.misfire_policy == MISFIRE_SKIP:
+            logging.warning(f"⏭️ Job '{job.name}' perdeu a execução de {nominal.isoformat()} ({lateness:.0f}s de atraso)")
+        else:
+            if lateness > job.misfire_grace:
+                logging.info(f"🔁 Recuperando execução atrasada do job '{job.name}' ({lateness:.0f}s)")
+            self.dispatch(job, nominal)
+
+        # Reagenda a partir do horário nominal (sem drift); ocorrências perdidas são agrupadas.
+        # Um reschedule() concorrente (o loop solta o lock durante fire) já pode ter inserido
+        # a próxima ocorrência: nesse caso não insere de novo (o job dispararia duas vezes)
+        base = max(nominal, datetime.now(TIMEZONE))
+        with self.condition:
+            if not job.cancelled and not self.scheduled(job):
+                self.push(job, job.next_fire_after(base))
+
+    def scheduled(self, job):
+        """Job já tem ocorrência no heap (chamar com o lock adquirido)"""
+        return any(entry[2] is job for entry in self.heap)
+
+    def run_forever(self):
+        """Loop principal: dorme exatamente até o próximo timer do heap"""
+        with self.condition:
+            while not self.stopped:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                fire_at, _, job, nominal = self.heap[0]
+                delay = fire_at - time.time()
+
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+
+                heapq.heappop(self.heap)
+                self.condition.release()
+                try:
+                    self.fire(job, fire_at, nominal)
+                finally:
+                    self.condition.acquire()
+
+    def stop(self):
+        """Interrompe o loop principal"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def jobs(self):
+        """Lista os jobs agendados em ordem de execução"""
+        with self.condition:
+            return [entry[2] for entry in sorted(self.heap)]
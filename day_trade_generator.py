@@ -8,14 +8,32 @@ import json
 import random
 import requests
 import os
+import sys
+import threading
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import settings
+from content_catalog import record_content
+from cost_tracker import BUDGET_EXHAUSTED, REPLICATE_PRICE_PER_SECOND, CostTracker
+from disk_budget import PRESSURE_DEGRADE, PRESSURE_PAUSE, open_budget, register_artifacts
+from replicate_webhooks import PredictionInbox
+from run_checkpoint import RunCheckpoint
+from streaming_prompts import stream_image_prompts
+from text_normalizer import normalize_script
+from topic_planner import TopicPlanner
 
 class DayTradeContentGenerator:
     def __init__(self):
         self.openai_api_key = os.getenv('OPENAI_API_KEY', 'SUA_OPENAI_API_KEY')
         self.replicate_api_token = os.getenv('REPLICATE_API_TOKEN', 'SEU_REPLICATE_API_TOKEN')
         
+        # Conclusão por webhook (URL pública de /webhook/replicate); sem URL, usa polling
+        self.replicate_webhook_url = os.getenv('REPLICATE_WEBHOOK_URL')
+        self.replicate_webhook_timeout = float(os.getenv('REPLICATE_WEBHOOK_TIMEOUT', '120'))
+        self.prediction_inbox = PredictionInbox() if self.replicate_webhook_url else None
+        
         # Tópicos para variação de conteúdo
         self.topics = [
             "Estratégia de Scalping para mini-índice",
@@ -35,10 +53,53 @@ class DayTradeContentGenerator:
             "MACD", "RSI", "Bandas de Bollinger", "Estocástico",
             "IFR", "Volume", "ADX", "Williams %R", "CCI", "ROC"
         ]
+        
+        # Tópico, indicador e tempos por etapa da execução atual (registrados no catálogo)
+        self.current_topic = None
+        self.current_indicator = None
+        self.planner = None
+        self.stage_timings = {}
+        
+        # Custos de tokens/GPU e orçamento (COST_DAILY_BUDGET_USD / COST_MONTHLY_BUDGET_USD)
+        self.cost_tracker = CostTracker()
+        self.item_cost = 0.0
+        self.cost_lock = threading.Lock()
+        
+        # Checkpoints por etapa: uma nova tentativa retoma a execução incompleta
+        self.checkpoint = None
+        self.max_attempts = int(os.getenv('CHECKPOINT_MAX_ATTEMPTS', '3'))
+        
+        # Orçamento de disco: registra artefatos e reduz/pausa a geração sem folga
+        self.disk_budget = open_budget('.')
+        # Quantidade e tamanho das imagens (MAX_IMAGES_PER_CONTENT, content_settings.image_size)
+        config = settings()
+        self.image_count = config.image_count
+        self.image_size = config.image_size
+        self.degraded_image_size = int(os.getenv('DISK_DEGRADED_IMAGE_SIZE', '512'))
+    
+    def next_topic(self):
+        """Próxima combinação tópico × indicador do planejador (aleatória se ele falhar)"""
+        try:
+            if self.planner is None:
+                self.planner = TopicPlanner(self.topics, self.indicators)
+            return self.planner.pick()
+        except Exception as e:
+            print(f"Erro no planejador de tópicos: {e}")
+            return random.choice(self.topics), random.choice(self.indicators)
+    
+    def market_context(self, indicator):
+        """Leitura atual do indicador (MARKET_DATA_CSV) para o roteiro citar valores reais"""
+        if not os.getenv('MARKET_DATA_CSV'):
+            return ''
+        from indicators import market_context  # numpy só quando há dados de mercado
+        reading = market_context(indicator)
+        return f"\n        - Cite a leitura atual do mercado: {reading}" if reading else ''
     
     def generate_script(self):
         """Gera um roteiro sobre day trade"""
-        topic = random.choice(self.topics)
+        topic, indicator = self.next_topic()
+        self.current_topic = topic
+        self.current_indicator = indicator
         
         headers = {
             'Authorization': f'Bearer {self.openai_api_key}',
@@ -53,6 +114,7 @@ class DayTradeContentGenerator:
         - Linguagem acessível para iniciantes
         - Conteúdo prático e direto
         - Inclua uma dica específica
+        - Use o indicador {indicator} como exemplo prático, se fizer sentido para o tema{self.market_context(indicator)}
         """
         
         data = {
@@ -65,6 +127,12 @@ class DayTradeContentGenerator:
             "temperature": 0.7
         }
         
+        model = self.model_for(data)
+        if model is None:
+            print("💸 Orçamento esgotado, roteiro não gerado")
+            return None
+        data['model'] = model
+        
         try:
             response = requests.post(
                 'https://api.openai.com/v1/chat/completions',
@@ -74,6 +142,7 @@ class DayTradeContentGenerator:
             
             if response.status_code == 200:
                 result = response.json()
+                self.track_cost('script', model, usage=result.get('usage'))
                 script = result['choices'][0]['message']['content']
                 return self.clean_text(script)
             else:
@@ -84,29 +153,39 @@ class DayTradeContentGenerator:
             print(f"Erro na requisição: {e}")
             return None
     
-    def clean_text(self, text):
-        """Limpa o texto removendo caracteres especiais"""
-        # Remove aspas externas
-        text = text.replace('"', '').replace("'", "")
-        
-        # Remove quebras de linha e múltiplos espaços
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        text = ' '.join(text.split())
-        
-        # Remove caracteres de controle
-        text = ''.join(char for char in text if ord(char) >= 32)
-        
-        return text.strip()
+    def model_for(self, data):
+        """Modelo permitido pelo orçamento (None = orçamento esgotado)"""
+        try:
+            return self.cost_tracker.choose_model(data)
+        except Exception as e:
+            print(f"Erro ao consultar orçamento: {e}")
+            return data['model']
     
-    def generate_image_prompts(self, script):
-        """Gera prompts para imagens baseados no roteiro"""
-        headers = {
-            'Authorization': f'Bearer {self.openai_api_key}',
-            'Content-Type': 'application/json'
-        }
+    def track_cost(self, stage, model, usage=None, cost_usd=None):
+        """Registra o custo de uma chamada (tokens ou valor direto) e soma ao item"""
+        try:
+            if usage is not None:
+                cost_usd = self.cost_tracker.record_usage(stage, self.current_topic, model, usage)
+            else:
+                self.cost_tracker.record_cost(stage, self.current_topic, model, cost_usd)
+        except Exception as e:
+            print(f"Erro ao registrar custo: {e}")
+            return
         
+        with self.cost_lock:
+            self.item_cost += cost_usd or 0.0
+    
+    def clean_text(self, text):
+        """Limpa o texto e aplica o limite de 500 caracteres sem nova chamada à API"""
+        return normalize_script(text)
+    
+    def image_prompts_request(self, script):
+        """Monta a requisição de chat para gerar os prompts das imagens"""
+        example = ', '.join(
+            f'{{"prompt": "prompt_{i}", "image": "image_{i}"}}' for i in range(1, self.image_count + 1)
+        )
         prompt = f"""
-        A partir do roteiro sobre day trade abaixo, crie 3 prompts em inglês para gerar imagens.
+        A partir do roteiro sobre day trade abaixo, crie {self.image_count} prompts em inglês para gerar imagens.
         
         Roteiro: {script}
         
@@ -118,18 +197,32 @@ class DayTradeContentGenerator:
         - Representar conceitos de mercado financeiro
         
         Retorne apenas um JSON no formato:
-        {{"image_prompts": [{{"prompt": "prompt_1", "image": "image_1"}}, {{"prompt": "prompt_2", "image": "image_2"}}, {{"prompt": "prompt_3", "image": "image_3"}}]}}
+        {{"image_prompts": [{example}]}}
         """
         
-        data = {
+        return {
             "model": "gpt-4o-mini",
             "messages": [
                 {"role": "system", "content": "Você é um diretor de arte especializado em imagens financeiras."},
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 400,
+            "max_tokens": max(400, 130 * self.image_count),
             "temperature": 0.7
         }
+    
+    def generate_image_prompts(self, script):
+        """Gera prompts para imagens baseados no roteiro"""
+        headers = {
+            'Authorization': f'Bearer {self.openai_api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        data = self.image_prompts_request(script)
+        model = self.model_for(data)
+        if model is None:
+            print("💸 Orçamento esgotado, prompts não gerados")
+            return None
+        data['model'] = model
         
         try:
             response = requests.post(
@@ -140,6 +233,7 @@ class DayTradeContentGenerator:
             
             if response.status_code == 200:
                 result = response.json()
+                self.track_cost('prompts', model, usage=result.get('usage'))
                 content = result['choices'][0]['message']['content']
                 
                 # Limpa e parseia o JSON
@@ -154,6 +248,32 @@ class DayTradeContentGenerator:
             print(f"Erro ao processar prompts: {e}")
             return None
     
+    def stream_image_prompts(self, script):
+        """Gera cada prompt assim que ele chega no stream"""
+        emitted = 0
+        data = self.image_prompts_request(script)
+        model = self.model_for(data)
+        if model is None:
+            print("💸 Orçamento esgotado, prompts não gerados")
+            return
+        data['model'] = model
+        
+        try:
+            for prompt_data in stream_image_prompts(
+                self.openai_api_key, data,
+                on_usage=lambda usage: self.track_cost('prompts', model, usage=usage)
+            ):
+                # Lê o stream até o fim mesmo além de image_count: o último evento traz o uso de tokens
+                if emitted < self.image_count:
+                    emitted += 1
+                    yield prompt_data
+        except Exception as e:
+            print(f"Erro no streaming de prompts: {e}")
+            
+            # Sem nenhum prompt recebido, tenta a chamada sem streaming
+            if not emitted:
+                yield from (self.generate_image_prompts(script) or [])[:self.image_count]
+    
     def generate_image(self, prompt):
         """Gera uma imagem usando a API da Replicate"""
         headers = {
@@ -164,8 +284,8 @@ class DayTradeContentGenerator:
         data = {
             "input": {
                 "prompt": f"{prompt}, professional financial trading concept, clean modern design, corporate style, blue and green color scheme",
-                "width": 1024,
-                "height": 1024,
+                "width": self.image_size,
+                "height": self.image_size,
                 "num_outputs": 1,
                 "scheduler": "K_EULER",
                 "num_inference_steps": 20,
@@ -173,6 +293,10 @@ class DayTradeContentGenerator:
             }
         }
         
+        if self.prediction_inbox:
+            data["webhook"] = self.replicate_webhook_url
+            data["webhook_events_filter"] = ["completed"]
+        
         try:
             # Inicia a geração
             response = requests.post(
@@ -185,26 +309,23 @@ class DayTradeContentGenerator:
                 prediction = response.json()
                 prediction_id = prediction['id']
                 
-                # Aguarda a conclusão
-                while True:
-                    status_response = requests.get(
-                        f'https://api.replicate.com/v1/predictions/{prediction_id}',
-                        headers=headers
-                    )
-                    
-                    if status_response.status_code == 200:
-                        status_data = status_response.json()
-                        
-                        if status_data['status'] == 'succeeded':
-                            return status_data['output'][0]
-                        elif status_data['status'] == 'failed':
-                            print("Falha na geração da imagem")
-                            return None
-                        else:
-                            time.sleep(2)  # Aguarda 2 segundos antes de verificar novamente
-                    else:
-                        print(f"Erro ao verificar status: {status_response.status_code}")
-                        return None
+                # Aguarda a conclusão: webhook quando configurado, polling como fallback
+                status_data = self.wait_webhook(prediction_id) if self.prediction_inbox else None
+                if status_data is None:
+                    status_data = self.poll_prediction(prediction_id, headers)
+                if status_data is None:
+                    return None
+                
+                if status_data['status'] == 'succeeded':
+                    # Custo por tempo de GPU informado pela Replicate
+                    predict_time = (status_data.get('metrics') or {}).get('predict_time')
+                    if predict_time:
+                        self.track_cost('images', 'replicate/stable-diffusion',
+                                        cost_usd=predict_time * REPLICATE_PRICE_PER_SECOND)
+                    return status_data['output'][0]
+                
+                print(f"Falha na geração da imagem ({status_data['status']})")
+                return None
             else:
                 print(f"Erro ao iniciar geração: {response.status_code}")
                 return None
@@ -213,6 +334,34 @@ class DayTradeContentGenerator:
             print(f"Erro na geração de imagem: {e}")
             return None
     
+    def wait_webhook(self, prediction_id):
+        """Espera a predição chegar via /webhook/replicate; None se expirar"""
+        future = self.prediction_inbox.expect(prediction_id)
+        try:
+            return future.result(timeout=self.replicate_webhook_timeout)
+        except Exception:
+            self.prediction_inbox.forget(prediction_id)
+            print(f"  ⏰ Webhook da predição {prediction_id} não chegou, consultando a API")
+            return None
+    
+    def poll_prediction(self, prediction_id, headers):
+        """Consulta a predição a cada 2 segundos até um estado final"""
+        while True:
+            status_response = requests.get(
+                f'https://api.replicate.com/v1/predictions/{prediction_id}',
+                headers=headers
+            )
+            
+            if status_response.status_code != 200:
+                print(f"Erro ao verificar status: {status_response.status_code}")
+                return None
+            
+            status_data = status_response.json()
+            if status_data['status'] in ('succeeded', 'failed', 'canceled'):
+                return status_data
+            
+            time.sleep(2)  # Aguarda 2 segundos antes de verificar novamente
+    
     def save_content(self, script, image_urls):
         """Salva o conteúdo gerado em arquivo"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -221,67 +370,215 @@ class DayTradeContentGenerator:
             "timestamp": timestamp,
             "script": script,
             "images": image_urls,
-            "topic": "Day Trade Content",
-            "status": "generated"
+            "topic": self.current_topic or "Day Trade Content",
+            "indicator": self.current_indicator,
+            "status": "generated",
+            "generator": "Replicate",
+            "stage_timings": self.stage_timings,
+            "cost_usd": round(self.item_cost, 6),
+            "run_id": self.checkpoint.run_id if self.checkpoint else None
         }
         
         filename = f"content_{timestamp}.json"
         
+        # Custo por item (metrics / GET /costs)
+        try:
+            self.cost_tracker.record_item(content["topic"], self.item_cost)
+        except Exception as e:
+            print(f"Erro ao registrar custo do item: {e}")
+        
+        # Registra no catálogo consultável (GET /content)
+        content["catalog_id"] = record_content(content, filename)
+        
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(content, f, ensure_ascii=False, indent=2)
         
+        register_artifacts(self.disk_budget, [filename])
+        
         print(f"Conteúdo salvo em: {filename}")
         return filename
     
-    def run(self):
-        """Executa o processo completo de geração de conteúdo"""
-        print("🚀 Iniciando geração de conteúdo sobre Day Trade...")
+    def process_image(self, i, prompt_data):
+        """Gera uma imagem; retorna seus metadados ou None"""
+        cached = self.checkpoint.image(i) if self.checkpoint else None
+        if cached:
+            print(f"  ♻️ Imagem {i+1} retomada do checkpoint")
+            return cached
+        
+        image_url = self.generate_image(prompt_data['prompt'])
+        
+        if not image_url:
+            print(f"  ❌ Falha na imagem {i+1}")
+            return None
+        
+        print(f"  ✅ Imagem {i+1} gerada")
+        image = {
+            "prompt": prompt_data['prompt'],
+            "url": image_url,
+            "name": prompt_data.get('image', f"image_{i+1}")
+        }
+        self.update_checkpoint(images={i: image})
+        return image
+    
+    def update_checkpoint(self, images=None, **fields):
+        """Grava saídas de etapa no checkpoint sem interromper a geração em caso de erro"""
+        if not self.checkpoint:
+            return
+        
+        try:
+            for index, image in (images or {}).items():
+                self.checkpoint.set_image(index, image)
+            with self.cost_lock:
+                fields['item_cost'] = self.item_cost
+            self.checkpoint.update(**fields)
+        except Exception as e:
+            print(f"Erro ao gravar checkpoint: {e}")
+    
+    def open_checkpoint(self, run_id=None):
+        """Retoma a execução incompleta mais recente (ou run_id) ou inicia uma nova"""
+        try:
+            checkpoint = RunCheckpoint.open('replicate', os.getenv('CHECKPOINT_DIR'), run_id)
+        except Exception as e:
+            print(f"Erro ao abrir checkpoint: {e}")
+            return None
+        
+        if checkpoint.resumed:
+            print(f"♻️ Retomando execução {checkpoint.run_id} (tentativa {checkpoint.attempts})")
+        return checkpoint
+    
+    def check_disk(self):
+        """Aplica a contrapressão de disco; retorna False se a geração deve pausar"""
+        if not self.disk_budget:
+            return True
+        
+        try:
+            pressure = self.disk_budget.ensure_headroom()
+        except Exception as e:
+            print(f"Erro ao consultar orçamento de disco: {e}")
+            return True
+        
+        if pressure == PRESSURE_PAUSE:
+            print("🛑 Sem espaço em disco mesmo após despejo, geração pausada")
+            return False
+        if pressure == PRESSURE_DEGRADE:
+            self.image_size = self.degraded_image_size
+            print(f"💾 Pouco espaço em disco, imagens em {self.image_size}x{self.image_size}")
+        return True
+    
+    def generate_content(self):
+        """Gera roteiro, prompts e imagens; retorna (script, image_urls) ou None
+        
+        Etapas já concluídas no checkpoint são reaproveitadas em vez de refeitas.
+        """
+        self.stage_timings = {}
+        self.item_cost = self.checkpoint.get('item_cost', 0.0) if self.checkpoint else 0.0
+        started = time.perf_counter()
         
-        # Gera o roteiro
-        print("📝 Gerando roteiro...")
-        script = self.generate_script()
+        # Gera o roteiro (ou retoma o da tentativa anterior, com o mesmo tópico)
+        script = self.checkpoint.get('script') if self.checkpoint else None
+        if script:
+            self.current_topic = self.checkpoint.get('topic')
+            self.current_indicator = self.checkpoint.get('indicator')
+            print(f"♻️ Roteiro retomado do checkpoint {self.checkpoint.run_id}")
+        else:
+            print("📝 Gerando roteiro...")
+            script = self.generate_script()
+            if script:
+                self.update_checkpoint(script=script, topic=self.current_topic, indicator=self.current_indicator)
+        self.stage_timings['script'] = round(time.perf_counter() - started, 3)
         
         if not script:
             print("❌ Falha ao gerar roteiro")
-            return
+            return None
         
         print(f"✅ Roteiro gerado: {script[:100]}...")
         
-        # Gera prompts para imagens
-        print("🎨 Gerando prompts para imagens...")
-        image_prompts = self.generate_image_prompts(script)
+        # Gera prompts (em streaming) e inicia cada imagem assim que seu prompt fica pronto
+        print("🎨 Gerando prompts e imagens...")
+        saved_prompts = self.checkpoint.get('prompts') if self.checkpoint else None
+        prompts = []
+        futures = []
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            for i, prompt_data in enumerate(saved_prompts or self.stream_image_prompts(script)):
+                print(f"  ✅ Prompt {i+1} recebido, iniciando imagem {i+1}...")
+                prompts.append(prompt_data)
+                futures.append(executor.submit(self.process_image, i, prompt_data))
+            if prompts and not saved_prompts:
+                self.update_checkpoint(prompts=prompts)
+            self.stage_timings['prompts'] = round(time.perf_counter() - started, 3)
         
-        if not image_prompts:
+        if not futures:
             print("❌ Falha ao gerar prompts")
-            return
+            return None
         
-        print(f"✅ {len(image_prompts)} prompts gerados")
+        image_urls = [future.result() for future in futures]
+        failed = sum(item is None for item in image_urls)
+        image_urls = [item for item in image_urls if item]
+        # Tempos acumulados desde o início (prompts e imagens se sobrepõem)
+        self.stage_timings['images'] = round(time.perf_counter() - started, 3)
         
-        # Gera as imagens
-        print("🖼️ Gerando imagens...")
-        image_urls = []
+        if not image_urls:
+            print("❌ Nenhuma imagem foi gerada com sucesso")
+            return None
         
-        for i, prompt_data in enumerate(image_prompts):
-            print(f"  Gerando imagem {i+1}/3...")
-            image_url = self.generate_image(prompt_data['prompt'])
-            
-            if image_url:
-                image_urls.append({
-                    "prompt": prompt_data['prompt'],
-                    "url": image_url,
-                    "name": prompt_data['image']
-                })
-                print(f"  ✅ Imagem {i+1} gerada")
-            else:
-                print(f"  ❌ Falha na imagem {i+1}")
+        # Imagens faltando: tenta de novo depois (só as que falharam), até CHECKPOINT_MAX_ATTEMPTS
+        if failed and self.checkpoint and self.checkpoint.attempts < self.max_attempts:
+            print(f"⏸️ {failed} imagem(ns) falharam; checkpoint {self.checkpoint.run_id} mantido para retomada")
+            return None
         
-        # Salva o conteúdo
-        if image_urls:
-            filename = self.save_content(script, image_urls)
-            print(f"🎉 Processo concluído! Arquivo: {filename}")
-        else:
-            print("❌ Nenhuma imagem foi gerada com sucesso")
+        return script, image_urls
+    
+    def run(self, run_id=None):
+        """Executa o processo completo de geração de conteúdo"""
+        print("🚀 Iniciando geração de conteúdo sobre Day Trade...")
+        
+        if not self.check_disk():
+            return None
+        
+        # Sem orçamento para a API paga, recorre ao gerador gratuito (Pollinations + corpus offline)
+        try:
+            exhausted = self.cost_tracker.budget_state() == BUDGET_EXHAUSTED
+        except Exception as e:
+            print(f"Erro ao consultar orçamento: {e}")
+            exhausted = False
+        
+        if exhausted:
+            from day_trade_generator_free import DayTradeContentGeneratorFree
+            print("💸 Orçamento esgotado, usando o gerador gratuito")
+            return DayTradeContentGeneratorFree().run()
+        
+        self.checkpoint = self.open_checkpoint(run_id)
+        try:
+            generated = self.generate_content()
+            
+            # Salva o conteúdo
+            if generated:
+                script, image_urls = generated
+                filename = self.save_content(script, image_urls)
+                if self.checkpoint:
+                    self.checkpoint.complete()
+                print(f"🎉 Processo concluído! Arquivo: {filename}")
+                return filename
+            
+            return None
+        finally:
+            # Falha ou exceção: o checkpoint fica para a próxima tentativa
+            if self.checkpoint:
+                self.checkpoint.release()
 
 if __name__ == "__main__":
     generator = DayTradeContentGenerator()
-    generator.run()
+    
+    # --resume <run_id>: retoma uma execução específica (sem ele, a incompleta mais recente)
+    run_id = sys.argv[sys.argv.index('--resume') + 1] if '--resume' in sys.argv[:-1] else None
+    
+    # --profile: perfil por amostragem da execução em logs/profiles (import só quando pedido)
+    if '--profile' in sys.argv:
+        from profiling import profile_run
+        filename = profile_run('day_trade_generator', generator.run, run_id)
+    else:
+        filename = generator.run(run_id)
+    
+    # Código de saída != 0 permite ao agendador tentar de novo (retomando o checkpoint)
+    sys.exit(0 if filename else 1)
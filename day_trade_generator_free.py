@@ -8,14 +8,70 @@ import json
 import random
 import requests
 import os
+import shutil
+import sys
+import threading
 from datetime import datetime
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from app_config import settings
+from content_catalog import record_content
+from cost_tracker import CostTracker
+from disk_budget import PRESSURE_DEGRADE, PRESSURE_PAUSE, open_budget, register_artifacts
+from fallback_corpus import default_corpus
+from image_index import default_index, dhash
+from run_checkpoint import RunCheckpoint
+from streaming_prompts import stream_image_prompts
+from text_normalizer import normalize_script
+from topic_planner import TopicPlanner
 
 class DayTradeContentGeneratorFree:
-    def __init__(self):
+    def __init__(self, output_dir='.', track_disk=True, checkpoints=True, stage_limits=None):
         self.openai_api_key = os.getenv('OPENAI_API_KEY', 'SUA_OPENAI_API_KEY')
         
+        # Diretório onde imagens e JSON são gravados (padrão: diretório atual)
+        self.output_dir = output_dir
+        
+        # Tópico/indicador da execução atual e registro do corpus offline usado no fallback
+        self.current_topic = None
+        self.current_indicator = None
+        self.planner = None
+        self.fallback_record = None
+        self.stage_timings = {}
+        
+        # Horário de publicação previsto (AAAA-MM-DDTHH:MM) dos itens do backfill por datas
+        self.scheduled_for = None
+        
+        # Custos de tokens e orçamento (COST_DAILY_BUDGET_USD / COST_MONTHLY_BUDGET_USD)
+        self.cost_tracker = CostTracker()
+        self.item_cost = 0.0
+        self.cost_lock = threading.Lock()
+        
+        # Checkpoints por etapa: uma nova tentativa retoma a execução incompleta
+        # (itens do buffer são descartáveis e não usam checkpoint)
+        self.checkpoints = checkpoints
+        self.checkpoint = None
+        self.max_attempts = int(os.getenv('CHECKPOINT_MAX_ATTEMPTS', '3'))
+        
+        # Orçamento de disco: registra artefatos e reduz/pausa a geração sem folga
+        # (itens do buffer são contabilizados pelo próprio buffer)
+        self.disk_budget = open_budget(output_dir) if track_disk else None
+        # Quantidade e tamanho das imagens (MAX_IMAGES_PER_CONTENT, content_settings.image_size)
+        config = settings()
+        self.image_count = config.image_count
+        self.image_size = config.image_size
+        self.degraded_image_size = int(os.getenv('DISK_DEGRADED_IMAGE_SIZE', '512'))
+        
+        # Limites de concorrência por etapa ('llm', 'image', 'download') compartilhados
+        # entre geradores em paralelo (backfill); sem limites, nada é restringido
+        self.stage_limits = stage_limits or {}
+        
+        # Novas tentativas (com outra seed) para imagens quase idênticas às já publicadas
+        self.dedup_retries = int(os.getenv('IMAGE_DEDUP_RETRIES', '2'))
+        
         # URLs das APIs gratuitas
         self.pollinations_image_api = "https://image.pollinations.ai/prompt/"
         
@@ -44,9 +100,30 @@ class DayTradeContentGeneratorFree:
             "IFR", "Volume", "ADX", "Williams %R", "CCI", "ROC"
         ]
     
+    def next_topic(self):
+        """Próxima combinação tópico × indicador do planejador (aleatória se ele falhar)"""
+        try:
+            if self.planner is None:
+                self.planner = TopicPlanner(self.topics, self.indicators)
+            return self.planner.pick()
+        except Exception as e:
+            print(f"Erro no planejador de tópicos: {e}")
+            return random.choice(self.topics), random.choice(self.indicators)
+    
+    def market_context(self, indicator):
+        """Leitura atual do indicador (MARKET_DATA_CSV) para o roteiro citar valores reais"""
+        if not os.getenv('MARKET_DATA_CSV'):
+            return ''
+        from indicators import market_context  # numpy só quando há dados de mercado
+        reading = market_context(indicator)
+        return f"\n        - Cite a leitura atual do mercado: {reading}" if reading else ''
+    
     def generate_script(self):
         """Gera um roteiro sobre day trade"""
-        topic = random.choice(self.topics)
+        topic, indicator = self.next_topic()
+        self.current_topic = topic
+        self.current_indicator = indicator
+        self.fallback_record = None
         
         headers = {
             'Authorization': f'Bearer {self.openai_api_key}',
@@ -61,6 +138,7 @@ class DayTradeContentGeneratorFree:
         - Linguagem acessível para iniciantes
         - Conteúdo prático e direto
         - Inclua uma dica específica
+        - Use o indicador {indicator} como exemplo prático, se fizer sentido para o tema{self.market_context(indicator)}
         - Foque em conceitos visuais que podem ser ilustrados
         """
         
@@ -74,15 +152,23 @@ class DayTradeContentGeneratorFree:
             "temperature": 0.7
         }
         
+        model = self.model_for(data)
+        if model is None:
+            print("💸 Orçamento esgotado, usando roteiro do corpus offline")
+            return self.get_fallback_script()
+        data['model'] = model
+        
         try:
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers=headers,
-                json=data
-            )
+            with self.limit('llm'):
+                response = requests.post(
+                    'https://api.openai.com/v1/chat/completions',
+                    headers=headers,
+                    json=data
+                )
             
             if response.status_code == 200:
                 result = response.json()
+                self.track_usage('script', model, result.get('usage'))
                 script = result['choices'][0]['message']['content']
                 return self.clean_text(script)
             else:
@@ -94,38 +180,41 @@ class DayTradeContentGeneratorFree:
             print(f"Erro na requisição: {e}")
             return self.get_fallback_script()
     
+    def model_for(self, data, optional=False):
+        """Modelo permitido pelo orçamento (None = usar o corpus offline)"""
+        try:
+            return self.cost_tracker.choose_model(data, optional=optional)
+        except Exception as e:
+            print(f"Erro ao consultar orçamento: {e}")
+            return data['model']
+    
+    def track_usage(self, stage, model, usage):
+        """Registra tokens e custo de uma chamada e soma ao custo do item"""
+        try:
+            cost = self.cost_tracker.record_usage(stage, self.current_topic, model, usage)
+        except Exception as e:
+            print(f"Erro ao registrar custo: {e}")
+            return
+        
+        with self.cost_lock:
+            self.item_cost += cost
+    
     def get_fallback_script(self):
-        """Roteiros de fallback caso a API falhe"""
-        fallback_scripts = [
-            "O MACD é um dos indicadores mais poderosos do day trade. Quando as linhas se cruzam acima de zero, temos um sinal de compra. Quando cruzam abaixo, sinal de venda. Use sempre com stop loss!",
-            "No scalping, velocidade é tudo! Opere apenas nos primeiros 30 minutos após a abertura. Use gráfico de 1 minuto e sempre defina seu stop antes de entrar. Lucros pequenos, mas consistentes!",
-            "Stop Loss não é opcional no day trade! Defina sempre antes de entrar na operação. Uma boa regra: nunca arrisque mais de 1% do seu capital por trade. Preserve seu dinheiro para operar outro dia!"
-        ]
-        return random.choice(fallback_scripts)
+        """Roteiro de fallback do corpus offline, pelo tópico atual (sem rede)"""
+        self.fallback_record = default_corpus.pick(self.current_topic, self.current_indicator)
+        return self.fallback_record['script']
     
     def clean_text(self, text):
-        """Limpa o texto removendo caracteres especiais"""
-        # Remove aspas externas
-        text = text.replace('"', '').replace("'", "")
-        
-        # Remove quebras de linha e múltiplos espaços
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        text = ' '.join(text.split())
-        
-        # Remove caracteres de controle
-        text = ''.join(char for char in text if ord(char) >= 32)
-        
-        return text.strip()
+        """Limpa o texto e aplica o limite de 500 caracteres sem nova chamada à API"""
+        return normalize_script(text)
     
-    def generate_image_prompts(self, script):
-        """Gera prompts para imagens baseados no roteiro"""
-        headers = {
-            'Authorization': f'Bearer {self.openai_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
+    def image_prompts_request(self, script):
+        """Monta a requisição de chat para gerar os prompts das imagens"""
+        example = ', '.join(
+            f'{{"prompt": "prompt_{i}", "image": "image_{i}"}}' for i in range(1, self.image_count + 1)
+        )
         prompt = f"""
-        A partir do roteiro sobre day trade abaixo, crie 3 prompts em inglês para gerar imagens.
+        A partir do roteiro sobre day trade abaixo, crie {self.image_count} prompts em inglês para gerar imagens.
         
         Roteiro: {script}
         
@@ -138,28 +227,46 @@ class DayTradeContentGeneratorFree:
         - Incluir elementos como gráficos, candlesticks, setas de tendência
         
         Retorne apenas um JSON no formato:
-        {{"image_prompts": [{{"prompt": "prompt_1", "image": "image_1"}}, {{"prompt": "prompt_2", "image": "image_2"}}, {{"prompt": "prompt_3", "image": "image_3"}}]}}
+        {{"image_prompts": [{example}]}}
         """
         
-        data = {
+        return {
             "model": "gpt-4o-mini",
             "messages": [
                 {"role": "system", "content": "Você é um diretor de arte especializado em imagens financeiras."},
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 400,
+            "max_tokens": max(400, 130 * self.image_count),
             "temperature": 0.7
         }
+    
+    def generate_image_prompts(self, script):
+        """Gera prompts para imagens baseados no roteiro"""
+        headers = {
+            'Authorization': f'Bearer {self.openai_api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        data = self.image_prompts_request(script)
+        
+        # Prompts têm alternativa em cache: deixam de chamar a API já no modo economia
+        model = self.model_for(data, optional=True)
+        if model is None:
+            print("💸 Orçamento em economia, usando prompts do corpus offline")
+            return self.get_fallback_prompts()
+        data['model'] = model
         
         try:
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers=headers,
-                json=data
-            )
+            with self.limit('llm'):
+                response = requests.post(
+                    'https://api.openai.com/v1/chat/completions',
+                    headers=headers,
+                    json=data
+                )
             
             if response.status_code == 200:
                 result = response.json()
+                self.track_usage('prompts', model, result.get('usage'))
                 content = result['choices'][0]['message']['content']
                 
                 # Limpa e parseia o JSON
@@ -174,24 +281,40 @@ class DayTradeContentGeneratorFree:
             print(f"Erro ao processar prompts: {e}")
             return self.get_fallback_prompts()
     
+    def stream_image_prompts(self, script):
+        """Gera cada prompt assim que ele chega no stream (fallback se nada chegar)"""
+        emitted = 0
+        data = self.image_prompts_request(script)
+        model = self.model_for(data, optional=True)
+        
+        if model is None:
+            print("💸 Orçamento em economia, usando prompts do corpus offline")
+        else:
+            data['model'] = model
+            try:
+                with self.limit('llm'):
+                    for prompt_data in stream_image_prompts(
+                        self.openai_api_key, data,
+                        on_usage=lambda usage: self.track_usage('prompts', model, usage)
+                    ):
+                        # Lê o stream até o fim mesmo além de image_count: o último evento traz o uso de tokens
+                        if emitted < self.image_count:
+                            emitted += 1
+                            yield prompt_data
+            except Exception as e:
+                print(f"Erro no streaming de prompts: {e}")
+        
+        # Completa com prompts de fallback se o stream terminou antes de image_count prompts
+        if emitted < self.image_count:
+            for prompt_data in self.get_fallback_prompts()[emitted:self.image_count]:
+                yield prompt_data
+    
     def get_fallback_prompts(self):
-        """Prompts de fallback para imagens"""
-        return [
-            {
-                "prompt": "Professional financial trading concept, modern stock market chart with candlesticks, blue and green color scheme, corporate style, clean design",
-                "image": "image_1"
-            },
-            {
-                "prompt": "Trading indicators dashboard, MACD and RSI charts, professional financial interface, blue corporate colors, modern design",
-                "image": "image_2"
-            },
-            {
-                "prompt": "Day trading workspace, multiple monitors with financial charts, professional trader setup, clean modern office, blue lighting",
-                "image": "image_3"
-            }
-        ]
+        """Prompts de fallback do corpus offline, com imagens pré-renderizadas quando houver"""
+        record = self.fallback_record or default_corpus.pick(self.current_topic, self.current_indicator)
+        return [dict(prompt_data) for prompt_data in record['image_prompts']]
     
-    def generate_image_pollinations(self, prompt):
+    def generate_image_pollinations(self, prompt, seed=None):
         """Gera uma imagem usando a API gratuita Pollinations"""
         try:
             # Adiciona elementos específicos para melhorar a qualidade
@@ -201,7 +324,9 @@ class DayTradeContentGeneratorFree:
             encoded_prompt = urllib.parse.quote(enhanced_prompt)
             
             # Constrói a URL da API
-            image_url = f"{self.pollinations_image_api}{encoded_prompt}?width=1024&height=1024&model=flux&enhance=true"
+            image_url = f"{self.pollinations_image_api}{encoded_prompt}?width={self.image_size}&height={self.image_size}&model=flux&enhance=true"
+            if seed is not None:
+                image_url += f"&seed={seed}"
             
             print(f"  Gerando imagem via Pollinations...")
             print(f"  URL: {image_url}")
@@ -214,16 +339,24 @@ class DayTradeContentGeneratorFree:
             return None
     
     def download_image(self, image_url, filename):
-        """Baixa uma imagem da URL"""
+        """Baixa uma imagem da URL
+        
+        A Pollinations renderiza durante a requisição: a espera pelos cabeçalhos
+        conta na etapa 'image' e a transferência do corpo na etapa 'download'.
+        """
         try:
-            response = requests.get(image_url, timeout=30)
+            with self.limit('image'):
+                response = requests.get(image_url, timeout=30, stream=True)
             
             if response.status_code == 200:
+                with self.limit('download'):
+                    content = response.content
                 with open(filename, 'wb') as f:
-                    f.write(response.content)
+                    f.write(content)
                 print(f"  ✅ Imagem salva: {filename}")
                 return filename
             else:
+                response.close()
                 print(f"  ❌ Erro ao baixar imagem: {response.status_code}")
                 return None
                 
@@ -239,89 +372,266 @@ class DayTradeContentGeneratorFree:
             "timestamp": timestamp,
             "script": script,
             "images": image_data,
-            "topic": "Day Trade Content",
+            "topic": self.current_topic or "Day Trade Content",
+            "indicator": self.current_indicator,
+            "scheduled_for": self.scheduled_for,
             "status": "generated",
             "generator": "Pollinations AI (Free)",
-            "api_used": "pollinations.ai"
+            "api_used": "pollinations.ai",
+            "stage_timings": self.stage_timings,
+            "cost_usd": round(self.item_cost, 6),
+            "run_id": self.checkpoint.run_id if self.checkpoint else None
         }
         
-        filename = f"content_{timestamp}.json"
+        filename = os.path.join(self.output_dir, f"content_{timestamp}.json")
+        
+        # Custo por item (metrics / GET /costs)
+        try:
+            self.cost_tracker.record_item(content["topic"], self.item_cost)
+        except Exception as e:
+            print(f"Erro ao registrar custo do item: {e}")
+        
+        # Registra no catálogo consultável (GET /content)
+        content["catalog_id"] = record_content(content, filename)
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(content, f, ensure_ascii=False, indent=2)
         
+        register_artifacts(self.disk_budget, [filename] + [image.get('local_file') for image in image_data])
+        
         print(f"📄 Conteúdo salvo em: {filename}")
         return filename
     
-    def run(self):
-        """Executa o processo completo de geração de conteúdo"""
-        print("🚀 Iniciando geração de conteúdo sobre Day Trade (Versão Gratuita)...")
-        print("🔧 Usando Pollinations AI para geração de imagens")
+    def process_image(self, i, prompt_data):
+        """Gera e baixa uma imagem; retorna seus metadados ou None"""
+        cached = self.checkpoint.image(i) if self.checkpoint else None
+        if cached:
+            print(f"  ♻️ Imagem {i+1} retomada do checkpoint")
+            return cached
+        
+        # Gera a URL da imagem
+        image_url = self.generate_image_pollinations(prompt_data['prompt'])
         
-        # Gera o roteiro
-        print("📝 Gerando roteiro...")
-        script = self.generate_script()
+        if not image_url:
+            print(f"  ❌ Falha na imagem {i+1}")
+            return None
+        
+        # Baixa a imagem (ou copia a versão pré-renderizada do corpus offline)
+        filename = os.path.join(self.output_dir, f"image_{i+1}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
+        if prompt_data.get('local_file'):
+            local_file = shutil.copyfile(prompt_data['local_file'], filename)
+        else:
+            local_file = self.download_image(image_url, filename)
+        
+        # Imagens do corpus offline se repetem por natureza e não podem cair na renderização
+        # pela rede, então ficam fora da deduplicação
+        if local_file and self.dedup_retries > 0 and not prompt_data.get('local_file'):
+            image_url, local_file = self.ensure_unique_image(i, prompt_data['prompt'], image_url, local_file)
+        
+        if local_file:
+            print(f"  ✅ Imagem {i+1} gerada e salva")
+        else:
+            # Mesmo se o download falhar, mantém a URL
+            print(f"  ⚠️ Imagem {i+1} gerada (URL disponível, download falhou)")
+        
+        image = {
+            "prompt": prompt_data['prompt'],
+            "url": image_url,
+            "local_file": local_file,
+            "name": prompt_data.get('image', f"image_{i+1}")
+        }
+        
+        # Só imagens baixadas são definitivas; sem arquivo, a próxima tentativa refaz
+        if local_file:
+            self.update_checkpoint(images={i: image})
+        return image
+    
+    def ensure_unique_image(self, i, prompt, image_url, local_file):
+        """Regenera com outra seed enquanto a imagem for quase idêntica a uma já publicada"""
+        for attempt in range(self.dedup_retries + 1):
+            value = dhash(local_file)
+            if value is None:
+                break
+            
+            match = default_index.check_and_add(value)
+            if match is None:
+                break
+            
+            if attempt == self.dedup_retries:
+                print(f"  ⚠️ Imagem {i+1} ainda parecida com uma anterior (distância {match[0]}), mantida")
+                break
+            
+            print(f"  🔁 Imagem {i+1} quase idêntica a uma anterior (distância {match[0]}), nova seed...")
+            image_url = self.generate_image_pollinations(prompt, seed=random.randint(1, 2**31 - 1))
+            local_file = self.download_image(image_url, local_file)
+            if not local_file:
+                break
+        
+        return image_url, local_file
+    
+    def generate_content(self):
+        """Gera roteiro, prompts e imagens; retorna (script, image_data) ou None
+        
+        Etapas já concluídas no checkpoint são reaproveitadas em vez de refeitas.
+        """
+        self.stage_timings = {}
+        self.item_cost = self.checkpoint.get('item_cost', 0.0) if self.checkpoint else 0.0
+        started = time.perf_counter()
+        
+        # Gera o roteiro (ou retoma o da tentativa anterior, com o mesmo tópico)
+        script = self.checkpoint.get('script') if self.checkpoint else None
+        if script:
+            self.current_topic = self.checkpoint.get('topic')
+            self.current_indicator = self.checkpoint.get('indicator')
+            self.fallback_record = None
+            print(f"♻️ Roteiro retomado do checkpoint {self.checkpoint.run_id}")
+        else:
+            print("📝 Gerando roteiro...")
+            script = self.generate_script()
+            if script:
+                self.update_checkpoint(script=script, topic=self.current_topic, indicator=self.current_indicator)
+        self.stage_timings['script'] = round(time.perf_counter() - started, 3)
         
         if not script:
             print("❌ Falha ao gerar roteiro")
-            return
+            return None
         
         print(f"✅ Roteiro gerado: {script[:100]}...")
         
-        # Gera prompts para imagens
-        print("🎨 Gerando prompts para imagens...")
-        image_prompts = self.generate_image_prompts(script)
+        # Gera prompts (em streaming) e inicia cada imagem assim que seu prompt fica pronto
+        print("🎨 Gerando prompts e imagens com Pollinations AI...")
+        saved_prompts = self.checkpoint.get('prompts') if self.checkpoint else None
+        prompts = []
+        futures = []
         
-        if not image_prompts:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            for i, prompt_data in enumerate(saved_prompts or self.stream_image_prompts(script)):
+                print(f"  ✅ Prompt {i+1} recebido, iniciando imagem {i+1}...")
+                prompts.append(prompt_data)
+                futures.append(executor.submit(self.process_image, i, prompt_data))
+            if prompts and not saved_prompts:
+                self.update_checkpoint(prompts=prompts)
+            self.stage_timings['prompts'] = round(time.perf_counter() - started, 3)
+        
+        if not futures:
             print("❌ Falha ao gerar prompts")
+            return None
+        
+        image_data = [future.result() for future in futures]
+        # Download falho conta como incompleto (a imagem ainda pode ser obtida na retomada)
+        failed = sum(item is None or not item.get('local_file') for item in image_data)
+        image_data = [item for item in image_data if item]
+        # Tempos acumulados desde o início (prompts e imagens se sobrepõem)
+        self.stage_timings['images'] = round(time.perf_counter() - started, 3)
+        
+        if not image_data:
+            print("❌ Nenhuma imagem foi gerada com sucesso")
+            return None
+        
+        # Imagens faltando: tenta de novo depois (só as que falharam), até CHECKPOINT_MAX_ATTEMPTS
+        if failed and self.checkpoint and self.checkpoint.attempts < self.max_attempts:
+            print(f"⏸️ {failed} imagem(ns) falharam; checkpoint {self.checkpoint.run_id} mantido para retomada")
+            return None
+        
+        return script, image_data
+    
+    def update_checkpoint(self, images=None, **fields):
+        """Grava saídas de etapa no checkpoint sem interromper a geração em caso de erro"""
+        if not self.checkpoint:
             return
         
-        print(f"✅ {len(image_prompts)} prompts gerados")
+        try:
+            for index, image in (images or {}).items():
+                self.checkpoint.set_image(index, image)
+            with self.cost_lock:
+                fields['item_cost'] = self.item_cost
+            self.checkpoint.update(**fields)
+        except Exception as e:
+            print(f"Erro ao gravar checkpoint: {e}")
+    
+    def limit(self, stage):
+        """Limite de concorrência da etapa (contexto nulo quando não configurado)"""
+        return self.stage_limits.get(stage) or nullcontext()
+    
+    def checkpoint_dir(self):
+        """Diretório dos checkpoints (CHECKPOINT_DIR ou output_dir/checkpoints)"""
+        return os.getenv('CHECKPOINT_DIR') or os.path.join(self.output_dir, 'checkpoints')
+    
+    def open_checkpoint(self, run_id=None, create=False):
+        """Retoma a execução incompleta mais recente (ou run_id) ou inicia uma nova"""
+        if not self.checkpoints:
+            return None
+        
+        try:
+            checkpoint = RunCheckpoint.open('free', self.checkpoint_dir(), run_id, create)
+        except Exception as e:
+            print(f"Erro ao abrir checkpoint: {e}")
+            return None
+        
+        if checkpoint.resumed:
+            print(f"♻️ Retomando execução {checkpoint.run_id} (tentativa {checkpoint.attempts})")
+        return checkpoint
+    
+    def check_disk(self):
+        """Aplica a contrapressão de disco; retorna False se a geração deve pausar"""
+        if not self.disk_budget:
+            return True
+        
+        try:
+            pressure = self.disk_budget.ensure_headroom()
+        except Exception as e:
+            print(f"Erro ao consultar orçamento de disco: {e}")
+            return True
+        
+        if pressure == PRESSURE_PAUSE:
+            print("🛑 Sem espaço em disco mesmo após despejo, geração pausada")
+            return False
+        if pressure == PRESSURE_DEGRADE:
+            self.image_size = self.degraded_image_size
+            print(f"💾 Pouco espaço em disco, imagens em {self.image_size}x{self.image_size}")
+        return True
+    
+    def run(self, run_id=None, create=False):
+        """Executa o processo completo de geração de conteúdo"""
+        print("🚀 Iniciando geração de conteúdo sobre Day Trade (Versão Gratuita)...")
+        print("🔧 Usando Pollinations AI para geração de imagens")
         
-        # Gera as imagens
-        print("🖼️ Gerando imagens com Pollinations AI...")
-        image_data = []
+        if not self.check_disk():
+            return None
         
-        for i, prompt_data in enumerate(image_prompts):
-            print(f"  Gerando imagem {i+1}/3...")
+        self.checkpoint = self.open_checkpoint(run_id, create)
+        try:
+            generated = self.generate_content()
             
-            # Gera a URL da imagem
-            image_url = self.generate_image_pollinations(prompt_data['prompt'])
+            # Salva o conteúdo
+            if generated:
+                script, image_data = generated
+                filename = self.save_content(script, image_data)
+                if self.checkpoint:
+                    self.checkpoint.complete()
+                print(f"🎉 Processo concluído! Arquivo: {filename}")
+                print(f"📊 Imagens geradas: {len(image_data)}")
+                print("💡 Dica: As imagens estão disponíveis via URL mesmo se o download falhar")
+                return filename
             
-            if image_url:
-                # Baixa a imagem
-                filename = f"image_{i+1}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                local_file = self.download_image(image_url, filename)
-                
-                if local_file:
-                    image_data.append({
-                        "prompt": prompt_data['prompt'],
-                        "url": image_url,
-                        "local_file": local_file,
-                        "name": prompt_data['image']
-                    })
-                    print(f"  ✅ Imagem {i+1} gerada e salva")
-                else:
-                    # Mesmo se o download falhar, mantém a URL
-                    image_data.append({
-                        "prompt": prompt_data['prompt'],
-                        "url": image_url,
-                        "local_file": None,
-                        "name": prompt_data['image']
-                    })
-                    print(f"  ⚠️ Imagem {i+1} gerada (URL disponível, download falhou)")
-            else:
-                print(f"  ❌ Falha na imagem {i+1}")
-        
-        # Salva o conteúdo
-        if image_data:
-            filename = self.save_content(script, image_data)
-            print(f"🎉 Processo concluído! Arquivo: {filename}")
-            print(f"📊 Imagens geradas: {len(image_data)}")
-            print("💡 Dica: As imagens estão disponíveis via URL mesmo se o download falhar")
-        else:
-            print("❌ Nenhuma imagem foi gerada com sucesso")
+            return None
+        finally:
+            # Falha ou exceção: o checkpoint fica para a próxima tentativa
+            if self.checkpoint:
+                self.checkpoint.release()
 
 if __name__ == "__main__":
     generator = DayTradeContentGeneratorFree()
-    generator.run()
+    
+    # --resume <run_id>: retoma uma execução específica (sem ele, a incompleta mais recente)
+    run_id = sys.argv[sys.argv.index('--resume') + 1] if '--resume' in sys.argv[:-1] else None
+    
+    # --profile: perfil por amostragem da execução em logs/profiles (import só quando pedido)
+    if '--profile' in sys.argv:
+        from profiling import profile_run
+        filename = profile_run('day_trade_generator_free', generator.run, run_id)
+    else:
+        filename = generator.run(run_id)
+    
+    # Código de saída != 0 permite ao agendador tentar de novo (retomando o checkpoint)
+    sys.exit(0 if filename else 1)
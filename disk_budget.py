@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Orçamento de Disco do Conteúdo Gerado
+Registro incremental (SQLite) do tamanho de cada artefato com total mantido por
+triggers, despejo LRU (apenas originais já sincronizados com o Drive) e
+contrapressão para a geração: resolução reduzida ou pausa quando falta espaço
+"""
+
+import fnmatch
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+DEFAULT_ROOT = '/app/generated_content'
+DEFAULT_DB_NAME = 'disk_budget.db'
+MB = 1024 * 1024
+
+PRESSURE_OK = 'ok'
+PRESSURE_DEGRADE = 'degrade'
+PRESSURE_PAUSE = 'pause'
+
+# Arquivos que são artefatos de conteúdo (o resto do volume — bancos, índices, logs — nunca é despejado)
+ARTIFACT_PATTERNS = ('content_*.json', 'image_*.jpg', 'image_*.jpeg', 'image_*.png', 'image_*.webp')
+# Itens prontos do buffer contam como um artefato (diretório) cada
+BUFFER_ITEM_PATTERN = 'item_*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_artifacts_eviction ON artifacts (synced DESC, last_access);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, bytes) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS artifacts_insert AFTER INSERT ON artifacts BEGIN
+    UPDATE totals SET bytes = bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS artifacts_delete AFTER DELETE ON artifacts BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS artifacts_resize AFTER UPDATE OF size ON artifacts BEGIN
+    UPDATE totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 1;
+END;
+"""
+
+
+def path_size(path):
+    """Tamanho em bytes de um arquivo ou diretório (None se não existir)"""
+    try:
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+    except OSError:
+        return None
+
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                continue
+    return total
+
+
+def is_artifact(name):
+    """Verifica se o nome corresponde a um artefato de conteúdo"""
+    return any(fnmatch.fnmatch(name, pattern) for pattern in ARTIFACT_PATTERNS)
+
+
+class DiskBudget:
+    def __init__(self, root=None, quota_bytes=0, db_path=None,
+                 degrade_headroom=500 * MB, pause_headroom=100 * MB):
+        self.root = os.path.abspath(root or DEFAULT_ROOT)
+        self.db_path = db_path or os.path.join(self.root, DEFAULT_DB_NAME)
+        self.quota_bytes = quota_bytes  # 0 = sem cota, vale só o espaço livre do disco
+        self.degrade_headroom = degrade_headroom
+        self.pause_headroom = pause_headroom
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            empty = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0] == 0
+
+        # Primeira execução em um volume já populado: inventário único
+        if empty:
+            self.reconcile()
+
+    @classmethod
+    def from_env(cls, default_root=None):
+        """Cria o orçamento a partir das variáveis de ambiente"""
+        root = os.getenv('DISK_BUDGET_ROOT') or os.getenv('CONTENT_DIR') or default_root or DEFAULT_ROOT
+        return cls(
+            root,
+            quota_bytes=int(float(os.getenv('DISK_QUOTA_MB', '0')) * MB),
+            db_path=os.getenv('DISK_BUDGET_DB'),
+            degrade_headroom=int(float(os.getenv('DISK_DEGRADE_HEADROOM_MB', '500')) * MB),
+            pause_headroom=int(float(os.getenv('DISK_PAUSE_HEADROOM_MB', '100')) * MB)
+        )
+
+    def connect(self):
+        """Abre uma conexão (uma por operação)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def register(self, path, synced=False):
+        """Registra (ou atualiza) um artefato recém-gravado; retorna seu tamanho"""
+        path = os.path.abspath(path)
+        size = path_size(path)
+        if size is None:
+            return 0
+
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "INSERT INTO artifacts (path, size, last_access, synced) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET size = excluded.size, "
+                "last_access = excluded.last_access, synced = max(synced, excluded.synced)",
+                (path, size, time.time(), int(synced))
+            )
+        return size
+
+    def touch(self, path):
+        """Marca um acesso ao artefato (posição no LRU)"""
+        with closing(self.connect()) as conn:
+            conn.execute("UPDATE artifacts SET last_access = ? WHERE path = ?",
+                         (time.time(), os.path.abspath(path)))
+
+    def rename(self, source, target):
+        """Acompanha um artefato movido (ex.: item do buffer entregue)"""
+        with closing(self.connect()) as conn:
+            conn.execute("DELETE FROM artifacts WHERE path = ?", (os.path.abspath(target),))
+            conn.execute("UPDATE artifacts SET path = ?, last_access = ? WHERE path = ?",
+                         (os.path.abspath(target), time.time(), os.path.abspath(source)))
+
+    def forget(self, path):
+        """Remove do registro um artefato apagado por outro componente"""
+        with closing(self.connect()) as conn:
+            conn.execute("DELETE FROM artifacts WHERE path = ?", (os.path.abspath(path),))
+
+    def mark_synced(self, paths):
+        """Marca artefatos como já enviados ao Google Drive (despejados primeiro)"""
+        with closing(self.connect()) as conn:
+            cursor = conn.executemany(
+                "UPDATE artifacts SET synced = 1 WHERE path = ?",
+                [(os.path.abspath(os.path.join(self.root, path)),) for path in paths]
+            )
+            return cursor.rowcount
+
+    def used_bytes(self):
+        """Bytes ocupados pelos artefatos registrados (O(1), sem varrer o disco)"""
+        with closing(self.connect()) as conn:
+            return conn.execute("SELECT bytes FROM totals WHERE id = 1").fetchone()['bytes']
+
+    def free_bytes(self):
+        """Espaço livre no sistema de arquivos do volume"""
+        stat = os.statvfs(self.root)
+        return stat.f_frsize * stat.f_bavail
+
+    def headroom(self):
+        """Folga atual: o menor entre a cota restante e o espaço livre no disco"""
+        free = self.free_bytes()
+        if self.quota_bytes:
+            return min(self.quota_bytes - self.used_bytes(), free)
+        return free
+
+    def pressure(self):
+        """Nível de contrapressão para a geração: ok, degrade ou pause"""
+        headroom = self.headroom()
+        if headroom < self.pause_headroom:
+            return PRESSURE_PAUSE
+        if headroom < self.degrade_headroom:
+            return PRESSURE_DEGRADE
+        return PRESSURE_OK
+
+    def evict(self, needed_bytes, exclude=()):
+        """Despeja artefatos já sincronizados com o Drive, em ordem LRU, até liberar needed_bytes
+
+        Conteúdo ainda não sincronizado e os caminhos em exclude (recém-registrados) nunca
+        são despejados automaticamente. Se os sincronizados não cobrem a falta (disco
+        ocupado por outros arquivos do host), nada é apagado: a contrapressão pausa a geração.
+        """
+        exclude = {os.path.abspath(path) for path in exclude if path}
+        with closing(self.connect()) as conn:
+            evictable = sum(row['size'] for row in conn.execute("SELECT path, size FROM artifacts WHERE synced = 1")
+                            if row['path'] not in exclude)
+        if evictable < needed_bytes:
+            logging.warning(
+                f"⚠️ Despejo não recupera a folga: faltam {needed_bytes / MB:.1f} MB e só "
+                f"{evictable / MB:.1f} MB sincronizados podem ser liberados; nada foi apagado"
+            )
+            return 0
+
+        freed, removed = 0, 0
+        while freed < needed_bytes:
+            # Seleção e remoção do registro na mesma transação: processos não despejam em dobro
+            with closing(self.connect()) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    "SELECT path, size FROM artifacts WHERE synced = 1 ORDER BY last_access LIMIT ?",
+                    (50 + len(exclude),)
+                ).fetchall()
+                batch, batch_bytes = [], 0
+                for row in rows:
+                    if freed + batch_bytes >= needed_bytes:
+                        break
+                    if row['path'] in exclude:
+                        continue
+                    batch.append(row)
+                    batch_bytes += row['size']
+                conn.executemany("DELETE FROM artifacts WHERE path = ?", [(row['path'],) for row in batch])
+                conn.execute("COMMIT")
+
+            if not batch:
+                break
+
+            for row in batch:
+                if os.path.isdir(row['path']):
+                    shutil.rmtree(row['path'], ignore_errors=True)
+                else:
+                    try:
+                        os.remove(row['path'])
+                    except OSError:
+                        pass
+                freed += row['size']
+                removed += 1
+
+        if removed:
+            logging.info(f"🧹 {removed} artefato(s) sincronizado(s) despejado(s), {freed / MB:.1f} MB liberados")
+        return freed
+
+    def ensure_headroom(self, exclude=()):
+        """Despeja até recuperar a folga de degradação; retorna a pressão resultante"""
+        headroom = self.headroom()
+        if headroom < self.degrade_headroom:
+            self.evict(self.degrade_headroom - headroom, exclude)
+        return self.pressure()
+
+    def reconcile(self):
+        """Inventário completo do volume (primeira execução e correção diária de desvios)
+
+        O caminho normal é incremental (register/forget); esta varredura só corrige
+        arquivos gravados ou apagados fora do registro.
+        """
+        found = {}
+        for directory, subdirs, files in os.walk(self.root):
+            for name in list(subdirs):
+                if fnmatch.fnmatch(name, BUFFER_ITEM_PATTERN):
+                    found[os.path.join(directory, name)] = None
+                    subdirs.remove(name)
+                elif name.startswith('.'):
+                    subdirs.remove(name)  # itens do buffer em construção
+            for name in files:
+                if is_artifact(name):
+                    found[os.path.join(directory, name)] = None
+
+        with closing(self.connect()) as conn:
+            known = {row['path'] for row in conn.execute("SELECT path FROM artifacts")}
+
+        missing = known - set(found)
+        added = 0
+        for path in found:
+            if path in known:
+                continue
+            size = path_size(path)
+            if size is None:
+                continue
+            with closing(self.connect()) as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO artifacts (path, size, last_access) VALUES (?, ?, ?)",
+                    (path, size, os.path.getmtime(path))
+                )
+            added += 1
+
+        with closing(self.connect()) as conn:
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path in missing])
+
+        if added or missing:
+            logging.info(f"📏 Orçamento de disco reconciliado: +{added} / -{len(missing)} artefato(s)")
+        return added, len(missing)
+
+    def stats(self):
+        """Resumo do orçamento (status e métricas)"""
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS artifacts, COALESCE(SUM(synced), 0) AS synced FROM artifacts"
+            ).fetchone()
+        return {
+            'used_mb': round(self.used_bytes() / MB, 1),
+            'quota_mb': round(self.quota_bytes / MB, 1) if self.quota_bytes else None,
+            'free_mb': round(self.free_bytes() / MB, 1),
+            'headroom_mb': round(self.headroom() / MB, 1),
+            'pressure': self.pressure(),
+            'artifacts': row['artifacts'],
+            'synced': row['synced']
+        }
+
+
+def open_budget(default_root=None):
+    """Orçamento padrão do processo, ou None se o volume não estiver acessível"""
+    try:
+        return DiskBudget.from_env(default_root)
+    except Exception as e:
+        logging.error(f"Erro ao abrir orçamento de disco: {e}")
+        return None
+
+
+def register_artifacts(budget, paths):
+    """Registra artefatos e aplica o orçamento sem interromper a geração em caso de erro
+
+    Os caminhos registrados nesta chamada acabaram de ser gravados ou entregues e
+    nunca entram no despejo que ela dispara.
+    """
+    if budget is None:
+        return
+    paths = [path for path in paths if path]
+    try:
+        for path in paths:
+            budget.register(path)
+        budget.ensure_headroom(exclude=paths)
+    except Exception as e:
+        logging.error(f"Erro ao atualizar orçamento de disco: {e}")
+
+
+if __name__ == "__main__":
+    budget = DiskBudget.from_env()
+    if len(sys.argv) > 1 and sys.argv[1] == 'reconcile':
+        budget.reconcile()
+    for key, value in budget.stats().items():
+        print(f"  {key}: {value}")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Corpus Offline de Fallback
+Roteiros e prompts indexados por tópico e indicador, com imagens pré-baixadas,
+carregados sob demanda via índice em memória mapeada (mmap)
+"""
+
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fallback_data')
+CORPUS_FILE = 'corpus.jsonl'
+INDEX_FILE = 'corpus.idx'
+
+INDEX_MAGIC = b'DTFC'
+# Cabeçalho: magic, tamanho do cabeçalho JSON; entradas: tópico, indicador, offset, tamanho
+HEADER_STRUCT = struct.Struct('<4sI')
+ENTRY_STRUCT = struct.Struct('<HHQI')
+
+
+def build_index(corpus_dir=CORPUS_DIR):
+    """Gera o índice binário ordenado por (tópico, indicador) a partir do JSONL"""
+    corpus_path = os.path.join(corpus_dir, CORPUS_FILE)
+    topics, indicators, entries = [], [], []
+
+    with open(corpus_path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                topic = record.get('topic', '')
+                indicator = record.get('indicator', '')
+
+                if topic not in topics:
+                    topics.append(topic)
+                if indicator not in indicators:
+                    indicators.append(indicator)
+
+                entries.append((topics.index(topic), indicators.index(indicator), offset, len(line)))
+            offset += len(line)
+
+    entries.sort()
+    header = json.dumps({'topics': topics, 'indicators': indicators}, ensure_ascii=False).encode('utf-8')
+
+    tmp_path = os.path.join(corpus_dir, f"{INDEX_FILE}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER_STRUCT.pack(INDEX_MAGIC, len(header)))
+        f.write(header)
+        for entry in entries:
+            f.write(ENTRY_STRUCT.pack(*entry))
+
+    os.replace(tmp_path, os.path.join(corpus_dir, INDEX_FILE))
+    return len(entries)
+
+
+class FallbackCorpus:
+    def __init__(self, corpus_dir=CORPUS_DIR):
+        self.corpus_dir = corpus_dir
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Mapeia índice e corpus na primeira consulta (startup continua barato)"""
+        if self.loaded:
+            return
+
+        with self.lock:
+            if self.loaded:
+                return
+
+            corpus_path = os.path.join(self.corpus_dir, CORPUS_FILE)
+            index_path = os.path.join(self.corpus_dir, INDEX_FILE)
+
+            # Reconstrói o índice se ele não existir ou estiver desatualizado
+            if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(corpus_path):
+                build_index(self.corpus_dir)
+
+            with open(index_path, 'rb') as f:
+                self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(corpus_path, 'rb') as f:
+                self.corpus = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, header_size = HEADER_STRUCT.unpack_from(self.index, 0)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"Índice de fallback inválido: {index_path}")
+
+            header_end = HEADER_STRUCT.size + header_size
+            header = json.loads(self.index[HEADER_STRUCT.size:header_end].decode('utf-8'))
+            self.topic_ids = {name: i for i, name in enumerate(header['topics'])}
+            self.indicator_ids = {name: i for i, name in enumerate(header['indicators'])}
+            self.entries_start = header_end
+            self.entry_count = (len(self.index) - header_end) // ENTRY_STRUCT.size
+            self.loaded = True
+
+    def entry(self, position):
+        """Lê a entrada do índice na posição informada"""
+        return ENTRY_STRUCT.unpack_from(self.index, self.entries_start + position * ENTRY_STRUCT.size)
+
+    def lower_bound(self, key):
+        """Busca binária pela primeira entrada com (tópico, indicador) >= key"""
+        low, high = 0, self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[:len(key)] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def positions(self, topic=None, indicator=None):
+        """Posições do índice que casam com tópico e/ou indicador"""
+        topic_id = self.topic_ids.get(topic) if topic is not None else None
+        indicator_id = self.indicator_ids.get(indicator) if indicator is not None else None
+
+        if topic_id is not None:
+            key = (topic_id,) if indicator_id is None else (topic_id, indicator_id)
+            start = self.lower_bound(key)
+            end = self.lower_bound(key[:-1] + (key[-1] + 1,))
+            return range(start, end)
+
+        if indicator_id is not None:
+            return [i for i in range(self.entry_count) if self.entry(i)[1] == indicator_id]
+
+        return range(self.entry_count)
+
+    def record(self, position):
+        """Decodifica o registro JSONL apontado pela entrada"""
+        _, _, offset, length = self.entry(position)
+        record = json.loads(self.corpus[offset:offset + length].decode('utf-8'))
+
+        # Resolve imagens pré-baixadas; ausentes ficam sem local_file
+        for prompt_data in record.get('image_prompts', []):
+            local_file = prompt_data.get('local_file')
+            if local_file:
+                path = os.path.join(self.corpus_dir, local_file)
+                prompt_data['local_file'] = path if os.path.exists(path) else None
+
+        return record
+
+    def pick(self, topic=None, indicator=None):
+        """Escolhe um registro, do mais específico (tópico + indicador) ao mais geral"""
+        self.load()
+
+        fallbacks = ((topic, indicator), (topic, None), (None, indicator), (None, None))
+        for criteria in dict.fromkeys(fallbacks):
+            candidates = self.positions(*criteria)
+            if len(candidates):
+                return self.record(random.choice(candidates))
+
+        return None
+
+
+default_corpus = FallbackCorpus()
+
+
+def prefetch_images(corpus_dir=CORPUS_DIR):
+    """Baixa as imagens do corpus (executar online; o modo degradado não usa rede)"""
+    import urllib.parse
+    import requests
+
+    images_dir = os.path.join(corpus_dir, 'images')
+    os.makedirs(images_dir, exist_ok=True)
+
+    with open(os.path.join(corpus_dir, CORPUS_FILE), 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    for record in records:
+        for prompt_data in record['image_prompts']:
+            path = os.path.join(corpus_dir, prompt_data['local_file'])
+            if os.path.exists(path):
+                continue
+
+            url = f"https://image.pollinations.ai/prompt/{urllib.parse.quote(prompt_data['prompt'])}?width=1024&height=1024&model=flux"
+            try:
+                response = requests.get(url, timeout=120)
+            except requests.RequestException as e:
+                # Não interrompe o build da imagem: a imagem faltante é buscada em tempo de execução
+                print(f"❌ Erro ao baixar {path}: {e}")
+                continue
+            if response.status_code == 200:
+                with open(path, 'wb') as image_file:
+                    image_file.write(response.content)
+                print(f"✅ Imagem pré-renderizada: {path}")
+            else:
+                print(f"❌ Erro ao baixar {path}: {response.status_code}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+
+    if command == 'build':
+        print(f"📚 Índice gerado com {build_index()} registros")
+    elif command == 'prefetch':
+        prefetch_images()
+        print(f"📚 Índice gerado com {build_index()} registros")
+    else:
+        print("Uso: python3 fallback_corpus.py [build|prefetch]")
@@ -0,0 +1,43 @@
+"""
+Configuração do Gunicorn para o webhook_server em produção
+Uso: gunicorn -c gunicorn.conf.py webhook_server:app
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# App carregado uma vez no master e compartilhado via fork (copy-on-write)
+preload_app = True
+
+# Workers com threads: /health, /metrics e /webhook/logs continuam respondendo
+# enquanto outras threads aguardam uma geração de vários minutos
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', max(2, multiprocessing.cpu_count())))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# A geração pode levar até 300s (timeout do subprocess) mais a resposta
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '330'))
+# Workers em encerramento (HUP, max_requests, SIGTERM) terminam as gerações em andamento
+# antes de sair. Com preload_app o código é carregado no master: HUP só recicla os
+# workers com o código antigo; para carregar código novo reinicie o processo
+# (docker compose restart webhook-receiver)
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', str(timeout)))
+keepalive = 5
+
+# Recicla workers periodicamente para conter vazamentos de memória
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    """Threads não sobrevivem ao fork: inicia as tarefas de background em cada worker"""
+    from webhook_server import start_background_tasks
+
+    start_background_tasks()
+
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Servidor de Health Check Embutido
+HTTP mínimo (biblioteca padrão) em thread daemon que expõe o estado do processo;
+a função de status lê apenas memória compartilhada, sem travar o loop principal
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HEALTH_PORT = 8000
+
+
+class HealthRequestHandler(BaseHTTPRequestHandler):
+    """Responde GET /health com o JSON retornado pela função de status"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/health', '/'):
+            self.send_error(404)
+            return
+
+        try:
+            status = self.server.status_func()
+            code = 200 if status.get('status') == 'healthy' else 503
+        except Exception as e:
+            status = {'status': 'error', 'error': str(e)}
+            code = 500
+
+        body = json.dumps(status, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Healthchecks a cada 30s não devem poluir o log
+        pass
+
+
+class HealthServer:
+    def __init__(self, status_func, host='0.0.0.0', port=DEFAULT_HEALTH_PORT):
+        self.status_func = status_func
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        """Inicia o servidor em thread daemon (erros de bind não derrubam o processo)"""
+        if self.thread is not None:
+            return self
+
+        try:
+            self.httpd = ThreadingHTTPServer((self.host, self.port), HealthRequestHandler)
+        except OSError as e:
+            logging.error(f"❌ Health check indisponível na porta {self.port}: {e}")
+            return self
+
+        self.httpd.daemon_threads = True
+        self.httpd.status_func = self.status_func
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='health-server', daemon=True)
+        self.thread.start()
+        logging.info(f"🩺 Health check em http://{self.host}:{self.port}/health")
+        return self
+
+    def stop(self):
+        """Encerra o servidor"""
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+            self.thread = None
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Índice de Hash Perceptual de Imagens
+dHash de 64 bits por imagem baixada e multi-index hashing sobre todo o histórico
+para achar imagens quase idênticas (distância de Hamming) sem varrer todos os hashes
+"""
+
+import logging
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+DEFAULT_INDEX_FILE = 'image_hashes.bin'
+DEFAULT_THRESHOLD = 6  # bits diferentes (de 64) para considerar a imagem repetida
+
+# Registro: hash (uint64) + data de inclusão (uint32, epoch)
+RECORD = struct.Struct('<QI')
+
+
+def dhash(path, hash_size=8):
+    """Difference hash: compara pixels vizinhos da imagem reduzida em tons de cinza
+
+    Retorna um inteiro de hash_size² bits, ou None se o Pillow não estiver instalado
+    ou a imagem não puder ser lida.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logging.warning("Pillow não instalado, hash perceptual desativado")
+        return None
+
+    try:
+        with Image.open(path) as image:
+            pixels = list(
+                image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS).getdata()
+            )
+    except (OSError, ValueError) as e:
+        logging.error(f"Erro ao calcular hash de {path}: {e}")
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] < pixels[offset + column + 1])
+    return value
+
+
+def hamming(a, b):
+    """Distância de Hamming entre dois hashes"""
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """Multi-index hashing: o hash de 64 bits é dividido em 4 blocos de 16 bits
+
+    Pelo princípio da casa dos pombos, um hash a distância <= t difere em no
+    máximo t // 4 bits em pelo menos um bloco; basta consultar cada tabela com
+    as variações do bloco até esse raio e conferir só os candidatos.
+    (Uma BK-tree foi medida e, com 64 bits, visita quase toda a árvore.)
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+    CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+    def __init__(self):
+        self.tables = [{} for _ in range(self.CHUNKS)]
+        self.values = set()
+        self.flip_masks = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def chunks(self, value):
+        """Blocos de 16 bits do hash"""
+        return [(value >> (index * self.CHUNK_BITS)) & self.CHUNK_MASK for index in range(self.CHUNKS)]
+
+    def masks(self, radius):
+        """Máscaras de até radius bits em um bloco (cacheadas por raio)"""
+        if radius not in self.flip_masks:
+            self.flip_masks[radius] = [
+                mask for mask in range(1 << self.CHUNK_BITS) if mask.bit_count() <= radius
+            ] if radius > 2 else self.small_masks(radius)
+        return self.flip_masks[radius]
+
+    def small_masks(self, radius):
+        """Máscaras com 0, 1 ou 2 bits, geradas diretamente"""
+        masks = [0]
+        if radius >= 1:
+            masks += [1 << i for i in range(self.CHUNK_BITS)]
+        if radius >= 2:
+            masks += [(1 << i) | (1 << j) for i in range(self.CHUNK_BITS) for j in range(i + 1, self.CHUNK_BITS)]
+        return masks
+
+    def add(self, value):
+        """Insere um hash (duplicatas exatas são ignoradas)"""
+        if value in self.values:
+            return False
+
+        self.values.add(value)
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            table.setdefault(chunk, []).append(value)
+        return True
+
+    def nearest(self, value, threshold):
+        """Hash mais próximo dentro do limiar: (distância, hash) ou None"""
+        if value in self.values:
+            return (0, value)
+
+        best = None
+        seen = set()
+        masks = self.masks(threshold // self.CHUNKS)
+
+        for table, chunk in zip(self.tables, self.chunks(value)):
+            for mask in masks:
+                for candidate in table.get(chunk ^ mask, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = (candidate ^ value).bit_count()
+                    if distance <= threshold and (best is None or distance < best[0]):
+                        best = (distance, candidate)
+
+        return best
+
+
+class ImageHashIndex:
+    def __init__(self, path=None, threshold=None):
+        self.path = path or os.getenv('IMAGE_INDEX_FILE', DEFAULT_INDEX_FILE)
+        self.threshold = int(threshold if threshold is not None
+                             else os.getenv('IMAGE_DEDUP_THRESHOLD', str(DEFAULT_THRESHOLD)))
+        self.hashes = MultiIndexHash()
+        self.loaded_bytes = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Carrega os registros novos do arquivo (incluídos por outros processos)"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+        # Ignora um registro parcial no fim (gravação em andamento)
+        size -= size % RECORD.size
+        if size <= self.loaded_bytes:
+            return 0
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.loaded_bytes)
+            data = f.read(size - self.loaded_bytes)
+
+        added = 0
+        for value, _ in RECORD.iter_unpack(data):
+            added += self.hashes.add(value)
+        self.loaded_bytes = size
+        return added
+
+    def append(self, value):
+        """Grava o hash no histórico (append atômico por registro)"""
+        with open(self.path, 'ab') as f:
+            f.write(RECORD.pack(value, int(time.time())))
+
+    def find(self, value):
+        """Imagem quase idêntica já publicada: (distância, hash) ou None"""
+        with self.lock:
+            self.refresh()
+            return self.hashes.nearest(value, self.threshold)
+
+    def check_and_add(self, value):
+        """Registra o hash se for novo; retorna o casamento se for repetido"""
+        with self.lock:
+            self.refresh()
+            match = self.hashes.nearest(value, self.threshold)
+            if match is None:
+                # O próprio registro volta no próximo refresh (add ignora duplicatas),
+                # assim registros gravados por outros processos não são pulados
+                self.append(value)
+                self.hashes.add(value)
+            return match
+
+
+# Índice compartilhado pelo processo (carregado sob demanda no primeiro uso)
+default_index = ImageHashIndex()
+
+
+def run_benchmark(count=100_000, queries=1000, threshold=DEFAULT_THRESHOLD):
+    """Mede construção e consulta do índice com hashes sintéticos agrupados"""
+    rng = random.Random(42)
+
+    # Hashes agrupados (variações de poucas "cenas"), como imagens de candles parecidas
+    centers = [rng.getrandbits(64) for _ in range(count // 50)]
+    values = []
+    for _ in range(count):
+        value = rng.choice(centers)
+        for _ in range(rng.randint(8, 20)):
+            value ^= 1 << rng.randrange(64)
+        values.append(value)
+
+    tree = MultiIndexHash()
+    started = time.perf_counter()
+    for value in values:
+        tree.add(value)
+    build_seconds = time.perf_counter() - started
+
+    probes = [rng.getrandbits(64) for _ in range(queries // 2)]
+    probes += [values[rng.randrange(count)] ^ (1 << rng.randrange(64)) for _ in range(queries // 2)]
+
+    started = time.perf_counter()
+    found = sum(tree.nearest(probe, threshold) is not None for probe in probes)
+    query_ms = (time.perf_counter() - started) * 1000 / len(probes)
+
+    started = time.perf_counter()
+    for probe in probes[:50]:
+        min(hamming(probe, value) for value in values)
+    linear_ms = (time.perf_counter() - started) * 1000 / 50
+
+    print(f"🗂️ {len(tree)} hashes, construção {build_seconds:.2f}s")
+    print(f"🔎 Consulta multi-índice: {query_ms:.3f} ms ({found}/{len(probes)} com casamento)")
+    print(f"🐢 Varredura linear: {linear_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Tempo de Importação
+Mede a inicialização dos processos (python -X importtime) e compara com um
+orçamento de startup; uso: python3 import_benchmark.py [módulo ...] [--history arquivo]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Pontos de entrada dos processos e orçamento de importação (ms) de cada um
+STARTUP_BUDGETS_MS = {
+    'automation_scheduler': 100,
+    'webhook_server': 250,
+    'day_trade_generator_free': 150,
+    'day_trade_generator': 150
+}
+
+# Dependências que não devem ser carregadas na inicialização
+HEAVY_MODULES = ['googleapiclient', 'google_auth_oauthlib', 'pandas', 'openpyxl', 'numpy']
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(code):
+    """Executa código em um interpretador novo com -X importtime
+
+    Roda em diretório temporário (logs criados no import não sujam o repositório)
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    with tempfile.TemporaryDirectory() as work_dir:
+        return subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=work_dir, env=env, capture_output=True, text=True
+        )
+
+
+def parse_importtime(stderr):
+    """Converte a saída do -X importtime em {módulo: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+def baseline_modules():
+    """Módulos já carregados pelo próprio interpretador (site, .pth), fora da medição"""
+    result = run_python('pass')
+    return set(parse_importtime(result.stderr))
+
+
+def measure(module, runs=5, baseline=()):
+    """Importa o módulo em processos novos; retorna o melhor resultado das execuções"""
+    best = None
+    code = f"import {module}"
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = run_python(code)
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'erro'
+            return {'module': module, 'error': error}
+
+        modules = parse_importtime(result.stderr)
+        own_ms = modules.get(module, (0, 0))[1] / 1000
+        if best is None or own_ms < best['import_ms']:
+            heaviest = sorted(
+                (name for name in modules if name != module and name not in baseline),
+                key=lambda name: modules[name][1], reverse=True
+            )[:5]
+            best = {
+                'module': module,
+                'import_ms': round(own_ms, 1),
+                'process_ms': round(wall_ms, 1),
+                'modules_loaded': len(set(modules) - set(baseline)),
+                'heavy_loaded': [name for name in HEAVY_MODULES if name in modules],
+                'heaviest': [(name, round(modules[name][1] / 1000, 1)) for name in heaviest]
+            }
+
+    return best
+
+
+def run_benchmark(modules, history=None):
+    """Mede cada módulo, imprime o relatório e retorna True se tudo está no orçamento"""
+    results = []
+    within_budget = True
+    baseline = baseline_modules()
+
+    for module in modules:
+        result = measure(module, baseline=baseline)
+        budget = STARTUP_BUDGETS_MS.get(module)
+        result['budget_ms'] = budget
+
+        if 'error' in result:
+            print(f"⚠️ {module}: não foi possível importar ({result['error']})")
+        else:
+            over = budget is not None and result['import_ms'] > budget
+            result['within_budget'] = not over and not result['heavy_loaded']
+            within_budget = within_budget and result['within_budget']
+
+            mark = '✅' if result['within_budget'] else '❌'
+            print(f"{mark} {module}: {result['import_ms']} ms (orçamento {budget} ms, "
+                  f"processo {result['process_ms']} ms, {result['modules_loaded']} módulos)")
+            for name, cumulative_ms in result['heaviest']:
+                print(f"     {cumulative_ms:8.1f} ms  {name}")
+            if result['heavy_loaded']:
+                print(f"     dependências pesadas carregadas: {', '.join(result['heavy_loaded'])}")
+
+        results.append(result)
+
+    if history:
+        # Histórico em JSON lines para acompanhar a evolução do startup
+        with open(history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'results': results
+            }, ensure_ascii=False) + '\n')
+
+    return within_budget
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    history = None
+    if '--history' in args:
+        index = args.index('--history')
+        history = args[index + 1]
+        del args[index:index + 2]
+
+    ok = run_benchmark(args or list(STARTUP_BUDGETS_MS), history)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark do Motor de Indicadores
+Mede o cálculo vetorizado sobre uma série longa (padrão 1 milhão de barras) e o
+incremental barra a barra, e confere se as duas versões dão os mesmos valores;
+uso: python3 indicator_benchmark.py [barras] [--stream barras]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from indicators import IncrementalIndicators, compute_all
+
+DEFAULT_BARS = 1_000_000
+DEFAULT_STREAM_BARS = 20_000
+
+# Diferença máxima aceita entre vetorizado e incremental (relativa ao valor)
+TOLERANCE = 1e-6
+
+
+def random_walk(bars, seed=42):
+    """Série OHLC sintética (passeio aleatório) para medir sem depender de dados de mercado"""
+    rng = np.random.default_rng(seed)
+    close = 100_000 + np.cumsum(rng.normal(0, 25, bars))
+    spread = rng.random((2, bars)) * 40
+    return close + spread[0], close - spread[1], close
+
+
+def time_vectorized(high, low, close, runs=3):
+    """Melhor tempo (s) de compute_all entre as execuções"""
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        results = compute_all(high, low, close)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def time_stream(high, low, close):
+    """Tempo (s) do cálculo incremental e os valores de cada barra"""
+    stream = IncrementalIndicators()
+    started = time.perf_counter()
+    values = [stream.update(high[i], low[i], close[i]) for i in range(len(close))]
+    return time.perf_counter() - started, values
+
+
+def compare(results, values):
+    """Maior diferença relativa por indicador entre as duas versões"""
+    worst = {}
+    for index, bar in enumerate(values):
+        for name, value in bar.items():
+            expected = results[name][index]
+            if value is None or np.isnan(expected):
+                if value is not None or not np.isnan(expected):
+                    worst[name] = float('inf')  # uma versão tem valor e a outra não
+                continue
+            error = abs(value - expected) / max(1.0, abs(expected))
+            worst[name] = max(worst.get(name, 0.0), error)
+    return worst
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    stream_bars = DEFAULT_STREAM_BARS
+    if '--stream' in args:
+        index = args.index('--stream')
+        stream_bars = int(args[index + 1])
+        del args[index:index + 2]
+    bars = int(args[0]) if args else DEFAULT_BARS
+
+    high, low, close = random_walk(bars)
+    elapsed, results = time_vectorized(high, low, close)
+    print(f"📊 Vetorizado: {bars:,} barras em {elapsed * 1000:.0f} ms "
+          f"({bars / elapsed / 1e6:.1f} M barras/s, {len(results)} séries)")
+
+    stream_bars = min(stream_bars, bars)
+    elapsed, values = time_stream(high[:stream_bars], low[:stream_bars], close[:stream_bars])
+    print(f"⏱️ Incremental: {stream_bars:,} barras em {elapsed * 1000:.0f} ms "
+          f"({elapsed / stream_bars * 1e6:.1f} µs por barra)")
+
+    subset = compute_all(high[:stream_bars], low[:stream_bars], close[:stream_bars])
+    worst = compare(subset, values)
+    failed = {name: error for name, error in worst.items() if error > TOLERANCE}
+    for name, error in sorted(worst.items()):
+        print(f"   {'❌' if name in failed else '✅'} {name}: diferença máxima {error:.1e}")
+
+    sys.exit(1 if failed else 0)
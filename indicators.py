@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Motor de Indicadores Técnicos (NumPy)
+MACD, IFR/RSI, Bandas de Bollinger, Estocástico, ADX, Williams %R, CCI e ROC
+sobre arrays OHLCV inteiros, vetorizados em O(n), e a versão incremental
+(barra a barra) com os mesmos resultados para dados em streaming
+"""
+
+import math
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+# Parâmetros clássicos de cada indicador
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_PERIOD = 14
+BOLLINGER_PERIOD, BOLLINGER_WIDTH = 20, 2.0
+STOCHASTIC_PERIOD, STOCHASTIC_SMOOTH = 14, 3
+ADX_PERIOD = 14
+WILLIAMS_PERIOD = 14
+CCI_PERIOD, CCI_CONSTANT = 20, 0.015
+ROC_PERIOD = 12
+
+# Dispersão abaixo desta fração do preço conta como zero (janelas planas, ruído de arredondamento)
+FLAT_TOLERANCE = 1e-9
+
+# Linhas por bloco nas janelas deslizantes (limita a memória temporária em séries longas)
+WINDOW_CHUNK = 1 << 16
+
+# Nomes usados em DayTradeContentGenerator.indicators -> chave do resultado
+INDICATOR_KEYS = {
+    'MACD': 'macd',
+    'RSI': 'rsi',
+    'IFR': 'rsi',
+    'Bandas de Bollinger': 'bollinger',
+    'Estocástico': 'stochastic',
+    'ADX': 'adx',
+    'Williams %R': 'williams_r',
+    'CCI': 'cci',
+    'ROC': 'roc'
+}
+
+
+def recursive_ema(values, alpha, initial):
+    """y[t] = (1 - alpha) * y[t-1] + alpha * x[t], a partir de y[-1] = initial
+
+    A recorrência é resolvida em blocos na forma fechada
+    y[t] = w^(t+1) * y0 + alpha * w^t * cumsum(x[k] * w^-k), com w = 1 - alpha;
+    o bloco é limitado para w^bloco não sair da faixa do float64, e o último
+    valor de cada bloco é a semente do próximo. Custo O(n), laço só por bloco.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if not len(values):
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    block = int(min(len(values), max(1, -150 / math.log10(decay))))
+    exponents = np.arange(block, dtype=np.float64)
+    powers = decay ** exponents
+    inverse = decay ** -exponents
+
+    previous = initial
+    for start in range(0, len(values), block):
+        segment = values[start:start + block]
+        size = len(segment)
+        accumulated = np.cumsum(segment * inverse[:size])
+        out[start:start + size] = powers[:size] * (decay * previous + alpha * accumulated)
+        previous = out[start + size - 1]
+    return out
+
+
+def first_valid(values):
+    """Índice do primeiro valor não-NaN (len se não houver)"""
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def ema(values, period, alpha=None):
+    """Média móvel exponencial com semente pela média simples dos primeiros period valores
+
+    NaNs iniciais (indicador de entrada ainda sem valor) são pulados.
+    alpha padrão 2/(period+1); a suavização de Wilder usa alpha = 1/period.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    alpha = alpha if alpha is not None else 2.0 / (period + 1)
+    out = np.full(len(values), np.nan)
+
+    start = first_valid(values)
+    seed_at = start + period - 1
+    if seed_at >= len(values):
+        return out
+
+    out[seed_at] = values[start:seed_at + 1].mean()
+    out[seed_at + 1:] = recursive_ema(values[seed_at + 1:], alpha, out[seed_at])
+    return out
+
+
+def wilder(values, period):
+    """Suavização de Wilder (RSI, ADX)"""
+    return ema(values, period, alpha=1.0 / period)
+
+
+def sma(values, window):
+    """Média móvel simples por somas acumuladas (O(n)), pulando NaNs iniciais"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    start = first_valid(values)
+    if len(values) - start < window:
+        return out
+
+    # Desloca pela primeira observação para preservar precisão nas somas longas
+    shifted = values[start:] - values[start]
+    totals = np.cumsum(shifted)
+    sums = totals[window - 1:].copy()
+    sums[1:] -= totals[:-window]
+    out[start + window - 1:] = sums / window + values[start]
+    return out
+
+
+def window_reduce(values, window, reducer):
+    """Aplica reducer(janelas) nas janelas deslizantes, em blocos de WINDOW_CHUNK linhas
+
+    As janelas são views (sem cópia); o custo é O(n * janela), com janela fixa e pequena.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    for start in range(0, len(windows), WINDOW_CHUNK):
+        out[window - 1 + start:window - 1 + start + WINDOW_CHUNK] = reducer(windows[start:start + WINDOW_CHUNK])
+    return out
+
+
+def rolling_max(values, window):
+    return window_reduce(values, window, lambda windows: windows.max(axis=1))
+
+
+def rolling_min(values, window):
+    return window_reduce(values, window, lambda windows: windows.min(axis=1))
+
+
+def rolling_std(values, window):
+    """Desvio padrão populacional (ddof=0), como nas Bandas de Bollinger"""
+    return window_reduce(values, window, lambda windows: windows.std(axis=1))
+
+
+def rolling_mean_deviation(values, window):
+    """Desvio médio absoluto em relação à média da janela (CCI)"""
+    def reducer(windows):
+        return np.abs(windows - windows.mean(axis=1, keepdims=True)).mean(axis=1)
+    return window_reduce(values, window, reducer)
+
+
+def safe_divide(numerator, denominator, fill):
+    """numerator / denominator com fill onde o denominador é zero"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator
+    return np.where(denominator == 0, fill, result)
+
+
+def flat(spread, scale):
+    """Dispersão desprezível em relação à escala (array ou escalar)"""
+    return np.abs(spread) <= FLAT_TOLERANCE * np.abs(scale)
+
+
+def macd(close):
+    fast = ema(close, MACD_FAST)
+    slow = ema(close, MACD_SLOW)
+    line = fast - slow
+    signal = ema(line, MACD_SIGNAL)
+    return line, signal, line - signal
+
+
+def rsi(close):
+    change = np.diff(close, prepend=np.nan)
+    average_gain = wilder(np.where(np.isnan(change), np.nan, np.maximum(change, 0.0)), RSI_PERIOD)
+    average_loss = wilder(np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0)), RSI_PERIOD)
+    # Sem perdas: 100 (ou 50 se também não houve ganhos)
+    flat = np.where(average_gain > 0, 100.0, 50.0)
+    return np.where(np.isnan(average_loss), np.nan,
+                    safe_divide(100.0 * average_gain, average_gain + average_loss, flat))
+
+
+def bollinger(close):
+    middle = sma(close, BOLLINGER_PERIOD)
+    deviation = rolling_std(close, BOLLINGER_PERIOD)
+    upper = middle + BOLLINGER_WIDTH * deviation
+    lower = middle - BOLLINGER_WIDTH * deviation
+    width = np.where(flat(upper - lower, middle), 0.0, upper - lower)
+    percent_b = safe_divide(close - lower, width, 0.5)
+    return middle, upper, lower, percent_b
+
+
+def stochastic(high, low, close):
+    highest = rolling_max(high, STOCHASTIC_PERIOD)
+    lowest = rolling_min(low, STOCHASTIC_PERIOD)
+    k = safe_divide(100.0 * (close - lowest), highest - lowest, 50.0)
+    k = np.where(np.isnan(highest), np.nan, k)
+    return k, sma(k, STOCHASTIC_SMOOTH)
+
+
+def williams_r(high, low, close):
+    highest = rolling_max(high, WILLIAMS_PERIOD)
+    lowest = rolling_min(low, WILLIAMS_PERIOD)
+    value = safe_divide(-100.0 * (highest - close), highest - lowest, -50.0)
+    return np.where(np.isnan(highest), np.nan, value)
+
+
+def adx(high, low, close):
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+    up_move = np.diff(high, prepend=np.nan)
+    down_move = -np.diff(low, prepend=np.nan)
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    plus_dm[0] = minus_dm[0] = np.nan
+
+    # Razões de médias de Wilder: idênticas às somas suavizadas do método original
+    average_range = wilder(true_range, ADX_PERIOD)
+    plus_di = safe_divide(100.0 * wilder(plus_dm, ADX_PERIOD), average_range, 0.0)
+    minus_di = safe_divide(100.0 * wilder(minus_dm, ADX_PERIOD), average_range, 0.0)
+    dx = safe_divide(100.0 * np.abs(plus_di - minus_di), plus_di + minus_di, 0.0)
+    return wilder(dx, ADX_PERIOD), plus_di, minus_di
+
+
+def cci(high, low, close):
+    typical = (high + low + close) / 3.0
+    average = sma(typical, CCI_PERIOD)
+    deviation = rolling_mean_deviation(typical, CCI_PERIOD)
+    deviation = np.where(flat(deviation, average), 0.0, deviation)
+    value = safe_divide(typical - average, CCI_CONSTANT * deviation, 0.0)
+    return np.where(np.isnan(average), np.nan, value)
+
+
+def roc(close):
+    out = np.full(len(close), np.nan)
+    out[ROC_PERIOD:] = 100.0 * (close[ROC_PERIOD:] / close[:-ROC_PERIOD] - 1.0)
+    return out
+
+
+def compute_all(high, low, close):
+    """Todos os indicadores sobre as séries inteiras (NaN enquanto não há histórico)"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    results = {}
+    results['macd'], results['macd_signal'], results['macd_hist'] = macd(close)
+    results['rsi'] = rsi(close)
+    results['bb_middle'], results['bb_upper'], results['bb_lower'], results['bb_percent'] = bollinger(close)
+    results['stoch_k'], results['stoch_d'] = stochastic(high, low, close)
+    results['adx'], results['plus_di'], results['minus_di'] = adx(high, low, close)
+    results['williams_r'] = williams_r(high, low, close)
+    results['cci'] = cci(high, low, close)
+    results['roc'] = roc(close)
+    return results
+
+
+class IncrementalEma:
+    """EMA barra a barra com a mesma semente (média simples) da versão vetorizada"""
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.value = None
+        self.seed = []
+
+    def update(self, x):
+        if x is None:
+            return self.value
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) == self.period:
+                self.value = sum(self.seed) / self.period
+                self.seed = None
+            return self.value
+        self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class IncrementalIndicators:
+    """Todos os indicadores atualizados a cada barra em O(1) (janelas de tamanho fixo)
+
+    update() devolve os valores da barra recebida (None enquanto não há histórico),
+    iguais ao último elemento de compute_all() sobre a mesma série.
+    """
+
+    def __init__(self):
+        self.macd_fast = IncrementalEma(MACD_FAST)
+        self.macd_slow = IncrementalEma(MACD_SLOW)
+        self.macd_signal = IncrementalEma(MACD_SIGNAL)
+        self.rsi_gain = IncrementalEma(RSI_PERIOD, 1.0 / RSI_PERIOD)
+        self.rsi_loss = IncrementalEma(RSI_PERIOD, 1.0 / RSI_PERIOD)
+        self.adx_range = IncrementalEma(ADX_PERIOD, 1.0 / ADX_PERIOD)
+        self.adx_plus = IncrementalEma(ADX_PERIOD, 1.0 / ADX_PERIOD)
+        self.adx_minus = IncrementalEma(ADX_PERIOD, 1.0 / ADX_PERIOD)
+        self.adx_value = IncrementalEma(ADX_PERIOD, 1.0 / ADX_PERIOD)
+
+        window = max(BOLLINGER_PERIOD, STOCHASTIC_PERIOD, WILLIAMS_PERIOD, CCI_PERIOD, ROC_PERIOD + 1)
+        self.highs = deque(maxlen=window)
+        self.lows = deque(maxlen=window)
+        self.closes = deque(maxlen=window)
+        self.typicals = deque(maxlen=CCI_PERIOD)
+        self.stoch_ks = deque(maxlen=STOCHASTIC_SMOOTH)
+        self.bars = 0
+
+    @staticmethod
+    def tail(values, window):
+        """Últimos window valores da janela (ou None se ainda não há tantos)"""
+        if len(values) < window:
+            return None
+        return list(values)[-window:]
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        previous_high = self.highs[-1] if self.highs else None
+        previous_low = self.lows[-1] if self.lows else None
+        previous_close = self.closes[-1] if self.closes else None
+
+        self.highs.append(high)
+        self.lows.append(low)
+        self.closes.append(close)
+        self.bars += 1
+        values = {}
+
+        # MACD
+        fast = self.macd_fast.update(close)
+        slow = self.macd_slow.update(close)
+        line = fast - slow if fast is not None and slow is not None else None
+        signal = self.macd_signal.update(line)
+        values['macd'] = line
+        values['macd_signal'] = signal
+        values['macd_hist'] = line - signal if signal is not None else None
+
+        # IFR / RSI
+        change = close - previous_close if previous_close is not None else None
+        gain = self.rsi_gain.update(max(change, 0.0) if change is not None else None)
+        loss = self.rsi_loss.update(max(-change, 0.0) if change is not None else None)
+        if loss is None:
+            values['rsi'] = None
+        elif gain + loss == 0:
+            values['rsi'] = 50.0
+        else:
+            values['rsi'] = 100.0 * gain / (gain + loss)
+
+        # Bandas de Bollinger
+        window = self.tail(self.closes, BOLLINGER_PERIOD)
+        if window:
+            middle = sum(window) / BOLLINGER_PERIOD
+            deviation = math.sqrt(sum((x - middle) ** 2 for x in window) / BOLLINGER_PERIOD)
+            upper, lower = middle + BOLLINGER_WIDTH * deviation, middle - BOLLINGER_WIDTH * deviation
+            values.update(bb_middle=middle, bb_upper=upper, bb_lower=lower,
+                          bb_percent=0.5 if flat(upper - lower, middle) else (close - lower) / (upper - lower))
+        else:
+            values.update(bb_middle=None, bb_upper=None, bb_lower=None, bb_percent=None)
+
+        # Estocástico e Williams %R
+        highs, lows = self.tail(self.highs, STOCHASTIC_PERIOD), self.tail(self.lows, STOCHASTIC_PERIOD)
+        if highs:
+            highest, lowest = max(highs), min(lows)
+            k = 100.0 * (close - lowest) / (highest - lowest) if highest != lowest else 50.0
+            self.stoch_ks.append(k)
+            values['stoch_k'] = k
+            values['stoch_d'] = sum(self.stoch_ks) / STOCHASTIC_SMOOTH if len(self.stoch_ks) == STOCHASTIC_SMOOTH else None
+        else:
+            values.update(stoch_k=None, stoch_d=None)
+
+        highs, lows = self.tail(self.highs, WILLIAMS_PERIOD), self.tail(self.lows, WILLIAMS_PERIOD)
+        if highs:
+            highest, lowest = max(highs), min(lows)
+            values['williams_r'] = -100.0 * (highest - close) / (highest - lowest) if highest != lowest else -50.0
+        else:
+            values['williams_r'] = None
+
+        # ADX
+        if previous_close is not None:
+            true_range = max(high - low, abs(high - previous_close), abs(low - previous_close))
+            up_move, down_move = high - previous_high, previous_low - low
+            plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+            minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+        else:
+            true_range = plus_dm = minus_dm = None
+        average_range = self.adx_range.update(true_range)
+        plus = self.adx_plus.update(plus_dm)
+        minus = self.adx_minus.update(minus_dm)
+        if average_range is not None:
+            plus_di = 100.0 * plus / average_range if average_range else 0.0
+            minus_di = 100.0 * minus / average_range if average_range else 0.0
+            dx = 100.0 * abs(plus_di - minus_di) / (plus_di + minus_di) if plus_di + minus_di else 0.0
+            values.update(adx=self.adx_value.update(dx), plus_di=plus_di, minus_di=minus_di)
+        else:
+            values.update(adx=None, plus_di=None, minus_di=None)
+
+        # CCI
+        typical = (high + low + close) / 3.0
+        self.typicals.append(typical)
+        if len(self.typicals) == CCI_PERIOD:
+            average = sum(self.typicals) / CCI_PERIOD
+            deviation = sum(abs(x - average) for x in self.typicals) / CCI_PERIOD
+            values['cci'] = 0.0 if flat(deviation, average) else (typical - average) / (CCI_CONSTANT * deviation)
+        else:
+            values['cci'] = None
+
+        # ROC
+        values['roc'] = (100.0 * (close / self.closes[-ROC_PERIOD - 1] - 1.0)
+                         if len(self.closes) > ROC_PERIOD else None)
+        return values
+
+
+def load_ohlcv(path):
+    """Lê um CSV com cabeçalho (open, high, low, close[, volume]) em arrays float64"""
+    data = np.genfromtxt(path, delimiter=',', names=True, dtype=None, encoding='utf-8')
+    columns = {name.lower(): name for name in data.dtype.names}
+    missing = [name for name in ('high', 'low', 'close') if name not in columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes em {path}: {', '.join(missing)}")
+    return {name: data[column].astype(np.float64) for name, column in columns.items()
+            if name in ('open', 'high', 'low', 'close', 'volume')}
+
+
+def format_number(value, decimals=2):
+    """Número no formato brasileiro (1.234,56)"""
+    return f"{value:,.{decimals}f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def describe(indicator, results):
+    """Frase com o valor atual do indicador (para o roteiro citar dados reais)"""
+    key = INDICATOR_KEYS.get(indicator)
+    if key is None:
+        return None
+
+    def last(name):
+        value = results[name][-1]
+        return None if np.isnan(value) else float(value)
+
+    if key == 'macd':
+        line, signal = last('macd'), last('macd_signal')
+        if signal is None:
+            return None
+        position = 'acima' if line > signal else 'abaixo'
+        return f"MACD em {format_number(line)}, {position} da linha de sinal ({format_number(signal)})"
+    if key == 'rsi':
+        value = last('rsi')
+        if value is None:
+            return None
+        zone = 'sobrecompra' if value >= 70 else 'sobrevenda' if value <= 30 else 'zona neutra'
+        return f"IFR(14) em {format_number(value, 1)}, {zone}"
+    if key == 'bollinger':
+        lower, upper, percent = last('bb_lower'), last('bb_upper'), last('bb_percent')
+        if percent is None:
+            return None
+        return (f"Bandas de Bollinger entre {format_number(lower)} e {format_number(upper)}, "
+                f"preço em {format_number(100 * percent, 0)}% da faixa")
+    if key == 'stochastic':
+        k, d = last('stoch_k'), last('stoch_d')
+        if d is None:
+            return None
+        return f"Estocástico %K {format_number(k, 1)} e %D {format_number(d, 1)}"
+    if key == 'adx':
+        value, plus, minus = last('adx'), last('plus_di'), last('minus_di')
+        if value is None:
+            return None
+        strength = 'tendência forte' if value >= 25 else 'tendência fraca'
+        return f"ADX em {format_number(value, 1)} ({strength}), +DI {format_number(plus, 1)} e -DI {format_number(minus, 1)}"
+    if key == 'williams_r':
+        value = last('williams_r')
+        return None if value is None else f"Williams %R em {format_number(value, 1)}"
+    if key == 'cci':
+        value = last('cci')
+        return None if value is None else f"CCI(20) em {format_number(value, 1)}"
+    if key == 'roc':
+        value = last('roc')
+        return None if value is None else f"ROC(12) em {format_number(value)}%"
+    return None
+
+
+# Resultado do último CSV lido: (caminho, mtime, indicadores)
+market_cache = None
+market_lock = threading.Lock()
+
+
+def market_context(indicator, path=None):
+    """Valor atual do indicador no CSV de MARKET_DATA_CSV, para citar no roteiro
+
+    Recalcula só quando o arquivo muda; sem arquivo ou sem histórico retorna None.
+    """
+    global market_cache
+    path = path or os.getenv('MARKET_DATA_CSV')
+    if not path or indicator not in INDICATOR_KEYS:
+        return None
+
+    try:
+        modified = os.path.getmtime(path)
+        with market_lock:
+            if market_cache is None or market_cache[:2] != (path, modified):
+                series = load_ohlcv(path)
+                market_cache = (path, modified, compute_all(series['high'], series['low'], series['close']))
+            results = market_cache[2]
+        return describe(indicator, results)
+    except Exception as e:
+        print(f"⚠️ Erro ao calcular indicadores de {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Valores atuais de um CSV OHLCV: python3 indicators.py dados.csv
+    if len(sys.argv) < 2:
+        print("Uso: python3 indicators.py <arquivo_ohlcv.csv>")
+        sys.exit(1)
+
+    series = load_ohlcv(sys.argv[1])
+    results = compute_all(series['high'], series['low'], series['close'])
+    for name in ('MACD', 'IFR', 'Bandas de Bollinger', 'Estocástico', 'ADX', 'Williams %R', 'CCI', 'ROC'):
+        print(f"  {describe(name, results) or f'{name}: histórico insuficiente'}")
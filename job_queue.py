@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Camada de Coordenação entre Containers
+Fila de jobs durável em SQLite no volume compartilhado, eleição de líder
+por lease e claim de jobs com garantia at-most-once
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_ABANDONED = 'abandoned'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    dedupe_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    lease_until REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def default_worker_id():
+    """Identificador único do processo (host + pid + sufixo aleatório)"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """Abre uma conexão nova (uma por operação, segura entre threads e processos)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def enqueue(self, kind, payload=None, dedupe_key=None):
+        """Enfileira um job; retorna o id ou None se a chave de deduplicação já existe"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload or {}, ensure_ascii=False), dedupe_key, time.time())
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, worker_id, lease_seconds=600, kinds=None):
+        """Reserva o job pendente mais antigo; cada job é entregue a no máximo um worker"""
+        conn = self.connect()
+        try:
+            # BEGIN IMMEDIATE serializa os claims entre processos
+            conn.execute("BEGIN IMMEDIATE")
+
+            query = "SELECT * FROM jobs WHERE status = ?"
+            params = [STATUS_PENDING]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' for _ in kinds)})"
+                params.extend(kinds)
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, claimed_by = ?, claimed_at = ?, lease_until = ? WHERE id = ?",
+                (STATUS_RUNNING, worker_id, now, now + lease_seconds, row['id'])
+            )
+            conn.execute("COMMIT")
+
+            job = dict(row)
+            job['payload'] = json.loads(job['payload'])
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def finish(self, job_id, worker_id, status, result=None, error=None):
+        """Marca o job como concluído ou falho (apenas pelo worker que o reservou)"""
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? "
+                "WHERE id = ? AND claimed_by = ? AND status = ?",
+                (status, time.time(), json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, job_id, worker_id, STATUS_RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result=None):
+        """Marca o job como concluído"""
+        return self.finish(job_id, worker_id, STATUS_DONE, result=result)
+
+    def fail(self, job_id, worker_id, error):
+        """Marca o job como falho"""
+        return self.finish(job_id, worker_id, STATUS_FAILED, error=error)
+
+    def abandon_expired(self):
+        """Marca como abandonados os jobs cujo lease expirou
+
+        Jobs abandonados não voltam para a fila: o worker pode ter publicado
+        o conteúdo antes de morrer, e repetir geraria posts duplicados.
+        """
+        with closing(self.connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = 'lease expired' "
+                "WHERE status = ? AND lease_until < ?",
+                (STATUS_ABANDONED, time.time(), STATUS_RUNNING, time.time())
+            )
+            return cursor.rowcount
+
+    def get(self, job_id):
+        """Retorna um job pelo id"""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        if job['result']:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def depth(self):
+        """Quantidade de jobs pendentes"""
+        with closing(self.connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (STATUS_PENDING,)).fetchone()[0]
+
+    def acquire_lease(self, name, holder, ttl):
+        """Adquire ou renova um lease nomeado; retorna True se holder é o líder"""
+        now = time.time()
+
+        with closing(self.connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                    "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                    (name, holder, now + ttl, now)
+                )
+                row = conn.execute("SELECT holder FROM leases WHERE name = ?", (name,)).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return row['holder'] == holder
+
+    def release_lease(self, name, holder):
+        """Libera o lease se ainda pertencer ao holder"""
+        with closing(self.connect()) as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
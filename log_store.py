@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Armazenamento de Logs com Rotação, Compressão e Índice por Tempo
+O arquivo ativo é rotacionado por tamanho ou idade; segmentos antigos viram
+blocos gzip independentes com um índice esparso (timestamp -> offset), então
+consultas por intervalo fazem seek no bloco certo em vez de varrer tudo
+"""
+
+import bisect
+import fcntl
+import glob
+import gzip
+import io
+import logging
+import os
+import struct
+import time
+from logging.handlers import WatchedFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+TIMESTAMP_LENGTH = 23  # "AAAA-MM-DD HH:MM:SS,mmm" (asctime padrão)
+BLOCK_SIZE = 64 * 1024  # bytes de log por bloco gzip (granularidade do seek)
+
+# Entrada do índice: primeiro timestamp do bloco + offset do bloco no .gz
+INDEX_ENTRY = struct.Struct(f'<{TIMESTAMP_LENGTH}sQ')
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+
+
+def line_timestamp(line):
+    """Timestamp da linha (prefixo asctime) ou None para linhas de continuação"""
+    prefix = line[:TIMESTAMP_LENGTH]
+    if len(prefix) == TIMESTAMP_LENGTH and prefix[4] == '-' and prefix[10] == ' ' and prefix[19] == ',':
+        return prefix
+    return None
+
+
+def line_level(line):
+    """Nível da linha no formato LOG_FORMAT"""
+    parts = line.split(' - ', 2)
+    return parts[1] if len(parts) > 2 else None
+
+
+def normalize_time(value, end=False):
+    """Converte ISO (com T) ou data simples para o formato comparável do asctime"""
+    if not value:
+        return None
+    value = value.replace('T', ' ')
+    if len(value) == 10:
+        value += ' 23:59:59,999' if end else ' 00:00:00,000'
+    elif len(value) == 16:
+        value += ':59,999' if end else ':00,000'
+    elif len(value) == 19:
+        value += ',999' if end else ',000'
+    return value.replace('.', ',')[:TIMESTAMP_LENGTH]
+
+
+def compress_segment(source, target_prefix):
+    """Comprime um log em blocos gzip independentes e grava o índice esparso"""
+    entries = []
+    last_timestamp = None
+
+    with open(source, 'r', encoding='utf-8', errors='replace') as src, \
+            open(f"{target_prefix}.gz.tmp", 'wb') as gz:
+        block, block_size, block_timestamp = [], 0, None
+
+        def flush():
+            if block:
+                entries.append((block_timestamp or last_timestamp or '', gz.tell()))
+                gz.write(gzip.compress(''.join(block).encode('utf-8')))
+
+        for line in src:
+            timestamp = line_timestamp(line)
+            if timestamp:
+                last_timestamp = timestamp
+            # Só começa bloco novo em linha com timestamp (tracebacks ficam juntos)
+            if block_size >= BLOCK_SIZE and timestamp:
+                flush()
+                block, block_size = [], 0
+            if not block:
+                block_timestamp = timestamp or last_timestamp
+            block.append(line)
+            block_size += len(line)
+        flush()
+        end_offset = gz.tell()
+
+    # Sentinela: último timestamp do segmento e tamanho final
+    entries.append((last_timestamp or '', end_offset))
+    with open(f"{target_prefix}.idx.tmp", 'wb') as idx:
+        for timestamp, offset in entries:
+            idx.write(INDEX_ENTRY.pack(timestamp.encode('ascii'), offset))
+
+    os.replace(f"{target_prefix}.gz.tmp", f"{target_prefix}.gz")
+    os.replace(f"{target_prefix}.idx.tmp", f"{target_prefix}.idx")
+    os.remove(source)
+
+
+class RotatingCompressedHandler(WatchedFileHandler):
+    """FileHandler com rotação por tamanho/idade, seguro com vários processos
+
+    Na rotação o arquivo ativo é renomeado para um segmento pendente; os demais
+    processos reabrem ao notar a troca de inode (WatchedFileHandler). Segmentos
+    pendentes são comprimidos na rotação seguinte, quando ninguém mais escreve neles.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, max_age_seconds=86400, keep_segments=30):
+        super().__init__(filename, encoding='utf-8')
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.keep_segments = keep_segments
+        self.opened_at = time.time()
+
+    @classmethod
+    def from_env(cls, filename):
+        """Cria o handler com limites das variáveis de ambiente"""
+        return cls(
+            filename,
+            max_bytes=int(float(os.getenv('LOG_MAX_MB', '10')) * 1024 * 1024),
+            max_age_seconds=int(float(os.getenv('LOG_ROTATE_HOURS', '24')) * 3600),
+            keep_segments=int(os.getenv('LOG_KEEP_SEGMENTS', '30'))
+        )
+
+    def emit(self, record):
+        try:
+            if self.should_rollover():
+                self.rollover()
+        except Exception:
+            self.handleError(record)
+        super().emit(record)
+
+    def should_rollover(self):
+        """Arquivo ativo acima do tamanho ou da idade máxima"""
+        try:
+            stat = os.stat(self.baseFilename)
+        except OSError:
+            return False
+        if stat.st_size == 0:
+            return False
+        if stat.st_size >= self.max_bytes:
+            return True
+        return time.time() - self.active_since(stat) >= self.max_age_seconds
+
+    def active_since(self, stat):
+        """Início do arquivo ativo (timestamp da primeira linha, lido uma vez por inode)"""
+        if getattr(self, 'started_inode', None) != stat.st_ino:
+            self.started_inode = stat.st_ino
+            self.started_at = self.opened_at
+            try:
+                with open(self.baseFilename, 'r', encoding='utf-8', errors='replace') as f:
+                    timestamp = line_timestamp(f.readline())
+                if timestamp:
+                    self.started_at = time.mktime(time.strptime(timestamp[:19], '%Y-%m-%d %H:%M:%S'))
+            except (OSError, ValueError):
+                pass
+        return self.started_at
+
+    def rollover(self):
+        """Renomeia o ativo para segmento pendente e comprime os pendentes anteriores"""
+        with open(f"{self.baseFilename}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            # Outro processo pode ter rotacionado enquanto esperávamos o lock
+            if self.should_rollover():
+                # Nome ordenável e único mesmo com várias rotações no mesmo segundo
+                now = time.time()
+                stamp = f"{time.strftime('%Y%m%d%H%M%S', time.localtime(now))}{int(now % 1 * 1e6):06d}"
+                pending = f"{self.baseFilename}.{stamp}-{os.getpid()}.log"
+                os.rename(self.baseFilename, pending)
+
+                for path in sorted(glob.glob(f"{self.baseFilename}.*.log")):
+                    if path != pending:
+                        compress_segment(path, path[:-len('.log')])
+
+                self.enforce_retention()
+
+        # Reabre o arquivo ativo (novo inode)
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.stream = self._open()
+        self._statstream()
+
+    def enforce_retention(self):
+        """Mantém apenas os keep_segments segmentos comprimidos mais recentes"""
+        segments = sorted(glob.glob(f"{self.baseFilename}.*.gz"))
+        for path in segments[:max(0, len(segments) - self.keep_segments)]:
+            for suffix in ('.gz', '.idx'):
+                try:
+                    os.remove(path[:-len('.gz')] + suffix)
+                except OSError:
+                    pass
+
+
+def configure_logging(filename):
+    """Configuração padrão: arquivo rotacionado e comprimido + console"""
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            RotatingCompressedHandler.from_env(filename),
+            logging.StreamHandler()
+        ]
+    )
+
+
+class LogStore:
+    """Consultas por intervalo de tempo e nível sobre ativo + segmentos"""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def segments(self):
+        """Segmentos comprimidos com seu índice, em ordem cronológica"""
+        result = []
+        for path in sorted(glob.glob(f"{self.filename}.*.gz")):
+            prefix = path[:-len('.gz')]
+            try:
+                with open(f"{prefix}.idx", 'rb') as f:
+                    entries = [
+                        (timestamp.decode('ascii'), offset)
+                        for timestamp, offset in INDEX_ENTRY.iter_unpack(f.read())
+                    ]
+            except OSError:
+                continue
+            if len(entries) >= 2:
+                result.append((path, entries))
+        return result
+
+    def read_segment(self, path, entries, start):
+        """Linhas de um segmento a partir do bloco que pode conter start (seek no .gz)"""
+        timestamps = [timestamp for timestamp, _ in entries[:-1]]
+        block = max(0, bisect.bisect_right(timestamps, start or '') - 1)
+
+        with open(path, 'rb') as f:
+            f.seek(entries[block][1])
+            with gzip.GzipFile(fileobj=f) as gz:
+                yield from io.TextIOWrapper(gz, encoding='utf-8', errors='replace')
+
+    def read_plain(self, path, start):
+        """Linhas de um arquivo não comprimido, com busca binária pelo timestamp"""
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            low, high = 0, size
+            while start and high - low > BLOCK_SIZE:
+                middle = (low + high) // 2
+                f.seek(middle)
+                f.readline()  # descarta linha parcial
+                timestamp = None
+                while timestamp is None:
+                    raw = f.readline()
+                    if not raw:
+                        break
+                    timestamp = line_timestamp(raw.decode('utf-8', errors='replace'))
+                if timestamp is None or timestamp >= start:
+                    high = middle
+                else:
+                    low = middle
+
+            f.seek(low)
+            if low:
+                f.readline()
+            for raw in f:
+                yield raw.decode('utf-8', errors='replace')
+
+    def sources(self, start, end):
+        """Fontes que podem conter o intervalo, da mais antiga para a mais nova"""
+        for path, entries in self.segments():
+            first, last = entries[0][0], entries[-1][0]
+            if (end and first > end) or (start and last < start):
+                continue
+            yield self.read_segment(path, entries, start)
+
+        for path in sorted(glob.glob(f"{self.filename}.*.log")) + [self.filename]:
+            yield self.read_plain(path, start)
+
+    def query(self, start=None, end=None, level=None, limit=1000):
+        """Linhas entre start e end (formato asctime), com nível mínimo opcional"""
+        start = normalize_time(start)
+        end = normalize_time(end, end=True)
+        min_level = LEVELS.get(level.upper(), 0) if level else 0
+
+        results = []
+        for lines in self.sources(start, end):
+            current, matched = None, False
+            for line in lines:
+                timestamp = line_timestamp(line)
+                if timestamp:
+                    current = timestamp
+                    matched = LEVELS.get(line_level(line), 0) >= min_level
+                if current is None or (start and current < start):
+                    continue
+                if end and current > end:
+                    break
+                # Linhas de continuação (tracebacks) seguem o registro a que pertencem
+                if not matched:
+                    continue
+                results.append(line.rstrip('\n'))
+                if len(results) >= limit:
+                    return results
+        return results
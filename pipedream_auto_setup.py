@@ -8,6 +8,8 @@ import json
 import requests
 import os
 from datetime import datetime
+from cost_tracker import estimate_monthly_cost
+from pipedream_deploy import PipedreamDeployer
 
 class PipedreamAutoSetup:
     def __init__(self):
@@ -148,6 +150,7 @@ class PipedreamAutoSetup:
     def generate_setup_report(self, workflow_id, success=True):
         """Gera relatório de configuração"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        estimated_executions = 180
         
         report = {
             "setup_date": timestamp,
@@ -156,8 +159,9 @@ class PipedreamAutoSetup:
             "configuration": {
                 "schedule": "Every 4 hours",
                 "apis_used": ["OpenAI", "Pollinations AI", "Google Drive"],
-                "estimated_monthly_cost": "$0.36",
-                "estimated_executions": 180
+                # Média observada por item (usage_costs.db) ou estimativa por tokens
+                "estimated_monthly_cost": f"${estimate_monthly_cost(estimated_executions):.2f}",
+                "estimated_executions": estimated_executions
             },
             "next_steps": [
                 "Configure OpenAI API key",
@@ -197,12 +201,7 @@ class PipedreamAutoSetup:
         if not workflow_data:
             return False
         
-        # Cria o workflow
-        workflow_id = self.create_workflow(workflow_data)
-        if not workflow_id:
-            return False
-        
-        # Configura variáveis de ambiente
+        # Variáveis de ambiente do workflow
         env_vars = {
             "OPENAI_API_KEY": "CONFIGURE_SUA_CHAVE_AQUI",
             "GOOGLE_DRIVE_FOLDER_ID": "CONFIGURE_ID_DA_PASTA_AQUI",
@@ -210,7 +209,11 @@ class PipedreamAutoSetup:
             "MAX_IMAGES_PER_CONTENT": "3"
         }
         
-        self.configure_environment_variables(workflow_id, env_vars)
+        # Deploy incremental: cria apenas na primeira vez e depois envia só as diferenças
+        deployer = PipedreamDeployer(self.base_url, self.headers)
+        workflow_id = deployer.deploy(workflow_data, env_vars, self.create_workflow)
+        if not workflow_id:
+            return False
         
         # Configura conexões com APIs
         self.setup_api_connections()
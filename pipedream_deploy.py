@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Motor de Deploy Incremental para Pipedream
+Compara o workflow remoto com o template local e envia apenas as diferenças
+"""
+
+import json
+import os
+import requests
+from datetime import datetime
+
+
+class PipedreamDeployer:
+    def __init__(self, base_url, headers, state_file='.pipedream_state.json'):
+        self.base_url = base_url
+        self.headers = headers
+        self.state_file = state_file
+        self.state = self.load_state()
+
+    def load_state(self):
+        """Carrega o estado remoto em cache (workflow_id, ETag e snapshot)"""
+        if not os.path.exists(self.state_file):
+            return {}
+
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print("⚠️ Cache de deploy inválido, ignorando")
+            return {}
+
+    def save_state(self):
+        """Persiste o estado remoto em cache"""
+        tmp_file = f"{self.state_file}.tmp"
+
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+
+        os.replace(tmp_file, self.state_file)
+
+    def snapshot(self, workflow, env_vars):
+        """Normaliza um workflow para comparação (nós indexados por id)"""
+        nodes = {}
+        for node in workflow.get('nodes', []):
+            key = node.get('id') or node.get('name')
+            nodes[key] = node
+
+        return {
+            'name': workflow.get('name'),
+            'description': workflow.get('description'),
+            'nodes': nodes,
+            'connections': workflow.get('connections', {}),
+            'environment_variables': dict(env_vars)
+        }
+
+    def remote_snapshot(self, remote):
+        """Converte a resposta da API em snapshot"""
+        env_vars = remote.get('environment_variables') or {}
+
+        # A API pode devolver as variáveis como lista de {"key", "value"}
+        if isinstance(env_vars, list):
+            env_vars = {item['key']: item.get('value') for item in env_vars}
+
+        return self.snapshot(remote, env_vars)
+
+    def fetch_remote(self, workflow_id, use_cache=True):
+        """Busca o workflow remoto usando If-None-Match quando há ETag em cache"""
+        headers = dict(self.headers)
+        cached_etag = self.state.get('etag')
+
+        if use_cache and cached_etag and self.state.get('snapshot'):
+            headers['If-None-Match'] = cached_etag
+
+        response = requests.get(
+            f"{self.base_url}/workflows/{workflow_id}",
+            headers=headers
+        )
+
+        if response.status_code == 304:
+            return self.state['snapshot'], cached_etag
+
+        if response.status_code == 200:
+            remote = response.json()
+            etag = response.headers.get('ETag') or str(remote.get('version', ''))
+            return self.remote_snapshot(remote), etag
+
+        if response.status_code == 404:
+            return None, None
+
+        raise RuntimeError(f"Erro ao buscar workflow: {response.status_code}")
+
+    def diff(self, local, remote):
+        """Calcula o patch mínimo entre o snapshot local e o remoto"""
+        patch = {}
+
+        for field in ('name', 'description'):
+            if local[field] != remote.get(field):
+                patch[field] = local[field]
+
+        remote_nodes = remote.get('nodes', {})
+        changed_nodes = [
+            node for key, node in local['nodes'].items()
+            if remote_nodes.get(key) != node
+        ]
+        removed_nodes = [key for key in remote_nodes if key not in local['nodes']]
+
+        if changed_nodes:
+            patch['nodes'] = changed_nodes
+        if removed_nodes:
+            patch['removed_nodes'] = removed_nodes
+
+        if local['connections'] != remote.get('connections', {}):
+            patch['connections'] = local['connections']
+
+        remote_env = remote.get('environment_variables', {})
+        changed_env = {
+            key: value for key, value in local['environment_variables'].items()
+            if remote_env.get(key) != value
+        }
+        if changed_env:
+            patch['environment_variables'] = changed_env
+
+        return patch
+
+    def apply_patch(self, workflow_id, patch, etag):
+        """Envia um único PATCH com as mudanças; retorna (status, nova ETag)"""
+        headers = dict(self.headers)
+        if etag:
+            headers['If-Match'] = etag
+
+        response = requests.patch(
+            f"{self.base_url}/workflows/{workflow_id}",
+            headers=headers,
+            json=patch
+        )
+
+        if response.status_code == 200:
+            body = response.json() if response.content else {}
+            new_etag = response.headers.get('ETag') or str(body.get('version', ''))
+            return response.status_code, new_etag
+
+        return response.status_code, None
+
+    def deploy(self, workflow_data, env_vars, create_workflow):
+        """Executa o deploy incremental; retorna o workflow_id ou None"""
+        local = self.snapshot(workflow_data, env_vars)
+        workflow_id = self.state.get('workflow_id')
+        remote, etag = None, None
+
+        try:
+            if workflow_id:
+                remote, etag = self.fetch_remote(workflow_id)
+
+            if remote is None:
+                # Sem workflow remoto conhecido: cria um novo uma única vez
+                workflow_id = create_workflow(workflow_data)
+                if not workflow_id:
+                    return None
+                remote = self.snapshot(workflow_data, {})
+                etag = None
+
+            patch = self.diff(local, remote)
+
+            if not patch:
+                print("✅ Workflow já está atualizado (nenhuma mudança)")
+            else:
+                print(f"🔄 Enviando mudanças: {', '.join(sorted(patch))}")
+                status, new_etag = self.apply_patch(workflow_id, patch, etag)
+
+                if status == 412:
+                    # Workflow alterado remotamente desde o último cache
+                    print("⚠️ ETag desatualizada, recalculando diferenças...")
+                    remote, etag = self.fetch_remote(workflow_id, use_cache=False)
+                    if remote is None:
+                        print(f"❌ Workflow {workflow_id} não pôde ser relido após o conflito")
+                        return None
+                    patch = self.diff(local, remote)
+                    if patch:
+                        status, new_etag = self.apply_patch(workflow_id, patch, etag)
+                    else:
+                        # A mudança remota já trouxe o workflow para o estado local
+                        status, new_etag = 200, etag
+
+                if status != 200:
+                    print(f"❌ Erro ao aplicar mudanças: {status}")
+                    return None
+
+                etag = new_etag
+                if patch:
+                    print(f"✅ Mudanças aplicadas: {len(patch.get('nodes', []))} nós, "
+                          f"{len(patch.get('environment_variables', {}))} variáveis")
+                else:
+                    print("✅ Workflow já está atualizado (nenhuma mudança)")
+
+            self.state = {
+                'workflow_id': workflow_id,
+                'etag': etag,
+                'snapshot': local,
+                'updated_at': datetime.now().isoformat()
+            }
+            self.save_state()
+            return workflow_id
+
+        except Exception as e:
+            print(f"❌ Erro no deploy incremental: {e}")
+            return None
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Perfis de Execução Sob Demanda
+Profiler por amostragem (tempo de parede, todas as threads ou só as escolhidas)
+que grava stacks colapsadas ou JSON do speedscope em logs/profiles, mantendo
+apenas os perfis mais recentes. Só é importado quando o perfil é pedido.
+"""
+
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_INTERVAL = 0.005  # segundos entre amostras
+DEFAULT_KEEP = 20
+
+# Frames da própria infraestrutura de threads, omitidos da base das stacks
+SKIPPED_FILES = ('threading.py',)
+
+
+def frame_label(code):
+    """Rótulo de um frame: função (arquivo:linha de definição)"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Amostra periodicamente as stacks via sys._current_frames()
+
+    Ao contrário do cProfile (uma thread por vez e custo em toda chamada), a
+    amostragem enxerga o ThreadPoolExecutor das imagens e mede tempo de parede,
+    incluindo a espera por LLM, API de imagens e disco.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.stacks = Counter()  # (thread, stack) -> segundos
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def sample(self, elapsed):
+        """Atribui o tempo decorrido desde a última amostra à stack atual de cada thread"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (self.thread_ids and thread_id not in self.thread_ids):
+                continue
+
+            stack = []
+            while frame is not None:
+                if os.path.basename(frame.f_code.co_filename) not in SKIPPED_FILES:
+                    stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[(names.get(thread_id, str(thread_id)), tuple(reversed(stack)))] += elapsed
+        self.samples += 1
+
+    def run(self):
+        # Peso pelo intervalo real (a espera pelo GIL atrasa as amostras)
+        last = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter()
+            self.sample(now - last)
+            last = now
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def collapsed(self):
+        """Formato de stacks colapsadas (flamegraph.pl, speedscope, inferno), em milissegundos"""
+        return '\n'.join(
+            f"{';'.join((thread_name,) + stack)} {max(1, round(seconds * 1000))}"
+            for (thread_name, stack), seconds in sorted(self.stacks.items())
+        ) + '\n'
+
+    def speedscope(self, name):
+        """Formato JSON do speedscope (um perfil 'sampled' por thread)"""
+        frames, frame_index = [], {}
+        profiles = {}
+
+        for (thread_name, stack), seconds in self.stacks.items():
+            indexes = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    function, _, location = label.partition(' (')
+                    file, _, line = location.rstrip(')').rpartition(':')
+                    frames.append({'name': function, 'file': file, 'line': int(line)})
+                indexes.append(frame_index[label])
+
+            profile = profiles.setdefault(thread_name, {
+                'type': 'sampled', 'name': thread_name, 'unit': 'seconds',
+                'startValue': 0, 'endValue': 0, 'samples': [], 'weights': []
+            })
+            profile['samples'].append(indexes)
+            profile['weights'].append(round(seconds, 6))
+            profile['endValue'] = round(profile['endValue'] + seconds, 6)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'profiling.py',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': list(profiles.values())
+        }
+
+    def top_functions(self, limit=5):
+        """Funções com mais tempo próprio (topo da stack)"""
+        totals = Counter()
+        for (_, stack), seconds in self.stacks.items():
+            totals[stack[-1]] += seconds
+        return totals.most_common(limit)
+
+
+def profile_dir():
+    """Diretório dos perfis (PROFILE_DIR ou LOG_DIR/profiles)"""
+    return os.getenv('PROFILE_DIR') or os.path.join(os.getenv('LOG_DIR', 'logs'), 'profiles')
+
+
+def save_profile(profiler, name, output_format=None, keep=None):
+    """Grava o perfil e remove os mais antigos além do limite; retorna o caminho"""
+    output_format = output_format or os.getenv('PROFILE_FORMAT', 'speedscope')
+    keep = int(keep if keep is not None else os.getenv('PROFILE_KEEP', str(DEFAULT_KEEP)))
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    safe_name = ''.join(char if char.isalnum() or char in '-_' else '_' for char in name)
+
+    if output_format == 'collapsed':
+        path = os.path.join(directory, f"{safe_name}_{stamp}_{os.getpid()}.collapsed.txt")
+        data = profiler.collapsed()
+    else:
+        path = os.path.join(directory, f"{safe_name}_{stamp}_{os.getpid()}.speedscope.json")
+        data = json.dumps(profiler.speedscope(name))
+
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+
+    # Limite de perfis guardados (mais antigos saem primeiro)
+    existing = sorted(glob.glob(os.path.join(directory, '*.speedscope.json')) +
+                      glob.glob(os.path.join(directory, '*.collapsed.txt')),
+                      key=os.path.getmtime)
+    for old in existing[:max(0, len(existing) - keep)]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+    logging.info(f"🔬 Perfil salvo: {path} ({profiler.samples} amostras, {profiler.duration:.2f}s)")
+    for label, seconds in profiler.top_functions():
+        logging.info(f"    {seconds:7.2f}s  {label}")
+    return path
+
+
+def start_profile(thread_ids=None):
+    """Inicia um profiler por amostragem (PROFILE_INTERVAL_MS)"""
+    interval = float(os.getenv('PROFILE_INTERVAL_MS', str(DEFAULT_INTERVAL * 1000))) / 1000
+    return SamplingProfiler(interval, thread_ids).start()
+
+
+def profile_run(name, func, *args, **kwargs):
+    """Executa func sob o profiler (todas as threads) e grava o perfil"""
+    profiler = start_profile()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.stop()
+        try:
+            path = save_profile(profiler, name)
+            print(f"🔬 Perfil salvo em: {path}")
+            for label, seconds in profiler.top_functions():
+                print(f"    {seconds:7.2f}s  {label}")
+        except Exception as e:
+            print(f"Erro ao salvar perfil: {e}")
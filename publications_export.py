@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Exportação de Publicações para Excel
+Gera planilhas em modo write-only do openpyxl a partir do catálogo de conteúdo,
+com memória limitada e uma planilha por mês (apenas meses alterados são reescritos)
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+from content_catalog import ContentCatalog
+
+# Mesmas colunas do Controle_Publicacoes.csv
+COLUMNS = [
+    'id', 'data_criacao', 'hora_criacao', 'roteiro',
+    'prompt_imagem_1', 'prompt_imagem_2', 'prompt_imagem_3',
+    'url_imagem_1', 'url_imagem_2', 'url_imagem_3',
+    'topico', 'indicador_usado', 'status', 'plataforma_publicada',
+    'views', 'likes', 'comentarios', 'shares', 'hashtags', 'observacoes'
+]
+
+# Colunas preenchidas à mão (publicação e engajamento): preservadas ao reescrever
+MANUAL_COLUMNS = COLUMNS[COLUMNS.index('plataforma_publicada'):]
+
+MANIFEST_FILE = 'manifest.json'
+CONSOLIDATED_FILE = 'publicacoes_consolidado.xlsx'
+
+
+def content_to_row(item, manual=None):
+    """Converte um item do catálogo em linha da planilha de publicações"""
+    created_date, _, created_time = item['created_at'].partition('T')
+    images = (item.get('images') or [])[:3]
+    images += [{}] * (3 - len(images))
+
+    return [
+        item['id'], created_date, created_time, item.get('script'),
+        *[image.get('prompt') for image in images],
+        *[image.get('url') for image in images],
+        item.get('topic'), item.get('indicator'), item.get('status'),
+        *(manual or [None] * len(MANUAL_COLUMNS))
+    ]
+
+
+def read_manual_values(path):
+    """Valores das colunas manuais por id, lidos da planilha existente (vazio se não houver)"""
+    if not os.path.exists(path):
+        return {}
+    from openpyxl import load_workbook
+
+    values = {}
+    try:
+        workbook = load_workbook(path, read_only=True)
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler {path} para preservar o engajamento: {e}")
+        return {}
+
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = list(next(rows, []))
+            if 'id' not in header or not all(column in header for column in MANUAL_COLUMNS):
+                continue
+            id_index = header.index('id')
+            indexes = [header.index(column) for column in MANUAL_COLUMNS]
+            for row in rows:
+                manual = [row[index] if index < len(row) else None for index in indexes]
+                if row and row[id_index] is not None and any(value is not None for value in manual):
+                    values[row[id_index]] = manual
+    finally:
+        workbook.close()
+    return values
+
+
+class PublicationsExporter:
+    def __init__(self, catalog=None, export_dir='exports'):
+        self.catalog = catalog or ContentCatalog()
+        self.export_dir = export_dir
+        os.makedirs(self.export_dir, exist_ok=True)
+
+    def month_path(self, month):
+        """Arquivo da planilha mensal"""
+        return os.path.join(self.export_dir, f"publicacoes_{month}.xlsx")
+
+    def load_manifest(self):
+        """Estado da última exportação por mês (total e último id)"""
+        path = os.path.join(self.export_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        """Persiste o manifesto atomicamente"""
+        path = os.path.join(self.export_dir, MANIFEST_FILE)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def write_sheet(self, workbook, month, manual=None):
+        """Escreve as linhas do mês em uma planilha write-only (streaming)"""
+        sheet = workbook.create_sheet(title=month)
+        sheet.append(COLUMNS)
+
+        manual = manual or {}
+        rows = 0
+        for item in self.catalog.iter_month(month):
+            sheet.append(content_to_row(item, manual.get(item['id'])))
+            rows += 1
+        return rows
+
+    def export_month(self, month):
+        """Reescreve a planilha de um mês; retorna a quantidade de linhas"""
+        from openpyxl import Workbook
+
+        path = self.month_path(month)
+        workbook = Workbook(write_only=True)
+        rows = self.write_sheet(workbook, month, read_manual_values(path))
+
+        workbook.save(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        return rows
+
+    def export(self, force=False):
+        """Exporta incrementalmente: só reescreve meses novos, alterados ou o mês atual"""
+        manifest = self.load_manifest()
+        current_month = datetime.now().strftime('%Y-%m')
+        exported = []
+
+        for month in self.catalog.months():
+            summary = self.catalog.month_summary(month)
+            unchanged = manifest.get(month) == summary and os.path.exists(self.month_path(month))
+
+            if unchanged and month != current_month and not force:
+                continue
+
+            rows = self.export_month(month)
+            manifest[month] = summary
+            exported.append(month)
+            print(f"📊 {month}: {rows} linhas exportadas")
+
+        self.save_manifest(manifest)
+        return exported
+
+    def consolidate(self, path=None):
+        """Gera a planilha consolidada (uma aba por mês), também em streaming
+
+        Por padrão grava em exports/, sem tocar no Publicações.xlsx mantido à mão;
+        se o arquivo de destino existir, as colunas manuais (engajamento) são preservadas.
+        """
+        from openpyxl import Workbook
+
+        path = path or os.path.join(self.export_dir, CONSOLIDATED_FILE)
+        manual = read_manual_values(path)
+        workbook = Workbook(write_only=True)
+        total = 0
+        for month in self.catalog.months():
+            total += self.write_sheet(workbook, month, manual)
+
+        workbook.save(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        print(f"📄 Planilha consolidada: {path} ({total} linhas)")
+        return total
+
+
+if __name__ == "__main__":
+    exporter = PublicationsExporter(export_dir=os.getenv('PUBLICATIONS_EXPORT_DIR', 'exports'))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'consolidate':
+        exporter.consolidate(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        months = exporter.export(force='--force' in sys.argv)
+        print(f"✅ Meses exportados: {', '.join(months) or 'nenhum (sem alterações)'}")
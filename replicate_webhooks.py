@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Conclusão de Predições da Replicate via Webhook
+O webhook_server verifica a assinatura e grava a predição concluída em uma caixa
+de entrada no volume compartilhado; o gerador espera um Future por predição,
+resolvido assim que o arquivo chega (sem GETs periódicos na API)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_INBOX_DIR = '/app/generated_content/replicate_inbox'
+SIGNATURE_TOLERANCE = 300  # segundos de diferença aceitos no webhook-timestamp
+TERMINAL_STATUSES = ('succeeded', 'failed', 'canceled')
+
+
+def verify_signature(headers, body, secret, tolerance=SIGNATURE_TOLERANCE):
+    """Verifica a assinatura do webhook da Replicate (padrão Standard Webhooks)
+
+    Conteúdo assinado: "{webhook-id}.{webhook-timestamp}.{corpo}", HMAC-SHA256 com
+    o segredo (base64 após o prefixo whsec_); webhook-signature traz "v1,<base64>".
+    """
+    webhook_id = headers.get('webhook-id')
+    timestamp = headers.get('webhook-timestamp')
+    signatures = headers.get('webhook-signature')
+
+    if not (webhook_id and timestamp and signatures and secret):
+        return False
+
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+        key = base64.b64decode(secret.split('_', 1)[1] if secret.startswith('whsec_') else secret)
+    except ValueError:
+        return False
+
+    signed_content = f"{webhook_id}.{timestamp}.".encode('utf-8') + body
+    expected = base64.b64encode(hmac.new(key, signed_content, hashlib.sha256).digest()).decode()
+
+    for signature in signatures.split():
+        version, _, value = signature.partition(',')
+        if version == 'v1' and hmac.compare_digest(value, expected):
+            return True
+    return False
+
+
+class PredictionInbox:
+    def __init__(self, inbox_dir=None, poll_interval=0.1, max_age=3600):
+        self.inbox_dir = inbox_dir or os.getenv('REPLICATE_INBOX_DIR', DEFAULT_INBOX_DIR)
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.waiting = {}
+        self.thread = None
+
+        os.makedirs(self.inbox_dir, exist_ok=True)
+
+    def path(self, prediction_id):
+        """Arquivo da predição na caixa de entrada"""
+        safe_id = ''.join(char for char in prediction_id if char.isalnum() or char in '-_')
+        return os.path.join(self.inbox_dir, f"{safe_id}.json")
+
+    def deliver(self, prediction):
+        """Grava uma predição concluída (lado do webhook_server) e resolve esperas locais"""
+        if prediction.get('status') not in TERMINAL_STATUSES:
+            return False
+
+        path = self.path(prediction['id'])
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(prediction, f)
+        os.replace(f"{path}.tmp", path)
+
+        self.resolve(prediction['id'])
+        return True
+
+    def expect(self, prediction_id):
+        """Registra a espera por uma predição; retorna um Future"""
+        future = Future()
+        with self.lock:
+            self.waiting[prediction_id] = future
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.watch_loop, name='replicate-inbox', daemon=True)
+                self.thread.start()
+
+        # A predição pode ter concluído antes do registro
+        self.resolve(prediction_id)
+        return future
+
+    def forget(self, prediction_id):
+        """Cancela a espera (ex.: timeout, seguindo para o polling)"""
+        with self.lock:
+            self.waiting.pop(prediction_id, None)
+
+    def resolve(self, prediction_id):
+        """Resolve o Future se a predição já chegou na caixa de entrada"""
+        path = self.path(prediction_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                prediction = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+
+        with self.lock:
+            future = self.waiting.pop(prediction_id, None)
+        if future is None:
+            return False
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        future.set_result(prediction)
+        return True
+
+    def watch_loop(self):
+        """Verifica a caixa de entrada (disco local) enquanto houver esperas"""
+        while True:
+            with self.lock:
+                pending = list(self.waiting)
+                if not pending:
+                    self.thread = None
+                    return
+
+            for prediction_id in pending:
+                self.resolve(prediction_id)
+            time.sleep(self.poll_interval)
+
+    def purge(self):
+        """Remove entregas antigas que ninguém consumiu"""
+        removed = 0
+        cutoff = time.time() - self.max_age
+        for name in os.listdir(self.inbox_dir):
+            path = os.path.join(self.inbox_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+
+        if removed:
+            logging.info(f"🗑️ {removed} entrega(s) antiga(s) da Replicate removida(s)")
+        return removed
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Checkpoints de Execução do Gerador
+Cada execução grava as saídas das etapas (roteiro, prompts, imagens) sob um
+run id; uma nova tentativa retoma da primeira etapa incompleta sem pagar de
+novo pelas chamadas já concluídas
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_CHECKPOINT_DIR = 'checkpoints'
+
+
+class RunCheckpoint:
+    """Estado de uma execução em <dir>/<run_id>.json, gravado atomicamente
+
+    Enquanto a execução roda, <run_id>.lock fica com flock exclusivo: outro
+    worker não retoma a mesma execução, e se o processo morrer o kernel
+    libera o lock e a execução volta a ser retomável.
+    """
+
+    def __init__(self, checkpoint_dir, run_id, state, lock_file, url_ttl_seconds=3600):
+        self.checkpoint_dir = checkpoint_dir
+        self.run_id = run_id
+        self.state = state
+        self.lock_file = lock_file
+        self.url_ttl_seconds = url_ttl_seconds
+        self.lock = threading.Lock()
+
+    @classmethod
+    def open(cls, generator, checkpoint_dir=None, run_id=None, create=False):
+        """Retoma a execução run_id (ou a incompleta mais recente) ou inicia uma nova
+
+        Com create=True, um run_id sem checkpoint inicia uma execução nova com
+        esse id (ids previsíveis, como os itens de um backfill).
+        """
+        checkpoint_dir = checkpoint_dir or os.getenv('CHECKPOINT_DIR', DEFAULT_CHECKPOINT_DIR)
+        max_age = float(os.getenv('CHECKPOINT_MAX_AGE_HOURS', '24')) * 3600
+        url_ttl = float(os.getenv('CHECKPOINT_URL_TTL_HOURS', '1')) * 3600
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        candidates = [run_id] if run_id else cls.incomplete(checkpoint_dir, generator, max_age)
+        for candidate in candidates:
+            lock_file = cls.claim(checkpoint_dir, candidate)
+            if lock_file is None:
+                continue  # em andamento em outro worker
+            try:
+                with open(os.path.join(checkpoint_dir, f"{candidate}.json"), 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                if run_id and create:
+                    return cls.start(checkpoint_dir, generator, run_id, lock_file, url_ttl)
+                lock_file.close()
+                if run_id:
+                    RunCheckpoint.remove(checkpoint_dir, run_id)
+                    raise ValueError(f"Checkpoint não encontrado: {run_id}")
+                continue
+
+            state['attempts'] = state.get('attempts', 0) + 1
+            checkpoint = cls(checkpoint_dir, candidate, state, lock_file, url_ttl)
+            checkpoint.write()
+            return checkpoint
+
+        new_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}"
+        return cls.start(checkpoint_dir, generator, new_id, cls.claim(checkpoint_dir, new_id), url_ttl)
+
+    @classmethod
+    def start(cls, checkpoint_dir, generator, new_id, lock_file, url_ttl):
+        """Cria o checkpoint de uma execução nova (lock já adquirido)"""
+        state = {
+            'run_id': new_id,
+            'generator': generator,
+            'created_at': time.time(),
+            'attempts': 1,
+            'images': {}
+        }
+        checkpoint = cls(checkpoint_dir, new_id, state, lock_file, url_ttl)
+        checkpoint.write()
+        return checkpoint
+
+    @staticmethod
+    def claim(checkpoint_dir, run_id):
+        """Lock exclusivo da execução; None se outro processo a detém"""
+        lock_file = open(os.path.join(checkpoint_dir, f"{run_id}.lock"), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    @staticmethod
+    def incomplete(checkpoint_dir, generator, max_age):
+        """Execuções incompletas deste gerador, da mais recente para a mais antiga
+
+        Checkpoints além de max_age são descartados (conteúdo velho demais).
+        """
+        candidates = []
+        for path in glob.glob(os.path.join(checkpoint_dir, '*.json')):
+            run_id = os.path.basename(path)[:-len('.json')]
+            try:
+                modified = os.path.getmtime(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    owner = json.load(f).get('generator')
+            except (OSError, json.JSONDecodeError):
+                continue
+
+            if time.time() - modified > max_age:
+                RunCheckpoint.remove(checkpoint_dir, run_id)
+                logging.info(f"🗑️ Checkpoint expirado removido: {run_id}")
+                continue
+            if owner == generator:
+                candidates.append((modified, run_id))
+
+        return [run_id for _, run_id in sorted(candidates, reverse=True)]
+
+    @staticmethod
+    def remove(checkpoint_dir, run_id):
+        """Apaga o estado e o lock de uma execução"""
+        for suffix in ('.json', '.lock'):
+            try:
+                os.remove(os.path.join(checkpoint_dir, f"{run_id}{suffix}"))
+            except OSError:
+                pass
+
+    @property
+    def resumed(self):
+        """Execução retomada de uma tentativa anterior"""
+        return self.state.get('attempts', 1) > 1
+
+    @property
+    def attempts(self):
+        return self.state.get('attempts', 1)
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.state.get(key, default)
+
+    def write(self):
+        """Grava o estado atomicamente (tmp + os.replace)"""
+        self.state['updated_at'] = time.time()
+        path = os.path.join(self.checkpoint_dir, f"{self.run_id}.json")
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def update(self, **fields):
+        """Registra a saída de uma etapa concluída"""
+        with self.lock:
+            self.state.update(fields)
+            self.write()
+
+    def image(self, index):
+        """Imagem já concluída no índice, se ainda utilizável
+
+        Arquivos locais precisam existir; imagens só com URL valem por
+        url_ttl_seconds (URLs de saída da Replicate expiram).
+        """
+        with self.lock:
+            image = self.state['images'].get(str(index))
+        if not image:
+            return None
+
+        data = image['data']
+        if data.get('local_file'):
+            return data if os.path.exists(data['local_file']) else None
+        if time.time() - image['completed_at'] > self.url_ttl_seconds:
+            return None
+        return data
+
+    def set_image(self, index, data):
+        """Registra uma imagem concluída (chamado pelas threads de imagem)"""
+        with self.lock:
+            self.state['images'][str(index)] = {'completed_at': time.time(), 'data': data}
+            self.write()
+
+    def complete(self):
+        """Execução concluída: remove o checkpoint e libera o lock"""
+        self.remove(self.checkpoint_dir, self.run_id)
+        self.release()
+
+    def release(self):
+        """Libera o lock mantendo o checkpoint para uma nova tentativa"""
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
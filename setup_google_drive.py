@@ -6,10 +6,6 @@ Cria todas as pastas necessárias e configura permissões
 
 import json
 import os
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 import pickle
 
 class GoogleDriveSetup:
@@ -20,6 +16,11 @@ class GoogleDriveSetup:
         
     def authenticate(self):
         """Autentica com o Google Drive"""
+        # Imports pesados das APIs do Google só quando o Drive é realmente usado
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+        from googleapiclient.discovery import build
+        
         creds = None
         
         # Token salvo anteriormente
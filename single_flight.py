@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Single-Flight e Chaves de Idempotência
+Agrupa chamadas concorrentes com a mesma chave em uma única execução e
+guarda o resultado por uma janela configurável (entre threads e processos)
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+# Resultado de chamadas sem cache (ttl 0): só serve aos processos que esperavam o flock
+FLIGHT_RESULT_SECONDS = 300
+
+
+class InFlightCall:
+    """Execução em andamento compartilhada pelas threads que esperam a mesma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, state_dir, ttl_seconds=600):
+        self.state_dir = state_dir
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def key_path(self, key, suffix):
+        """Caminho do arquivo de estado da chave (nome por hash, seguro para o disco)"""
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.state_dir, f"{digest}.{suffix}")
+
+    def cached(self, key, ttl_seconds, suffix='json'):
+        """Resultado já concluído dentro da janela de cache (ou None)"""
+        path = self.key_path(key, suffix)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl_seconds:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def store(self, key, result, suffix='json'):
+        """Grava o resultado para as demais chamadas e processos"""
+        path = self.key_path(key, suffix)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def do(self, key, func, ttl_seconds=None, store_if=None):
+        """Executa func uma única vez por chave; retorna (resultado, compartilhado)
+
+        Threads do mesmo processo esperam o evento da execução em andamento;
+        outros processos (workers do gunicorn) esperam o flock da chave e leem
+        o resultado gravado. func deve retornar um valor serializável em JSON;
+        store_if decide se o resultado vai para o cache (ex.: não guardar falhas).
+        """
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+
+        if ttl_seconds:
+            result = self.cached(key, ttl_seconds)
+            if result is not None:
+                return result, True
+
+        with self.lock:
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self.in_flight[key] = InFlightCall()
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        # Sem janela de cache o resultado vai para um arquivo de vida curta, lido apenas
+        # pelos processos que esperavam esta mesma execução
+        suffix = 'json' if ttl_seconds else 'flight.json'
+        started = time.time()
+        try:
+            with open(self.key_path(key, 'lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                # Outro processo pode ter concluído enquanto esperávamos o lock
+                path = self.key_path(key, suffix)
+                if os.path.exists(path) and os.path.getmtime(path) >= started:
+                    call.result = self.cached(key, time.time() - started + 1, suffix)
+                    shared = call.result is not None
+                else:
+                    shared = False
+
+                if not shared:
+                    call.result = func()
+                    if store_if is None or store_if(call.result):
+                        self.store(key, call.result, suffix)
+
+            return call.result, shared
+
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            call.done.set()
+
+    def purge(self, grace_seconds=3600):
+        """Remove resultados e locks antigos do disco (com folga para execuções longas)"""
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, name)
+            lifetime = FLIGHT_RESULT_SECONDS if name.endswith('.flight.json') else self.ttl_seconds + grace_seconds
+            try:
+                if now - os.path.getmtime(path) > lifetime:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
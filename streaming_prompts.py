@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Streaming de Completions com Parser Incremental de Prompts
+Emite cada elemento de "image_prompts" assim que o JSON do objeto fecha,
+permitindo iniciar a geração de imagens enquanto o LLM ainda escreve
+"""
+
+import json
+import requests
+
+OPENAI_CHAT_URL = 'https://api.openai.com/v1/chat/completions'
+
+
+def stream_chat_completion(api_key, data, timeout=60, on_usage=None):
+    """Faz uma chamada stream=True e gera os pedaços de texto (Server-Sent Events)
+
+    Com on_usage, pede o uso de tokens no último evento e o repassa ao callback.
+    """
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+    body = {**data, 'stream': True}
+    if on_usage:
+        body['stream_options'] = {'include_usage': True}
+
+    with requests.post(OPENAI_CHAT_URL, headers=headers, json=body,
+                       stream=True, timeout=timeout) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro no streaming: {response.status_code}")
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+
+            payload = line[5:].strip()
+            if payload == '[DONE]':
+                break
+
+            event = json.loads(payload)
+            if on_usage and event.get('usage'):
+                on_usage(event['usage'])
+
+            for choice in event.get('choices', []):
+                delta = choice.get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+
+class IncrementalPromptParser:
+    """Parser incremental do formato {"image_prompts": [{...}, {...}]}
+
+    Ignora cercas ```json e qualquer texto antes da chave; acompanha strings,
+    escapes e profundidade de chaves para saber quando cada objeto terminou.
+    """
+
+    KEY = '"image_prompts"'
+
+    def __init__(self):
+        self.buffer = ''
+        self.position = 0
+        self.in_array = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+
+    def feed(self, chunk):
+        """Adiciona texto e retorna a lista de prompts completados neste pedaço"""
+        self.buffer += chunk
+        completed = []
+
+        if self.done:
+            return completed
+
+        if not self.in_array:
+            key_index = self.buffer.find(self.KEY)
+            if key_index < 0:
+                return completed
+            array_index = self.buffer.find('[', key_index + len(self.KEY))
+            if array_index < 0:
+                return completed
+            self.in_array = True
+            self.position = array_index + 1
+
+        buffer = self.buffer
+        for index in range(self.position, len(buffer)):
+            char = buffer[index]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char == '{':
+                if self.depth == 0:
+                    self.object_start = index
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0 and self.object_start is not None:
+                    completed.append(json.loads(buffer[self.object_start:index + 1]))
+                    self.object_start = None
+            elif char == ']' and self.depth == 0:
+                self.done = True
+                self.position = index + 1
+                return completed
+
+        self.position = len(buffer)
+        return completed
+
+
+def stream_image_prompts(api_key, data, on_usage=None):
+    """Gera cada prompt de imagem assim que ele estiver completo no stream"""
+    parser = IncrementalPromptParser()
+
+    for chunk in stream_chat_completion(api_key, data, on_usage=on_usage):
+        for prompt_data in parser.feed(chunk):
+            if 'prompt' in prompt_data:
+                yield prompt_data
+
+        # Sem callback de uso, não há motivo para ler o restante do stream
+        if parser.done and not on_usage:
+            break
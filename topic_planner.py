@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Planejador de Tópicos × Indicadores
+Enumera sob demanda as combinações tópico × indicador e escolhe a próxima por
+um heap de prioridades (recência e engajamento do histórico), sem repetir
+combinações nem tópicos dentro de uma janela configurável
+"""
+
+import csv
+import heapq
+import itertools
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+from content_catalog import DEFAULT_CATALOG_DB
+
+# Bônus máximo de engajamento: uma combinação com engajamento 1.0 volta à fila
+# como se tivesse sido usada ENGAGEMENT_BONUS_SECONDS mais cedo
+ENGAGEMENT_BONUS_SECONDS = 2 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topic_history (
+    topic TEXT NOT NULL,
+    indicator TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL DEFAULT 0,
+    engagement REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (topic, indicator)
+);
+CREATE INDEX IF NOT EXISTS idx_topic_history_updated ON topic_history (updated_at);
+CREATE INDEX IF NOT EXISTS idx_topic_history_last_used ON topic_history (last_used);
+"""
+
+
+def engagement_score(views, likes, comments, shares):
+    """Pontuação bruta de engajamento de uma publicação"""
+    return views + 5 * likes + 10 * comments + 20 * shares
+
+
+class TopicPlanner:
+    def __init__(self, topics, indicators, db_path=None, window=None, topic_window=None):
+        self.topics = list(topics)
+        self.indicators = list(indicators)
+        self.db_path = db_path or os.getenv('CONTENT_CATALOG_DB', DEFAULT_CATALOG_DB)
+
+        # Janela sem repetição: últimas N combinações e últimos M tópicos
+        self.window = int(window if window is not None else os.getenv('TOPIC_REPEAT_WINDOW', '20'))
+        self.topic_window = int(topic_window if topic_window is not None
+                                else os.getenv('TOPIC_TOPIC_WINDOW', '3'))
+
+        # Heap de (chave, desempate, combinação) com invalidação preguiçosa
+        self.heap = []
+        self.keys = {}
+        self.counter = itertools.count()
+        self.synced_at = 0.0
+        self.unused = self.permutation()
+        self.deferred = []
+
+        with closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """Abre uma conexão (uma por operação)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @property
+    def size(self):
+        """Tamanho do espaço de combinações"""
+        return len(self.topics) * len(self.indicators)
+
+    def combination(self, index):
+        """Combinação de número index, sem materializar o produto cartesiano"""
+        topic_index, indicator_index = divmod(index, len(self.indicators))
+        return self.topics[topic_index], self.indicators[indicator_index]
+
+    def permutation(self):
+        """Percorre todas as combinações em ordem aleatória, uma por vez
+
+        Permutação afim (a·k + b) mod n com a coprimo de n: O(1) de memória.
+        """
+        n = self.size
+        if n == 0:
+            return
+        step = random.randrange(1, n) if n > 1 else 1
+        while math.gcd(step, n) != 1:
+            step += 1
+        offset = random.randrange(n)
+        for k in range(n):
+            yield self.combination((step * k + offset) % n)
+
+    @staticmethod
+    def priority(last_used, engagement):
+        """Chave do heap: menor = escolhida antes; invariável no tempo (o heap não envelhece)"""
+        return last_used - min(max(engagement, 0.0), 1.0) * ENGAGEMENT_BONUS_SECONDS
+
+    def push(self, combo, last_used, engagement):
+        """Atualiza a chave de uma combinação (entradas antigas ficam obsoletas no heap)"""
+        key = self.priority(last_used, engagement)
+        self.keys[combo] = key
+        heapq.heappush(self.heap, (key, next(self.counter), combo))
+
+    def sync(self):
+        """Aplica ao heap apenas as linhas alteradas desde a última leitura"""
+        known = set(self.topics)
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT topic, indicator, last_used, engagement, updated_at FROM topic_history "
+                "WHERE updated_at > ?", (self.synced_at,)
+            ).fetchall()
+
+        for row in rows:
+            if row['topic'] in known and row['indicator'] in self.indicators:
+                self.push((row['topic'], row['indicator']), row['last_used'], row['engagement'])
+            self.synced_at = max(self.synced_at, row['updated_at'])
+
+    def recent(self):
+        """Combinações usadas mais recentemente (tamanho da janela)"""
+        limit = max(self.window, self.topic_window)
+        if limit <= 0:
+            return []
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT topic, indicator FROM topic_history WHERE last_used > 0 "
+                "ORDER BY last_used DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row['topic'], row['indicator']) for row in rows]
+
+    def allowed(self, combo, recent):
+        """Verifica a janela sem repetição (combinação e tópico)"""
+        if combo in recent[:self.window]:
+            return False
+        return combo[0] not in {topic for topic, _ in recent[:self.topic_window]}
+
+    def next_unused(self, recent):
+        """Próxima combinação nunca usada (enumeração preguiçosa)
+
+        Inéditas barradas pela janela de tópicos ficam adiadas, não descartadas.
+        """
+        self.deferred = [combo for combo in self.deferred if combo not in self.keys]
+        for position, combo in enumerate(self.deferred):
+            if self.allowed(combo, recent):
+                return self.deferred.pop(position)
+
+        for combo in self.unused:
+            if combo in self.keys:
+                continue
+            if self.allowed(combo, recent):
+                return combo
+            self.deferred.append(combo)
+        return None
+
+    def pop_allowed(self, recent):
+        """Retira do heap a combinação de menor chave fora da janela: O(log n) por item"""
+        skipped = []
+        chosen = None
+
+        while self.heap:
+            key, _, combo = heapq.heappop(self.heap)
+            if self.keys.get(combo) != key:
+                continue  # entrada obsoleta
+            if self.allowed(combo, recent):
+                chosen = combo
+                break
+            skipped.append((key, next(self.counter), combo))
+
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return chosen
+
+    def pick(self):
+        """Escolhe e registra a próxima combinação (tópico, indicador)"""
+        self.sync()
+        recent = self.recent()
+
+        # Combinações inéditas primeiro; depois a de maior prioridade no histórico
+        combo = self.next_unused(recent) or self.pop_allowed(recent)
+
+        # Espaço menor que a janela: relaxa a restrição em vez de travar
+        if combo is None:
+            combo = self.next_unused([]) or self.pop_allowed([])
+        if combo is None:
+            combo = random.choice(self.topics), random.choice(self.indicators)
+
+        self.record_use(*combo)
+        return combo
+
+    def record_use(self, topic, indicator):
+        """Marca a combinação como usada agora"""
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "INSERT INTO topic_history (topic, indicator, uses, last_used, updated_at) "
+                "VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT (topic, indicator) DO UPDATE SET "
+                "uses = uses + 1, last_used = excluded.last_used, updated_at = excluded.updated_at",
+                (topic, indicator, now, now)
+            )
+            engagement = conn.execute(
+                "SELECT engagement FROM topic_history WHERE topic = ? AND indicator = ?",
+                (topic, indicator)
+            ).fetchone()['engagement']
+
+        self.push((topic, indicator), now, engagement)
+        self.synced_at = max(self.synced_at, now)
+
+    def record_engagement(self, scores):
+        """Grava o engajamento normalizado (0..1) de {(tópico, indicador): pontuação}"""
+        if not scores:
+            return 0
+
+        top = max(scores.values()) or 1
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.executemany(
+                "INSERT INTO topic_history (topic, indicator, engagement, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (topic, indicator) DO UPDATE SET "
+                "engagement = excluded.engagement, updated_at = excluded.updated_at",
+                [(topic, indicator, score / top, now) for (topic, indicator), score in scores.items()]
+            )
+        return len(scores)
+
+
+def load_engagement(csv_path):
+    """Média de engajamento por (tópico, indicador) a partir do Controle_Publicacoes.csv"""
+    def number(value):
+        try:
+            return float(value or 0)
+        except ValueError:
+            return 0.0
+
+    totals = {}
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            key = (row.get('topico') or '', row.get('indicador_usado') or '')
+            score = engagement_score(number(row.get('views')), number(row.get('likes')),
+                                     number(row.get('comentarios')), number(row.get('shares')))
+            count, total = totals.get(key, (0, 0.0))
+            totals[key] = (count + 1, total + score)
+
+    return {key: total / count for key, (count, total) in totals.items() if total > 0}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'engagement':
+        path = sys.argv[2] if len(sys.argv) > 2 else 'Controle_Publicacoes.csv'
+        updated = TopicPlanner([], []).record_engagement(load_engagement(path))
+        print(f"📈 Engajamento atualizado para {updated} combinação(ões)")
+    else:
+        print("Uso: python3 topic_planner.py engagement [Controle_Publicacoes.csv]")
@@ -4,28 +4,121 @@ Servidor Webhook para Day Trade Content Generator
 Permite triggering manual e integração com serviços externos
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 import subprocess
 import os
 import logging
 import hmac
 import hashlib
+import threading
+import time
 from datetime import datetime
 
+from app_config import get_config, settings
+from content_buffer import ContentBuffer
+from content_catalog import ContentCatalog
+from cost_tracker import CostTracker
+from disk_budget import open_budget
+from job_queue import JobQueue
+from log_store import LogStore, configure_logging
+from replicate_webhooks import PredictionInbox, verify_signature as verify_replicate_signature
+from single_flight import SingleFlight
+
 app = Flask(__name__)
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/app/logs/webhook.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging (rotação por tamanho/idade com segmentos comprimidos)
+LOG_DIR = os.getenv('LOG_DIR', '/app/logs')
+LOG_FILES = {
+    'automation': os.path.join(LOG_DIR, 'automation.log'),
+    'webhook': os.path.join(LOG_DIR, 'webhook.log')
+}
+configure_logging(LOG_FILES['webhook'])
 
 WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', 'default_secret')
 
+# Com coordenação, o webhook apenas enfileira e os containers geradores executam
+COORDINATION_DB = os.getenv('COORDINATION_DB')
+job_queue = JobQueue(COORDINATION_DB) if COORDINATION_DB else None
+
+# Estoque de conteúdo pré-gerado para resposta imediata (CONTENT_BUFFER_DEPTH > 0)
+# Configuração tipada: caminhos lidos na inicialização, o resto recarregado a quente
+CONTENT_DIR = settings().content_dir
+content_buffer = ContentBuffer.from_env()
+
+# Cota de disco do volume de conteúdo (despejo LRU só do que já foi sincronizado com o Drive)
+disk_budget = open_budget(CONTENT_DIR)
+
+# Agrupamento de triggers duplicados (Idempotency-Key) entre threads e workers
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '600'))
+single_flight = SingleFlight(
+    os.getenv('IDEMPOTENCY_DIR', '/tmp/day-trade-idempotency'),
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+)
+
+# Limpeza periódica de resultados/locks de idempotência e da caixa de predições
+STATE_PURGE_SECONDS = int(os.getenv('STATE_PURGE_SECONDS', '3600'))
+
+# Predições da Replicate concluídas (push) entregues ao gerador pelo volume compartilhado
+REPLICATE_WEBHOOK_SECRET = os.getenv('REPLICATE_WEBHOOK_SECRET')
+prediction_inbox = PredictionInbox() if REPLICATE_WEBHOOK_SECRET else None
+
+# ?profile=1 grava um perfil por amostragem da requisição em LOG_DIR/profiles
+# (desligado por padrão: qualquer cliente poderia disparar o amostrador)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+
+# Métricas simples do processo (expostas em /metrics)
+STARTED_AT = time.time()
+metrics_lock = threading.Lock()
+request_metrics = {'requests_total': 0, 'requests_in_flight': 0, 'errors_total': 0}
+
+def start_background_tasks():
+    """Inicia threads de background (chamado após o fork em cada worker do gunicorn)"""
+    if content_buffer:
+        content_buffer.start()
+    threading.Thread(target=purge_state_loop, name='state-purge', daemon=True).start()
+    get_config().watch()
+
+def purge_state_loop():
+    """Remove periodicamente o estado antigo do disco (idempotência e predições recebidas)"""
+    while True:
+        try:
+            removed = single_flight.purge()
+            if prediction_inbox:
+                prediction_inbox.purge()
+            if removed:
+                logging.info(f"🧹 {removed} arquivos de idempotência expirados removidos")
+        except Exception as e:
+            logging.error(f"Erro na limpeza de estado: {e}")
+        time.sleep(STATE_PURGE_SECONDS)
+
+@app.before_request
+def track_request_start():
+    """Contabiliza requisições em andamento"""
+    with metrics_lock:
+        request_metrics['requests_total'] += 1
+        request_metrics['requests_in_flight'] += 1
+    
+    # Sem ?profile=1 o custo é só esta verificação (profiling nem é importado)
+    if PROFILING_ENABLED and request.args.get('profile') == '1':
+        from profiling import start_profile
+        g.profiler = start_profile(thread_ids=[threading.get_ident()])
+
+@app.teardown_request
+def track_request_end(error=None):
+    """Finaliza a contabilização da requisição"""
+    with metrics_lock:
+        request_metrics['requests_in_flight'] -= 1
+        if error is not None:
+            request_metrics['errors_total'] += 1
+    
+    profiler = g.pop('profiler', None)
+    if profiler:
+        from profiling import save_profile
+        try:
+            save_profile(profiler.stop(), f"webhook{request.path.replace('/', '_')}")
+        except Exception as e:
+            logging.error(f"Erro ao salvar perfil: {e}")
+
 def verify_signature(payload, signature, secret):
     """Verifica a assinatura do webhook"""
     expected_signature = hmac.new(
@@ -45,23 +138,76 @@ def health_check():
         'service': 'day-trade-content-generator'
     })
 
-@app.route('/webhook/generate', methods=['POST'])
-def webhook_generate():
-    """Endpoint para trigger manual de geração de conteúdo"""
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas do worker em formato texto do Prometheus"""
+    with metrics_lock:
+        snapshot = dict(request_metrics)
+    
+    lines = [
+        f"webhook_uptime_seconds {time.time() - STARTED_AT:.0f}",
+        f"webhook_requests_total {snapshot['requests_total']}",
+        f"webhook_requests_in_flight {snapshot['requests_in_flight']}",
+        f"webhook_errors_total {snapshot['errors_total']}",
+        f"webhook_worker_pid {os.getpid()}"
+    ]
+    
+    if job_queue:
+        lines.append(f"job_queue_depth {job_queue.depth()}")
+    if content_buffer:
+        lines.append(f"content_buffer_depth {content_buffer.stats()['depth']}")
+    if disk_budget:
+        try:
+            disk = disk_budget.stats()
+            lines.append(f"content_disk_used_bytes {int(disk['used_mb'] * 1024 * 1024)}")
+            lines.append(f"content_disk_headroom_bytes {int(disk['headroom_mb'] * 1024 * 1024)}")
+            lines.append(f"content_disk_pressure {['ok', 'degrade', 'pause'].index(disk['pressure'])}")
+        except Exception as e:
+            logging.error(f"Erro ao ler orçamento de disco: {e}")
+    
     try:
-        # Verifica assinatura se configurada
-        signature = request.headers.get('X-Hub-Signature-256')
-        if signature and WEBHOOK_SECRET != 'default_secret':
-            if not verify_signature(request.data, signature, WEBHOOK_SECRET):
-                logging.warning("Assinatura inválida no webhook")
-                return jsonify({'error': 'Invalid signature'}), 401
+        costs = CostTracker().summary(days=30)
+        lines.append(f"content_cost_today_usd {costs['today_usd']}")
+        lines.append(f"content_cost_month_usd {costs['month_to_date_usd']}")
+        if costs['cost_per_item_usd'] is not None:
+            lines.append(f"content_cost_per_item_usd {costs['cost_per_item_usd']}")
+        lines.append(f"content_budget_exhausted {int(costs['budget_state'] == 'exhausted')}")
+    except Exception as e:
+        logging.error(f"Erro ao ler custos: {e}")
+    
+    return '\n'.join(lines) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+def run_generation(remote_addr, profile=False):
+    """Entrega ou gera conteúdo; retorna (payload, status HTTP)"""
+    try:
+        if content_buffer:
+            content = content_buffer.pop(CONTENT_DIR)
+            if content:
+                logging.info(f"Conteúdo entregue do buffer via webhook: {content['file']}")
+                return {
+                    'status': 'success',
+                    'message': 'Content delivered from buffer',
+                    'timestamp': datetime.now().isoformat(),
+                    'content': content
+                }, 200
         
-        # Log da requisição
-        logging.info(f"Webhook recebido de {request.remote_addr}")
+        if job_queue:
+            job_id = job_queue.enqueue('content_generation', {
+                'source': 'webhook',
+                'remote_addr': remote_addr
+            })
+            logging.info(f"Job {job_id} enfileirado via webhook")
+            return {
+                'status': 'queued',
+                'job_id': job_id,
+                'queue_depth': job_queue.depth(),
+                'timestamp': datetime.now().isoformat()
+            }, 202
         
         # Executa o gerador de conteúdo
+        # Com ?profile=1 o gerador também grava o próprio perfil (processo separado)
         result = subprocess.run(
-            ['python', '/app/day_trade_generator_free.py'],
+            ['python', settings().free_generator_script] + (['--profile'] if profile else []),
             capture_output=True,
             text=True,
             timeout=300
@@ -69,26 +215,68 @@ def webhook_generate():
         
         if result.returncode == 0:
             logging.info("Conteúdo gerado com sucesso via webhook")
-            return jsonify({
+            return {
                 'status': 'success',
                 'message': 'Content generated successfully',
                 'timestamp': datetime.now().isoformat(),
                 'output': result.stdout
-            })
+            }, 200
         else:
             logging.error(f"Erro na geração via webhook: {result.stderr}")
-            return jsonify({
+            return {
                 'status': 'error',
                 'message': 'Content generation failed',
                 'error': result.stderr
-            }), 500
+            }, 500
             
     except subprocess.TimeoutExpired:
         logging.error("Timeout na geração de conteúdo via webhook")
-        return jsonify({
+        return {
             'status': 'error',
             'message': 'Content generation timeout'
-        }), 408
+        }, 408
+
+@app.route('/webhook/generate', methods=['POST'])
+def webhook_generate():
+    """Endpoint para trigger manual de geração de conteúdo"""
+    try:
+        # Verifica assinatura se configurada
+        signature = request.headers.get('X-Hub-Signature-256')
+        if signature and WEBHOOK_SECRET != 'default_secret':
+            if not verify_signature(request.data, signature, WEBHOOK_SECRET):
+                logging.warning("Assinatura inválida no webhook")
+                return jsonify({'error': 'Invalid signature'}), 401
+        
+        # Log da requisição
+        logging.info(f"Webhook recebido de {request.remote_addr}")
+        
+        # Com Idempotency-Key o resultado fica em cache; sem ela, apenas
+        # requisições idênticas simultâneas são agrupadas em uma execução
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key:
+            flight_key, ttl = f"key:{idempotency_key}", IDEMPOTENCY_TTL_SECONDS
+        else:
+            flight_key, ttl = f"body:{hashlib.sha256(request.data).hexdigest()}", 0
+        
+        # Execução com perfil não é agrupada com uma sem perfil (e vice-versa)
+        remote_addr = request.remote_addr
+        profile = PROFILING_ENABLED and request.args.get('profile') == '1'
+        if profile:
+            flight_key += ':profile'
+        (payload, status), shared = single_flight.do(
+            flight_key,
+            lambda: run_generation(remote_addr, profile),
+            ttl_seconds=ttl,
+            store_if=lambda result: result[1] < 500
+        )
+        
+        if shared:
+            logging.info(f"Trigger duplicado atendido pela execução compartilhada ({flight_key[:16]}...)")
+        
+        response = jsonify(payload)
+        response.status_code = status
+        response.headers['Idempotent-Replayed'] = 'true' if shared else 'false'
+        return response
         
     except Exception as e:
         logging.error(f"Erro inesperado no webhook: {e}")
@@ -98,24 +286,147 @@ def webhook_generate():
             'error': str(e)
         }), 500
 
+@app.route('/webhook/replicate', methods=['POST'])
+def webhook_replicate():
+    """Recebe a conclusão de uma predição da Replicate e libera o gerador que a espera"""
+    if not prediction_inbox:
+        return jsonify({'error': 'Replicate webhook not configured'}), 404
+    
+    if not verify_replicate_signature(request.headers, request.get_data(), REPLICATE_WEBHOOK_SECRET):
+        logging.warning("Assinatura inválida no webhook da Replicate")
+        return jsonify({'error': 'Invalid signature'}), 401
+    
+    try:
+        prediction = request.get_json(force=True)
+        delivered = prediction_inbox.deliver(prediction)
+        logging.info(f"Predição {prediction.get('id')} recebida ({prediction.get('status')})")
+        return jsonify({'status': 'delivered' if delivered else 'ignored'})
+        
+    except Exception as e:
+        logging.error(f"Erro no webhook da Replicate: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to deliver prediction',
+            'error': str(e)
+        }), 500
+
+@app.route('/webhook/synced', methods=['POST'])
+def webhook_synced():
+    """Marca arquivos já enviados ao Google Drive (os únicos despejáveis)
+
+    files: caminhos relativos ao diretório de conteúdo, os mesmos do registro de
+    artefatos (ex.: image_1_20250101_120000.jpg); nomes sem correspondência são informados.
+    """
+    if not disk_budget:
+        return jsonify({'error': 'Disk budget not configured'}), 404
+    
+    # Assinatura obrigatória: a marcação decide o que é apagado primeiro no despejo
+    if WEBHOOK_SECRET == 'default_secret':
+        return jsonify({'error': 'WEBHOOK_SECRET not configured'}), 403
+    signature = request.headers.get('X-Hub-Signature-256', '')
+    if not verify_signature(request.data, signature, WEBHOOK_SECRET):
+        logging.warning("Assinatura ausente ou inválida no webhook de sincronização")
+        return jsonify({'error': 'Invalid signature'}), 401
+    
+    try:
+        files = (request.get_json(silent=True) or {}).get('files', [])
+        if not isinstance(files, list):
+            return jsonify({'error': 'files must be a list'}), 400
+        
+        marked = disk_budget.mark_synced(files)
+        logging.info(f"☁️ {marked} arquivo(s) marcado(s) como sincronizado(s) com o Drive")
+        if marked < len(files):
+            logging.warning(f"⚠️ {len(files) - marked} arquivo(s) sem correspondência no registro de artefatos")
+        return jsonify({'status': 'success', 'marked': marked, 'unmatched': len(files) - marked})
+        
+    except Exception as e:
+        logging.error(f"Erro ao marcar arquivos sincronizados: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to mark synced files',
+            'error': str(e)
+        }), 500
+
+@app.route('/content', methods=['GET'])
+def list_content():
+    """Lista o conteúdo gerado com filtros (topic, status, from, to) e paginação por cursor"""
+    try:
+        items, next_cursor = ContentCatalog().query(
+            topic=request.args.get('topic'),
+            status=request.args.get('status'),
+            date_from=request.args.get('from'),
+            date_to=request.args.get('to'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 50)
+        )
+        
+        return jsonify({
+            'items': items,
+            'count': len(items),
+            'next_cursor': next_cursor,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    except Exception as e:
+        logging.error(f"Erro ao consultar catálogo: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to query content catalog',
+            'error': str(e)
+        }), 500
+
+@app.route('/costs', methods=['GET'])
+def list_costs():
+    """Custos de tokens por dia, etapa e tópico, com custo por item e estado do orçamento"""
+    try:
+        days = max(1, min(int(request.args.get('days', 30)), 366))
+        summary = CostTracker().summary(days=days)
+        summary['timestamp'] = datetime.now().isoformat()
+        return jsonify(summary)
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    except Exception as e:
+        logging.error(f"Erro ao consultar custos: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to query cost accounting',
+            'error': str(e)
+        }), 500
+
+@app.route('/webhook/jobs/<int:job_id>', methods=['GET'])
+def webhook_job(job_id):
+    """Endpoint para consultar um job da fila compartilhada"""
+    if not job_queue:
+        return jsonify({'error': 'Job queue not configured'}), 404
+    
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': f'Job not found: {job_id}'}), 404
+    
+    return jsonify(job)
+
 @app.route('/webhook/status', methods=['GET'])
 def webhook_status():
     """Endpoint para verificar status do sistema"""
     try:
         # Verifica se os arquivos necessários existem
+        config = settings()
         required_files = [
-            '/app/day_trade_generator_free.py',
-            '/app/.env'
+            config.free_generator_script,
+            config.env_file
         ]
         
         missing_files = [f for f in required_files if not os.path.exists(f)]
         
         # Verifica espaço em disco
-        disk_usage = os.statvfs('/app')
+        disk_usage = os.statvfs(config.base_dir)
         free_space_gb = (disk_usage.f_frsize * disk_usage.f_bavail) / (1024**3)
         
         # Verifica últimos logs
-        log_file = '/app/logs/automation.log'
+        log_file = LOG_FILES['automation']
         last_execution = None
         
         if os.path.exists(log_file):
@@ -130,7 +441,9 @@ def webhook_status():
             'system_status': 'healthy' if not missing_files else 'degraded',
             'missing_files': missing_files,
             'free_space_gb': round(free_space_gb, 2),
+            'disk_budget': disk_budget.stats() if disk_budget else None,
             'last_execution': last_execution,
+            'config_loaded_at': datetime.fromtimestamp(get_config().loaded_at).isoformat(timespec='seconds'),
             'timestamp': datetime.now().isoformat()
         }
         
@@ -146,22 +459,44 @@ def webhook_status():
 
 @app.route('/webhook/logs', methods=['GET'])
 def webhook_logs():
-    """Endpoint para visualizar logs recentes"""
+    """Endpoint para visualizar logs recentes ou um intervalo (from/to/level)"""
     try:
         lines = int(request.args.get('lines', 50))
         log_type = request.args.get('type', 'automation')
+        start = request.args.get('from')
+        end = request.args.get('to')
+        level = request.args.get('level')
         
-        log_files = {
-            'automation': '/app/logs/automation.log',
-            'webhook': '/app/logs/webhook.log'
-        }
+        log_file = LOG_FILES.get(log_type)
+        if not log_file:
+            return jsonify({
+                'error': f'Log file not found: {log_type}'
+            }), 404
+        
+        if start or end or level:
+            # Consulta por intervalo: inclui segmentos rotacionados e comprimidos
+            limit = int(request.args.get('limit', 1000))
+            logs = LogStore(log_file).query(start, end, level=level, limit=limit + 1)
+            truncated = len(logs) > limit
+            logs = logs[:limit]
+            
+            return jsonify({
+                'log_type': log_type,
+                'from': start,
+                'to': end,
+                'level': level,
+                'lines_returned': len(logs),
+                'truncated': truncated,
+                'logs': logs,
+                'timestamp': datetime.now().isoformat()
+            })
         
-        log_file = log_files.get(log_type)
-        if not log_file or not os.path.exists(log_file):
+        if not os.path.exists(log_file):
             return jsonify({
                 'error': f'Log file not found: {log_type}'
             }), 404
         
+        # O arquivo ativo é limitado por LOG_MAX_MB, então ler tudo continua barato
         with open(log_file, 'r') as f:
             all_lines = f.readlines()
             recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
@@ -182,5 +517,7 @@ def webhook_logs():
         }), 500
 
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use: gunicorn -c gunicorn.conf.py webhook_server:app
     logging.info("Iniciando servidor webhook...")
-    app.run(host='0.0.0.0', port=8000, debug=False)
+    start_background_tasks()
+    app.run(host='0.0.0.0', port=8000, debug=False, threaded=True)